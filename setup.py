@@ -22,7 +22,9 @@ install_requires = [
 
 # test
 pytorch_requires = ["torch==1.8.0"]
-full_requires = list(set(pytorch_requires))
+# fast CRC64, needed to verify multipart objects
+integrity_requires = ["crcmod>=1.7"]
+full_requires = list(set(pytorch_requires + integrity_requires))
 
 package_root = os.path.abspath(os.path.dirname(__file__))
 readme_filename = os.path.join(package_root, "README.md")
@@ -53,6 +55,7 @@ setuptools.setup(
     extras_require={
         "full": full_requires,
         "pytorch": pytorch_requires,
+        "integrity": integrity_requires,
     },
     python_requires=">=3.6",
     scripts=[],
@@ -0,0 +1,81 @@
+import pytest
+from botocore.exceptions import ClientError
+
+from volcengine_ml_platform.io import adaptive_concurrency
+from volcengine_ml_platform.io.adaptive_concurrency import AdaptiveConcurrency
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(adaptive_concurrency.time, "monotonic", clock)
+    return clock
+
+
+def run_window(limiter, clock, nbytes, latency=1.0, throttled=False):
+    """saturate the current limit for one window"""
+    limit = limiter.limit
+    for _ in range(limit):
+        limiter.acquire()
+    limiter.add_bytes(nbytes)
+    for _ in range(limit - 1):
+        limiter.release(latency, throttled=throttled)
+    # the last release closes the window and triggers the adjustment
+    clock.now += limiter.window
+    limiter.release(latency, throttled=throttled)
+
+
+def throttle_error():
+    return ClientError({"Error": {"Code": "SlowDown"}}, "GetObject")
+
+
+def test_slow_start_then_back_off(clock):
+    limiter = AdaptiveConcurrency(initial=2, max_limit=32)
+    run_window(limiter, clock, 100)
+    assert limiter.limit == 4
+    run_window(limiter, clock, 200)
+    assert limiter.limit == 8
+    # plateau: throughput stopped improving
+    run_window(limiter, clock, 200)
+    assert limiter.limit == 8
+    run_window(limiter, clock, 200, throttled=True)
+    assert limiter.limit == 4
+    # additive increase after the first back off
+    run_window(limiter, clock, 200)
+    assert limiter.limit == 5
+
+
+def test_back_off_on_rising_latency(clock):
+    limiter = AdaptiveConcurrency(initial=8)
+    run_window(limiter, clock, 100, latency=0.1)
+    assert limiter.limit == 16
+    run_window(limiter, clock, 100, latency=0.5)
+    assert limiter.limit == 8
+
+
+def test_call_retries_throttled_requests(clock):
+    limiter = AdaptiveConcurrency(max_retries=2)
+    attempts = []
+
+    def flaky():
+        attempts.append(1)
+        if len(attempts) < 3:
+            raise throttle_error()
+        return "ok"
+
+    assert limiter.call(flaky) == "ok"
+    assert len(attempts) == 3
+
+    def always_throttled():
+        raise throttle_error()
+
+    with pytest.raises(ClientError):
+        limiter.call(always_throttled)
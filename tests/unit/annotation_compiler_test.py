@@ -0,0 +1,88 @@
+import pytest
+
+from volcengine_ml_platform.annotation.compiler import AnnotationCompiler
+from volcengine_ml_platform.annotation.compiler import compile_annotations
+from volcengine_ml_platform.annotation.ttypes import AnnotationDataType
+
+
+def single(label, bbox=None):
+    result = {"Data": [{"Type": AnnotationDataType.SingleSelector, "Label": label}]}
+    if bbox is not None:
+        result["Bbox"] = bbox
+    return result
+
+
+def multiple(labels):
+    return {"Data": [{"Type": AnnotationDataType.MultipleSelector, "Labels": labels}]}
+
+
+def test_numeric_labels_keep_their_ids():
+    compiled = compile_annotations(
+        [{"Result": [single("3")]}, {"Result": [single(1)]}, {"Result": []}],
+    )
+    assert compiled.classes == ["0", "1", "2", "3"]
+    assert compiled.class_ids.tolist() == [3, 1, -1]
+    assert not compiled.all_labeled()
+    assert compiled.target(0) == 3
+
+
+def test_multi_hot_and_boxes():
+    annotations = [
+        {"Result": [multiple(["dog", "cat"])]},
+        {
+            "Result": [
+                single("cat", [0, 0, 10, 20]),
+                single("dog", {"X": 1, "Y": 2, "W": 3, "H": 4}),
+            ]
+        },
+        "unlabeled",
+    ]
+    compiled = compile_annotations(annotations)
+    assert compiled.classes == ["cat", "dog"]
+    assert compiled.class_ids.tolist() == [1, 0, -1]
+    assert [compiled.multi_hot_of(i).tolist() for i in range(3)] == [
+        [1, 1],
+        [1, 1],
+        [0, 0],
+    ]
+    assert compiled.target(2, "multi_hot").tolist() == [0, 0]
+
+    boxes, box_class_ids = compiled.target(1, "boxes")
+    assert boxes.tolist() == [[0, 0, 10, 20], [1, 2, 3, 4]]
+    assert box_class_ids.tolist() == [0, 1]
+    assert len(compiled.boxes_of(0)[0]) == 0
+    with pytest.raises(ValueError):
+        compiled.target(0, "mask")
+
+
+def test_large_numeric_labels_are_names():
+    compiled = compile_annotations(
+        [{"Result": [single("20000000")]}, {"Result": [single("7")]}],
+    )
+    assert compiled.classes == [str(i) for i in range(8)] + ["20000000"]
+    assert compiled.class_ids.tolist() == [8, 7]
+
+
+def test_names_do_not_shift_numeric_ids():
+    compiled = compile_annotations(
+        [
+            {"Result": [single("10")]},
+            {"Result": [single("2")]},
+            {"Result": [single("other")]},
+            {"Result": [single("background")]},
+        ],
+    )
+    assert compiled.classes[2] == "2"
+    assert compiled.classes[10] == "10"
+    assert compiled.classes[11:] == ["background", "other"]
+    assert compiled.class_ids.tolist() == [10, 2, 12, 11]
+
+
+def test_fixed_classes():
+    compiler = AnnotationCompiler(classes=["rose", "daisy"])
+    compiler.add({"Result": [single("daisy")]})
+    assert compiler.compile().class_ids.tolist() == [1]
+
+    compiler.add({"Result": [single("tulip")]})
+    with pytest.raises(ValueError):
+        compiler.compile()
@@ -0,0 +1,154 @@
+import asyncio
+import os
+import threading
+import time
+
+import pytest
+
+from volcengine_ml_platform.io.async_tos import _TaskWindow
+from volcengine_ml_platform.io.async_tos import AsyncTOSClient
+
+
+class SlowS3Client:
+    """wraps a FakeS3Client, records how many transfers run at once"""
+
+    def __init__(self, s3_client, delay=0.01):
+        self._s3_client = s3_client
+        self._delay = delay
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.threads = set()
+
+    def __getattr__(self, name):
+        return getattr(self._s3_client, name)
+
+    def _track(self, fn, *args, **kwargs):
+        with self._lock:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+            self.threads.add(threading.get_ident())
+        try:
+            time.sleep(self._delay)
+            return fn(*args, **kwargs)
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+    def download_file(self, *args, **kwargs):
+        return self._track(self._s3_client.download_file, *args, **kwargs)
+
+    def upload_file(self, *args, **kwargs):
+        return self._track(self._s3_client.upload_file, *args, **kwargs)
+
+
+@pytest.fixture
+def async_client(make_client, s3_client):
+    def _make(max_concurrency=4, s3=s3_client):
+        return AsyncTOSClient(
+            max_concurrency=max_concurrency,
+            tos_client=make_client(s3),
+        )
+
+    return _make
+
+
+def test_get_put_list(async_client, s3_client):
+    async def run():
+        async with async_client() as client:
+            await client.put_object("bucket", "a", b"hello")
+            await client.put_object("bucket", "b", b"world")
+            bodies = await asyncio.gather(
+                client.get_object("bucket", "a"),
+                client.get_object("bucket", "b"),
+            )
+            listed = await client.list_objects("bucket", 10, encoding_type="")
+        return bodies, listed
+
+    bodies, listed = asyncio.run(run())
+    assert bodies == [b"hello", b"world"]
+    assert [obj["Key"] for obj in listed["Contents"]] == ["a", "b"]
+
+
+def test_download_files_keeps_order(async_client, s3_client, tmp_path):
+    for i in range(10):
+        s3_client.objects[f"data/{i}"] = str(i).encode()
+
+    async def run():
+        async with async_client(max_concurrency=3) as client:
+            return await client.download_files(
+                bucket="bucket",
+                keys=[f"data/{i}" for i in range(10)],
+                target_dir_path=str(tmp_path),
+            )
+
+    paths = asyncio.run(run())
+    assert paths == [os.path.join(str(tmp_path), f"data/{i}") for i in range(10)]
+    for i, path in enumerate(paths):
+        with open(path, "rb") as f:
+            assert f.read() == str(i).encode()
+
+
+def test_download_dir_bounds_concurrency(async_client, s3_client, tmp_path):
+    for i in range(50):
+        s3_client.objects[f"dir/{i:02d}"] = b"x" * i
+    slow = SlowS3Client(s3_client)
+
+    async def run():
+        async with async_client(max_concurrency=4, s3=slow) as client:
+            await client.download_dir("bucket", "dir/", "dir/", str(tmp_path))
+
+    asyncio.run(run())
+    assert s3_client.count("download_file") == 50
+    assert sorted(os.listdir(str(tmp_path))) == [f"{i:02d}" for i in range(50)]
+    assert 1 < slow.max_in_flight <= 4
+    # each transfer runs on the calling executor thread only
+    assert len(slow.threads) <= 4
+
+
+def test_upload_dir(async_client, s3_client, tmp_path):
+    local = tmp_path / "local"
+    (local / "sub").mkdir(parents=True)
+    for i in range(20):
+        (local / "sub" / f"{i}.txt").write_bytes(str(i).encode())
+    slow = SlowS3Client(s3_client)
+
+    async def run():
+        async with async_client(max_concurrency=2, s3=slow) as client:
+            return await client.upload(str(local), "bucket", "up")
+
+    url = asyncio.run(run())
+    assert url.startswith("tos://bucket/")
+    uploaded = {k: v for k, v in s3_client.objects.items() if k.endswith(".txt")}
+    assert len(uploaded) == 20
+    assert slow.max_in_flight <= 2
+
+
+def test_failure_cancels_pending(async_client, s3_client, tmp_path):
+    s3_client.objects["ok"] = b"1"
+
+    async def run():
+        async with async_client(max_concurrency=2) as client:
+            await client.download_files(
+                bucket="bucket",
+                keys=["ok", "missing", "ok"],
+                target_dir_path=str(tmp_path),
+            )
+
+    with pytest.raises(KeyError):
+        asyncio.run(run())
+
+
+def test_task_window_cancelled_task():
+    async def run():
+        window = _TaskWindow(2)
+        other = await window.submit(asyncio.sleep(10))
+        task = await window.submit(asyncio.sleep(10))
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await window.join()
+        await asyncio.sleep(0)
+        return other.cancelled()
+
+    # a cancelled task fails the window like an exception and cancels the rest
+    assert asyncio.run(run())
@@ -0,0 +1,32 @@
+import threading
+
+import pytest
+
+from volcengine_ml_platform.util.bounded_executor import BoundedExecutor
+from volcengine_ml_platform.util.bounded_executor import imap_bounded
+
+
+def test_bounded_executor_raises_first_error():
+    def fail(i):
+        if i == 3:
+            raise ValueError(i)
+
+    with pytest.raises(ValueError):
+        with BoundedExecutor(max_workers=2) as executor:
+            for i in range(10):
+                executor.submit(fail, i)
+
+
+def test_imap_bounded_unordered():
+    release = threading.Event()
+
+    def slow_first(i):
+        if i == 0:
+            release.wait(5)
+        return i
+
+    results = imap_bounded(slow_first, range(5), max_workers=2, ordered=False)
+    first = [next(results) for _ in range(4)]
+    release.set()
+    assert 0 not in first
+    assert sorted(first + list(results)) == list(range(5))
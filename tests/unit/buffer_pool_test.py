@@ -0,0 +1,60 @@
+import io
+import os
+
+import numpy as np
+import pytest
+
+from volcengine_ml_platform.io.buffer_pool import BufferPool
+from volcengine_ml_platform.io.buffer_pool import read_into
+
+
+class Chunked:
+    """a stream without readinto that returns short reads"""
+
+    def __init__(self, data):
+        self.data = data
+
+    def read(self, n):
+        chunk, self.data = self.data[: min(n, 7)], self.data[min(n, 7) :]
+        return chunk
+
+
+def test_read_into():
+    data = os.urandom(100)
+    buf = bytearray(100)
+    assert read_into(Chunked(data), memoryview(buf)) == 100
+    assert buf == data
+    with pytest.raises(OSError):
+        read_into(io.BytesIO(data), memoryview(bytearray(101)))
+
+
+def test_pool_reuses_buffers():
+    pool = BufferPool(min_size=16, max_bytes=64)
+    buf = pool.acquire(20)
+    assert len(buf.view) == 20 and len(buf.buffer) == 32
+    first = buf.buffer
+    buf.release()
+    assert pool.free_bytes == 32
+    with pool.acquire(30) as buf:
+        assert buf.buffer is first
+    # buffers beyond max_bytes are dropped instead of pooled
+    with pool.acquire(100):
+        pass
+    assert pool.free_bytes == 32
+
+
+def test_get_object_into(make_client, s3_client):
+    data = os.urandom(1000)
+    s3_client.objects["k"] = data
+    client = make_client(s3_client)
+
+    array = np.zeros(1024, dtype=np.uint8)
+    assert client.get_object_into("b", "k", array) == 1000
+    assert array[:1000].tobytes() == data
+    with pytest.raises(ValueError):
+        client.get_object_into("b", "k", bytearray(999))
+
+    pool = BufferPool()
+    with client.get_object_pooled("b", "k", pool) as buf:
+        assert buf.view == data
+    assert pool.free_bytes == pool.min_size
@@ -0,0 +1,55 @@
+import os
+
+from volcengine_ml_platform.util import client_pool
+
+
+def test_get_reuses_client_within_process():
+    created = []
+
+    def factory():
+        created.append(object())
+        return created[-1]
+
+    first = client_pool.get("test-key", factory)
+    assert client_pool.get("test-key", factory) is first
+    assert len(created) == 1
+    client_pool.clear()
+
+
+def test_get_recreates_client_after_fork():
+    parent = client_pool.get("test-key", object)
+    read_fd, write_fd = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        child = client_pool.get("test-key", object)
+        os.write(write_fd, b"1" if child is not parent else b"0")
+        os._exit(0)
+    os.waitpid(pid, 0)
+    assert os.read(read_fd, 1) == b"1"
+    assert client_pool.get("test-key", object) is parent
+    client_pool.clear()
+
+
+def test_http_session_is_shared():
+    assert client_pool.http_session() is client_pool.http_session()
+    assert client_pool.http_session(32) is not client_pool.http_session()
+    client_pool.clear()
+
+
+def test_s3_client_read_timeout():
+    config = {"region_name": "cn-beijing", "endpoint_url": "http://tos"}
+    client = client_pool.s3_client(10, read_timeout=3, **config)
+    assert client.meta.config.read_timeout == 3
+    assert client_pool.s3_client(10, **config) is not client
+    client_pool.clear()
+
+
+def test_rotated_credentials_do_not_grow_the_pool(monkeypatch):
+    monkeypatch.setattr(client_pool, "MAX_CLIENTS", 4)
+    first = client_pool.get(("s3", "token-0"), object)
+    for i in range(1, 10):
+        client_pool.get(("s3", f"token-{i}"), object)
+        # the long lived client stays cached while it is in use
+        assert client_pool.get(("s3", "token-0"), object) is first
+    assert len(client_pool._clients) == 4
+    client_pool.clear()
@@ -0,0 +1,252 @@
+import datetime
+import hashlib
+import io
+import threading
+
+import pytest
+from botocore.exceptions import ClientError
+
+from volcengine_ml_platform.io.tos import TOSClient
+from volcengine_ml_platform.util import client_pool
+
+
+def _not_found(operation, key):
+    error = {
+        "Error": {"Code": "NoSuchKey", "Message": key},
+        "ResponseMetadata": {"HTTPStatusCode": 404},
+    }
+    return ClientError(error, operation)
+
+
+def _read_body(body):
+    if isinstance(body, (bytes, bytearray, memoryview)):
+        return bytes(body)
+    if isinstance(body, str):
+        return body.encode("utf-8")
+    return body.read()
+
+
+class FakeS3Client:
+    """an in-memory bucket implementing the part of the boto3 s3 API used by io"""
+
+    def __init__(self, objects=None):
+        self.objects = dict(objects or {})
+        # etag overrides, the md5 of the data otherwise
+        self.etags = {}
+        # headers returned with head_object and get_object
+        self.headers = {}
+        # (operation, key) of every request
+        self.requests = []
+        # (start, end) of every ranged get_object
+        self.ranges = []
+        # a ranged get_object starting here raises ConnectionError
+        self.fail_at = None
+        self.uploads = {}
+        self.aborted = []
+        self.delete_batches = []
+        self._lock = threading.Lock()
+
+    def count(self, operation):
+        return sum(1 for op, _ in self.requests if op == operation)
+
+    def _record(self, operation, key):
+        with self._lock:
+            self.requests.append((operation, key))
+
+    def etag(self, key):
+        return self.etags.get(key) or hashlib.md5(self.objects[key]).hexdigest()
+
+    def _metadata(self):
+        return {"HTTPStatusCode": 200, "HTTPHeaders": dict(self.headers)}
+
+    def head_object(self, Bucket, Key, **kwargs):
+        self._record("head_object", Key)
+        if Key not in self.objects:
+            raise _not_found("HeadObject", Key)
+        return {
+            "ContentLength": len(self.objects[Key]),
+            "ETag": f'"{self.etag(Key)}"',
+            "ResponseMetadata": self._metadata(),
+        }
+
+    def get_object(self, Bucket, Key, Range=None, IfMatch=None):
+        self._record("get_object", Key)
+        if Key not in self.objects:
+            raise _not_found("GetObject", Key)
+        data = self.objects[Key]
+        if Range is not None:
+            start, end = (int(x) for x in Range[len("bytes=") :].split("-"))
+            with self._lock:
+                self.ranges.append((start, end))
+            if start == self.fail_at:
+                raise ConnectionError("connection dropped")
+            data = data[start : end + 1]
+        return {
+            "Body": io.BytesIO(data),
+            "ContentLength": len(data),
+            "ETag": f'"{self.etag(Key)}"',
+            "ResponseMetadata": self._metadata(),
+        }
+
+    def put_object(self, Bucket, Key, Body, **kwargs):
+        self._record("put_object", Key)
+        self.objects[Key] = _read_body(Body)
+        self.etags.pop(Key, None)
+        return {"ETag": f'"{self.etag(Key)}"'}
+
+    def list_objects(
+        self,
+        Bucket,
+        Prefix="",
+        Marker="",
+        MaxKeys=1000,
+        Delimiter=None,
+        EncodingType=None,
+    ):
+        self._record("list_objects", (Prefix, Delimiter))
+        keys = sorted(k for k in self.objects if k.startswith(Prefix) and k > Marker)
+        common_prefixes = set()
+        if Delimiter:
+            # keys and common prefixes share one page, a prefix counts as one entry
+            entries = []
+            for k in keys:
+                if Marker.endswith(Delimiter) and k.startswith(Marker):
+                    continue
+                head, sep, _ = k[len(Prefix) :].partition(Delimiter)
+                if not sep:
+                    entries.append(k)
+                elif not entries or entries[-1] != Prefix + head + sep:
+                    entries.append(Prefix + head + sep)
+                    common_prefixes.add(entries[-1])
+            keys = entries
+        page = keys[:MaxKeys]
+        return {
+            "Contents": [
+                {
+                    "Key": k,
+                    "Size": len(self.objects[k]),
+                    "ETag": f'"{self.etag(k)}"',
+                    "LastModified": datetime.datetime(2021, 1, 1),
+                }
+                for k in page
+                if k not in common_prefixes
+            ],
+            "CommonPrefixes": [{"Prefix": p} for p in page if p in common_prefixes],
+            "IsTruncated": len(keys) > MaxKeys,
+        }
+
+    def delete_objects(self, Bucket, Delete):
+        keys = [obj["Key"] for obj in Delete["Objects"]]
+        assert len(keys) <= 1000
+        with self._lock:
+            self.delete_batches.append(keys)
+            for key in keys:
+                self.objects.pop(key, None)
+        return {}
+
+    def upload_file(self, Filename, Bucket, Key, Config=None, Callback=None, **kwargs):
+        self._record("upload_file", Key)
+        with open(Filename, "rb") as f:
+            self.objects[Key] = f.read()
+        if Callback is not None:
+            Callback(len(self.objects[Key]))
+
+    def upload_fileobj(
+        self, Fileobj, Bucket, Key, Config=None, Callback=None, **kwargs
+    ):
+        self._record("upload_fileobj", Key)
+        self.objects[Key] = Fileobj.read()
+        self.etags.pop(Key, None)
+        if Callback is not None:
+            Callback(len(self.objects[Key]))
+
+    def download_file(self, Bucket, Key, Filename, Config=None, Callback=None):
+        self._record("download_file", Key)
+        with open(Filename, "wb") as f:
+            f.write(self.objects[Key])
+        if Callback is not None:
+            Callback(len(self.objects[Key]))
+
+    def create_multipart_upload(self, Bucket, Key, **kwargs):
+        with self._lock:
+            upload_id = f"upload-{len(self.uploads)}"
+            self.uploads[upload_id] = {}
+        return {"UploadId": upload_id}
+
+    def upload_part(self, Bucket, Key, PartNumber, UploadId, Body, **kwargs):
+        self._record("upload_part", PartNumber)
+        data = _read_body(Body)
+        with self._lock:
+            self.uploads[UploadId][PartNumber] = data
+        return {"ETag": f'"{hashlib.md5(data).hexdigest()}"'}
+
+    def list_parts(self, Bucket, Key, UploadId, PartNumberMarker=0, MaxParts=1000):
+        if UploadId not in self.uploads:
+            raise _not_found("ListParts", UploadId)
+        numbers = sorted(n for n in self.uploads[UploadId] if n > PartNumberMarker)
+        page = numbers[:MaxParts]
+        return {
+            "Parts": [
+                {
+                    "PartNumber": n,
+                    "ETag": f'"{hashlib.md5(self.uploads[UploadId][n]).hexdigest()}"',
+                    "Size": len(self.uploads[UploadId][n]),
+                }
+                for n in page
+            ],
+            "IsTruncated": len(numbers) > MaxParts,
+            "NextPartNumberMarker": page[-1] if page else PartNumberMarker,
+        }
+
+    def complete_multipart_upload(self, Bucket, Key, UploadId, MultipartUpload):
+        parts = self.uploads.pop(UploadId)
+        numbers = [p["PartNumber"] for p in MultipartUpload["Parts"]]
+        assert numbers == sorted(parts)
+        self.objects[Key] = b"".join(parts[n] for n in numbers)
+        digests = b"".join(hashlib.md5(parts[n]).digest() for n in numbers)
+        self.etags[Key] = f"{hashlib.md5(digests).hexdigest()}-{len(numbers)}"
+        return {"ETag": f'"{self.etags[Key]}"'}
+
+    def abort_multipart_upload(self, Bucket, Key, UploadId):
+        self.uploads.pop(UploadId, None)
+        self.aborted.append(Key)
+
+
+@pytest.fixture
+def s3_client():
+    return FakeS3Client()
+
+
+@pytest.fixture
+def make_client(monkeypatch):
+    """returns a factory of TOSClient backed by a FakeS3Client
+
+    Clients re-created through the client pool, e.g. by _with_pool_connections
+    or in forked workers, get the same fake.
+    """
+    fakes = {}
+
+    def _pooled_client(max_pool_connections, read_timeout=None, **config):
+        return fakes[config["endpoint_url"]]
+
+    monkeypatch.setattr(client_pool, "s3_client", _pooled_client)
+
+    def _make(s3_client=None, **attrs):
+        if s3_client is None:
+            s3_client = FakeS3Client()
+        endpoint_url = f"fake://{id(s3_client)}"
+        fakes[endpoint_url] = s3_client
+        client = TOSClient.__new__(TOSClient)
+        client.region_name = "cn-beijing"
+        client.max_pool_connections = 4
+        client._client_config = {"endpoint_url": endpoint_url}
+        client.s3_client = s3_client
+        client.dir_record = set()
+        client.cache = None
+        client.request_policy = None
+        client.rate_limiter = None
+        for name, value in attrs.items():
+            setattr(client, name, value)
+        return client
+
+    return _make
@@ -0,0 +1,122 @@
+import json
+import os
+
+from volcengine_ml_platform import constant
+from volcengine_ml_platform.datasets import image_dataset
+from volcengine_ml_platform.datasets import manifest_index
+from volcengine_ml_platform.datasets.dataset import _Dataset
+from volcengine_ml_platform.datasets.image_dataset import ImageDataset
+
+
+class FakeTOSClient:
+    def __init__(self, manifest_path):
+        self.manifest_path = manifest_path
+        self.downloaded = []
+
+    def download_file(self, tos_url, target_dir_path):
+        return self.manifest_path
+
+    def iter_download_files(self, tos_urls, target_dir_path, parallelism, ordered):
+        for url in tos_urls:
+            self.downloaded.append(url)
+            yield f"{target_dir_path}/{url.rsplit('/', 1)[-1]}"
+
+
+def make_dataset(tmp_path, count):
+    manifest_path = tmp_path / "remote.manifest"
+    with open(manifest_path, "w") as f:
+        for i in range(count):
+            line = {"Data": {"ImageURL": f"tos://b/{i}.jpg"}, "Annotation": i}
+            f.write(json.dumps(line) + "\n")
+    dataset = _Dataset.__new__(_Dataset)
+    dataset.local_path = str(tmp_path)
+    dataset.tos_client = FakeTOSClient(str(manifest_path))
+    dataset._get_detail = lambda: None
+    dataset._get_storage_path = lambda: "tos://b/remote.manifest"
+    return dataset
+
+
+def test_create_manifest_dataset_honors_limit(tmp_path):
+    dataset = make_dataset(tmp_path, 10)
+    dataset._create_manifest_dataset("ImageURL", limit=3)
+
+    assert dataset.tos_client.downloaded == [f"tos://b/{i}.jpg" for i in range(3)]
+    with open(tmp_path / constant.DATASET_LOCAL_METADATA_FILENAME) as f:
+        lines = [json.loads(line) for line in f]
+    assert [line["Annotation"] for line in lines] == [0, 1, 2]
+    assert lines[2]["Data"]["FilePath"] == f"{tmp_path}/2.jpg"
+    assert dataset.data_count == 3 and dataset.created
+
+
+def test_get_paths_seeks_with_index(tmp_path):
+    dataset = make_dataset(tmp_path, 10)
+    dataset.tabular_path = ""
+    dataset._create_manifest_dataset("ImageURL")
+    manifest_path = dataset._manifest_path()
+    assert os.path.exists(manifest_index.index_path(manifest_path))
+
+    paths, annotations = dataset.get_paths(offset=7, limit=5)
+    assert annotations == [7, 8, 9]
+    assert paths[0] == f"{tmp_path}/7.jpg"
+    assert dataset.get_paths(offset=12) == ([], [])
+
+    # a stale index is rebuilt when the manifest changes
+    with open(manifest_path, "a") as f:
+        f.write(json.dumps({"Data": {"FilePath": "x"}, "Annotation": 10}) + "\n")
+    assert manifest_index.count_lines(manifest_path) == 11
+    assert dataset.get_paths(offset=10)[1] == [10]
+
+
+def test_index_detects_rewrite_of_same_size(tmp_path):
+    manifest_path = str(tmp_path / "local.manifest")
+    with manifest_index.ManifestWriter(manifest_path) as writer:
+        for i in range(3):
+            writer.write({"Annotation": i})
+    assert [
+        line["Annotation"] for line in manifest_index.iter_lines(manifest_path)
+    ] == [
+        0,
+        1,
+        2,
+    ]
+
+    # same size, different line lengths; the mtime is kept to only trip the tail check
+    stat = os.stat(manifest_path)
+    with open(manifest_path, "w") as f:
+        f.write('{"Annotation": 12}\n{"Annotation":3}\n{"Annotation": 4}\n')
+    os.utime(manifest_path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    assert os.path.getsize(manifest_path) == stat.st_size
+
+    annotations = [
+        line["Annotation"] for line in manifest_index.iter_lines(manifest_path)
+    ]
+    assert annotations == [12, 3, 4]
+
+
+def test_publish_and_load_shards(tmp_path, monkeypatch, make_client, s3_client):
+    monkeypatch.setattr(image_dataset, "MANIFEST_READ_SIZE", 64)
+    samples = {}
+    with open(tmp_path / constant.DATASET_LOCAL_METADATA_FILENAME, "w") as f:
+        for i in range(30):
+            file_path = tmp_path / "images" / f"{i:02d}.jpg"
+            file_path.parent.mkdir(exist_ok=True)
+            file_path.write_bytes(os.urandom(50 + i))
+            samples[f"images/{i:02d}.jpg"] = file_path.read_bytes()
+            annotation = {"Result": [{"Data": [{"Label": str(i % 3)}]}]}
+            line = {"Data": {"FilePath": str(file_path)}, "Annotation": annotation}
+            f.write(json.dumps(line) + "\n")
+    dataset = ImageDataset.__new__(ImageDataset)
+    dataset.local_path = str(tmp_path)
+    dataset.created = True
+    dataset.tos_client = make_client(s3_client)
+
+    index = dataset.publish_shards("tos://bucket/shards", shard_size=512)
+    assert len(index.shards) > 1
+
+    reader, positions, columns = dataset.load_shard_manifest("tos://bucket/shards")
+    assert list(columns.keys) == sorted(samples)
+    assert [reader.read(int(p)) for p in positions] == [
+        samples[name] for name in columns.keys
+    ]
+    assert list(columns.labels) == [i % 3 for i in range(30)]
+    assert columns.annotations[4]["Result"][0]["Data"][0]["Label"] == "1"
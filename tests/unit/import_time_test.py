@@ -0,0 +1,91 @@
+import os
+import socket
+import subprocess
+import sys
+import threading
+
+from volcengine_ml_platform.util import cache_dir
+from volcengine_ml_platform.util import volce_util
+
+# seconds, generous enough for slow CI machines
+IMPORT_BUDGET = float(os.getenv("VOLC_ML_PLATFORM_IMPORT_BUDGET", "1.0"))
+HEAVY_MODULES = ["torch", "PIL", "boto3", "s3transfer", "prettytable", "jsonschema"]
+
+IMPORT_SCRIPT = """
+import socket
+import sys
+import threading
+import time
+
+def _no_dns(*args):
+    raise AssertionError("DNS lookup at import time")
+
+socket.gethostbyname = _no_dns
+start = time.perf_counter()
+import volcengine_ml_platform
+elapsed = time.perf_counter() - start
+import volcengine_ml_platform.datasets.image_dataset
+import volcengine_ml_platform.models.model
+print(elapsed)
+print(",".join(m for m in {heavy!r} if m in sys.modules))
+"""
+
+
+def test_import_is_cheap():
+    output = subprocess.check_output(
+        [sys.executable, "-c", IMPORT_SCRIPT.format(heavy=HEAVY_MODULES)],
+        env=dict(os.environ, VOLC_ML_PLATFORM_INTRANET=""),
+        universal_newlines=True,
+    )
+    elapsed, loaded = output.splitlines()
+    assert float(elapsed) < IMPORT_BUDGET
+    assert loaded == ""
+
+
+def test_probe_is_cached_on_disk(tmp_path, monkeypatch):
+    probes = []
+    monkeypatch.setattr(cache_dir, "HOME_DIR", str(tmp_path))
+    monkeypatch.setattr(volce_util, "_probe", lambda: probes.append(1) or True)
+    monkeypatch.delenv(volce_util.INTRANET_ENV_NAME, raising=False)
+    for _ in range(2):
+        monkeypatch.setattr(volce_util, "_is_intranet", None)
+        assert volce_util.get_tos_endpoint("cn-beijing").endswith(".ivolces.com")
+    assert len(probes) == 1
+
+    monkeypatch.setattr(volce_util, "_is_intranet", None)
+    monkeypatch.setenv(volce_util.INTRANET_ENV_NAME, "0")
+    assert volce_util.get_tos_endpoint("cn-beijing").endswith(".volces.com")
+
+
+def test_inconclusive_probe_is_not_cached(tmp_path, monkeypatch):
+    monkeypatch.setattr(cache_dir, "HOME_DIR", str(tmp_path))
+    monkeypatch.delenv(volce_util.INTRANET_ENV_NAME, raising=False)
+    monkeypatch.setattr(volce_util, "_probe", lambda: None)
+    monkeypatch.setattr(volce_util, "_is_intranet", None)
+    assert not volce_util.is_volce_intranet()
+    assert volce_util._load_cached(volce_util._network_key()) is None
+
+    monkeypatch.setattr(volce_util, "_probe", lambda: False)
+    monkeypatch.setattr(volce_util, "_is_intranet", None)
+    assert not volce_util.is_volce_intranet()
+    assert volce_util._load_cached(volce_util._network_key()) is False
+
+
+def test_probe_timeout_is_inconclusive(monkeypatch):
+    resolved = threading.Event()
+
+    def _hang(domain):
+        resolved.wait(5)
+        return "10.0.0.1"
+
+    monkeypatch.setattr(socket, "gethostbyname", _hang)
+    try:
+        assert volce_util._probe(timeout=0.05) is None
+    finally:
+        resolved.set()
+
+    def _nxdomain(domain):
+        raise socket.gaierror(socket.EAI_NONAME, "Name or service not known")
+
+    monkeypatch.setattr(socket, "gethostbyname", _nxdomain)
+    assert volce_util._probe(timeout=1) is False
@@ -0,0 +1,90 @@
+import hashlib
+import os
+
+import pytest
+
+from volcengine_ml_platform.io import integrity
+from volcengine_ml_platform.io.range_download import RangeDownloader
+
+
+def put(s3_client, data, etag=None, crc=None):
+    s3_client.objects["k"] = data
+    if etag is not None:
+        s3_client.etags["k"] = etag
+    crc = integrity.crc64(data) if crc is None else crc
+    s3_client.headers[integrity.CRC64_HEADER] = str(crc)
+    return s3_client
+
+
+def test_crc64():
+    assert integrity.crc64(b"123456789") == 0x995DC9BBDF1939FA
+    a, b = os.urandom(1000), os.urandom(777)
+    assert integrity.crc64(b, integrity.crc64(a)) == integrity.crc64(a + b)
+    assert integrity.crc64_combine(
+        integrity.crc64(a),
+        integrity.crc64(b),
+        len(b),
+    ) == integrity.crc64(a + b)
+
+
+def test_checksum_multipart_etag():
+    data = os.urandom(2500)
+    checksum = integrity.Checksum(crc64=False, part_size=1000)
+    for i in range(0, len(data), 300):
+        checksum.update(data[i : i + 300])
+    parts = [hashlib.md5(data[i : i + 1000]).hexdigest() for i in (0, 1000, 2000)]
+    assert checksum.etag(multipart=True) == integrity.multipart_etag(parts)
+    assert checksum.etag() == hashlib.md5(data).hexdigest()
+    assert checksum.size == len(data)
+
+
+def test_download_verified(tmp_path, s3_client):
+    data = os.urandom(3000)
+    target = str(tmp_path / "object.bin")
+    put(s3_client, data)
+    result = integrity.download_verified(s3_client, "b", "k", target, 1000)
+    assert result.verified
+    assert result.md5 == hashlib.md5(data).hexdigest()
+    with open(target, "rb") as f:
+        assert f.read() == data
+
+    with pytest.raises(integrity.IntegrityError):
+        integrity.download_verified(
+            put(s3_client, data, etag="0" * 32),
+            "b",
+            "k",
+            str(tmp_path / "bad.bin"),
+        )
+    assert os.listdir(tmp_path) == ["object.bin"]
+
+
+def test_range_download_verify(tmp_path, monkeypatch, s3_client):
+    monkeypatch.setattr(integrity, "HAS_FAST_CRC64", True)
+    data = os.urandom(1000)
+    target = str(tmp_path / "object.bin")
+    downloader = RangeDownloader(put(s3_client, data), range_size=300, verify=True)
+    downloader.download("b", "k", target)
+    assert downloader.result.verified
+    assert downloader.result.crc64 == integrity.crc64(data)
+
+    downloader = RangeDownloader(
+        put(s3_client, data, crc=1),
+        range_size=300,
+        verify=True,
+    )
+    with pytest.raises(integrity.IntegrityError):
+        downloader.download("b", "k", str(tmp_path / "bad.bin"))
+    assert os.listdir(tmp_path) == ["object.bin"]
+
+
+def test_unverified_download_warns(tmp_path, monkeypatch, caplog, s3_client):
+    monkeypatch.setattr(integrity, "HAS_FAST_CRC64", False)
+    put(s3_client, os.urandom(1000), etag="0" * 32 + "-2")
+    result = integrity.download_verified(
+        s3_client,
+        "b",
+        "k",
+        str(tmp_path / "object.bin"),
+    )
+    assert result.verified is None
+    assert "install crcmod" in caplog.text
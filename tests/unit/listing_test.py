@@ -0,0 +1,42 @@
+from volcengine_ml_platform.io import listing
+
+
+KEYS = [f"data/{d}/{i:04d}.jpg" for d in ("a", "B", "c9", "z") for i in range(1200)]
+KEYS += ["data/README", "data/_meta.json", "other/x"]
+
+
+def test_iter_objects_is_lazy(s3_client):
+    s3_client.objects.update(dict.fromkeys(KEYS, b""))
+    objects = listing.iter_objects(s3_client, "bucket", "data/")
+    assert next(objects)["Key"] == "data/B/0000.jpg"
+    assert s3_client.count("list_objects") == 1
+    assert len(list(objects)) + 1 == len(KEYS) - 1
+
+
+def test_iter_objects_parallel(s3_client):
+    s3_client.objects.update(dict.fromkeys(KEYS, b""))
+    expected = {k for k in KEYS if k.startswith("data/")}
+    for shard_by in (listing.SHARD_BY_DELIMITER, listing.SHARD_BY_CHARS):
+        objects = listing.iter_objects_parallel(
+            s3_client,
+            "bucket",
+            "data/",
+            parallelism=3,
+            shard_by=shard_by,
+        )
+        keys = [obj["Key"] for obj in objects]
+        assert len(keys) == len(expected)
+        assert set(keys) == expected
+
+
+def test_delimiter_listing_without_next_marker(s3_client):
+    # more top-level entries than fit in one page, and no NextMarker returned
+    keys = [f"data/{i:04d}/x" for i in range(1500)] + ["data/zz"]
+    s3_client.objects.update(dict.fromkeys(keys, b""))
+    objects = listing.iter_objects_parallel(
+        s3_client,
+        "bucket",
+        "data/",
+        parallelism=4,
+    )
+    assert sorted(obj["Key"] for obj in objects) == sorted(keys)
@@ -0,0 +1,47 @@
+import pickle
+
+from volcengine_ml_platform.io.manifest_columns import JsonColumn
+from volcengine_ml_platform.io.manifest_columns import ManifestColumns
+from volcengine_ml_platform.io.manifest_columns import StringColumn
+
+
+def annotation(label):
+    return {"Result": [{"Data": [{"Label": label}]}]}
+
+
+def test_string_column():
+    column = StringColumn.from_strings(["a/1.jpg", "", "图片/2.jpg"])
+    assert len(column) == 3
+    assert list(column) == ["a/1.jpg", "", "图片/2.jpg"]
+    assert column[-1] == "图片/2.jpg"
+    assert column.data.nbytes == len("a/1.jpg图片/2.jpg".encode("utf-8"))
+
+    empty = StringColumn.from_strings([])
+    assert len(empty) == 0 and list(empty) == []
+
+
+def test_manifest_columns():
+    columns = ManifestColumns.from_manifest_info(
+        {
+            "buckets": ["b1", "b2", "b1"],
+            "keys": ["k0", "k1", "k2"],
+            "annotations": [annotation("3"), annotation(1), annotation(0)],
+        },
+    )
+    columns = pickle.loads(pickle.dumps(columns))
+    assert len(columns) == 3
+    assert columns.buckets.names == ["b1", "b2"]
+    assert list(columns.buckets) == ["b1", "b2", "b1"]
+    assert columns.keys[1] == "k1"
+    assert columns.annotations[0] == annotation("3")
+    assert columns.labels.tolist() == [3, 1, 0]
+
+
+def test_labels_missing():
+    annotations = [annotation(1), "daisy"]
+    columns = ManifestColumns.from_manifest_info(
+        {"buckets": ["b", "b"], "keys": ["k0", "k1"], "annotations": annotations},
+    )
+    assert columns.labels is None
+    assert list(columns.annotations) == annotations
+    assert set(JsonColumn.from_values(["daisy", "rose", "daisy"])) == {"daisy", "rose"}
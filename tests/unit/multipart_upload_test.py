@@ -0,0 +1,128 @@
+import io
+import os
+
+import pytest
+
+from volcengine_ml_platform.io.dir_upload import DirectoryUploader
+from volcengine_ml_platform.io.multipart_upload import MAX_PART_COUNT
+from volcengine_ml_platform.io.multipart_upload import MemoryViewReader
+from volcengine_ml_platform.io.multipart_upload import MIN_PART_SIZE
+from volcengine_ml_platform.io.multipart_upload import MultipartUploader
+from volcengine_ml_platform.io.multipart_upload import plan_parts
+from volcengine_ml_platform.util import cache_dir
+
+MiB = 1024 * 1024
+
+
+def test_plan_parts_covers_whole_file():
+    file_size = 45 * MiB + 1
+    parts = plan_parts(file_size, 20 * MiB)
+    assert [p[0] for p in parts] == [1, 2, 3]
+    assert sum(p[2] for p in parts) == file_size
+    assert parts[-1] == (3, 40 * MiB, 5 * MiB + 1)
+
+
+def test_plan_parts_limits():
+    assert plan_parts(10 * MiB, 1)[0][2] == MIN_PART_SIZE
+    assert len(plan_parts(MAX_PART_COUNT * 30 * MiB, 20 * MiB)) <= MAX_PART_COUNT
+
+
+def test_memory_view_reader():
+    data = bytes(range(256)) * 10
+    reader = MemoryViewReader(memoryview(data)[10:1010])
+    assert len(reader) == 1000
+    assert reader.read(5) == data[10:15]
+    assert reader.seek(0, io.SEEK_END) == 1000
+    reader.seek(0)
+    assert reader.read() == data[10:1010]
+    reader.close()
+
+
+def test_resume_uploads_only_missing_parts(tmp_path, s3_client):
+    data = os.urandom(3 * MIN_PART_SIZE + 100)
+    file_path = tmp_path / "model.bin"
+    file_path.write_bytes(data)
+    checkpoint_path = str(tmp_path / "upload.json")
+    upload_part = s3_client.upload_part
+
+    def flaky_upload_part(**kwargs):
+        if kwargs["PartNumber"] == 3:
+            raise ConnectionError("connection reset")
+        return upload_part(**kwargs)
+
+    s3_client.upload_part = flaky_upload_part
+    uploader = MultipartUploader(s3_client, part_size=MIN_PART_SIZE, max_workers=1)
+    with pytest.raises(ConnectionError):
+        uploader.upload(str(file_path), "bucket", "model.bin", checkpoint_path)
+    assert os.path.exists(checkpoint_path)
+    (upload_id,) = s3_client.uploads
+    # the failure stops the parts that were still queued
+    assert sorted(s3_client.uploads[upload_id]) == [1, 2]
+    # the service lost part 2, ListParts is trusted over the checkpoint
+    del s3_client.uploads[upload_id][2]
+
+    s3_client.upload_part = upload_part
+    s3_client.requests = []
+    uploader.upload(str(file_path), "bucket", "model.bin", checkpoint_path)
+
+    assert sorted(key for op, key in s3_client.requests if op == "upload_part") == [
+        2,
+        3,
+        4,
+    ]
+    assert s3_client.objects["model.bin"] == data
+    assert s3_client.etags["model.bin"].endswith("-4")
+    assert not os.path.exists(checkpoint_path)
+
+
+def test_failure_without_resume_aborts(tmp_path, s3_client, monkeypatch):
+    monkeypatch.setattr(cache_dir, "HOME_DIR", str(tmp_path / "home"))
+    file_path = tmp_path / "model.bin"
+    file_path.write_bytes(os.urandom(3 * MIN_PART_SIZE))
+    upload_part = s3_client.upload_part
+
+    def flaky_upload_part(**kwargs):
+        if kwargs["PartNumber"] == 2:
+            raise ConnectionError("connection reset")
+        return upload_part(**kwargs)
+
+    s3_client.upload_part = flaky_upload_part
+    uploader = MultipartUploader(
+        s3_client,
+        part_size=MIN_PART_SIZE,
+        max_workers=1,
+        resume=False,
+    )
+    with pytest.raises(ConnectionError):
+        uploader.upload(str(file_path), "bucket", "model.bin")
+    assert s3_client.aborted == ["model.bin"]
+    assert s3_client.uploads == {}
+    assert "model.bin" not in s3_client.objects
+    # nothing is left behind to resume from
+    assert not os.path.exists(tmp_path / "home")
+
+
+def test_directory_uploader_resumes_large_files(tmp_path, s3_client, monkeypatch):
+    monkeypatch.setattr(cache_dir, "HOME_DIR", str(tmp_path / "home"))
+    large = os.urandom(2 * MIN_PART_SIZE + 100)
+    (tmp_path / "model.bin").write_bytes(large)
+    (tmp_path / "config.json").write_bytes(b"{}")
+    files = [
+        (str(tmp_path / "model.bin"), "m/model.bin"),
+        (str(tmp_path / "config.json"), "m/config.json"),
+    ]
+    uploader = DirectoryUploader(
+        s3_client,
+        max_workers=2,
+        part_size=MIN_PART_SIZE,
+        max_connections=4,
+        show_progress=False,
+    )
+
+    metrics = uploader.upload(files, "bucket")
+
+    assert metrics.files_done == 2
+    assert metrics.bytes_done == len(large) + 2
+    assert s3_client.objects["m/model.bin"] == large
+    assert s3_client.count("upload_part") == 3
+    assert s3_client.count("upload_file") == 1
@@ -0,0 +1,124 @@
+import os
+
+from volcengine_ml_platform.io import rate_limit
+from volcengine_ml_platform.io.object_cache import ObjectCache
+from volcengine_ml_platform.io.request_policy import RequestPolicy
+
+
+def test_read_through(tmp_path, s3_client):
+    cache = ObjectCache(str(tmp_path), max_bytes=1000)
+    client = s3_client
+    client.objects["a.jpg"] = b"a" * 100
+
+    for _ in range(3):
+        with cache.open(client, "bucket", "a.jpg") as f:
+            assert f.read() == b"a" * 100
+    assert client.count("get_object") == 1
+    assert cache.size() == 100
+
+
+def test_lru_eviction(tmp_path, s3_client):
+    cache = ObjectCache(str(tmp_path), max_bytes=300)
+    client = s3_client
+    client.objects.update({key: b"x" * 100 for key in "abcd"})
+
+    for i, key in enumerate("abc"):
+        path = cache.fetch(client, "bucket", key)
+        os.utime(path, (i, i))
+    # touch "a" so that "b" and "c" become the least recently used entries
+    assert cache.lookup("bucket", "a") is not None
+    cache.fetch(client, "bucket", "d")
+
+    assert cache.lookup("bucket", "b") is None
+    assert cache.lookup("bucket", "c") is None
+    assert cache.lookup("bucket", "a") and cache.lookup("bucket", "d")
+    assert cache.size() == 200
+
+
+def test_client_cache_miss_uses_policy_and_limiter(tmp_path, make_client, s3_client):
+    s3_client.objects["k"] = b"x" * 10
+    get_object = s3_client.get_object
+    failures = [ConnectionError("connection reset")]
+
+    def flaky_get_object(**kwargs):
+        if failures:
+            raise failures.pop()
+        return get_object(**kwargs)
+
+    s3_client.get_object = flaky_get_object
+    limiter = rate_limit.RateLimiter(requests_per_second=1000)
+    requests = []
+    limiter.request = requests.append
+    client = make_client(
+        s3_client,
+        cache=ObjectCache(str(tmp_path), max_bytes=1000),
+        request_policy=RequestPolicy(base_delay=0.001),
+        rate_limiter=limiter,
+    )
+
+    for _ in range(2):
+        with client.get_object("b", "k") as f:
+            assert f.read() == b"x" * 10
+    assert client.request_policy.stats.retries == 1
+    # one throttled request per attempt, none for the cache hit
+    assert requests == [rate_limit.INTERACTIVE] * 2
+    assert s3_client.count("get_object") == 1
+
+
+def test_verified_download_fills_cache(tmp_path, make_client, s3_client):
+    s3_client.objects["k"] = b"x" * 10
+    cache = ObjectCache(str(tmp_path / "cache"), max_bytes=1000)
+    client = make_client(s3_client, cache=cache)
+
+    result = client.download_file_verified(
+        bucket="b",
+        key="k",
+        target_file_path=str(tmp_path / "k"),
+    )
+    assert result.verified
+    assert result.path == str(tmp_path / "k")
+    with client.get_object("b", "k") as f:
+        assert f.read() == b"x" * 10
+    assert s3_client.count("get_object") == 1
+
+
+def test_large_objects_bypass_cache(tmp_path, make_client, s3_client):
+    s3_client.objects["small"] = b"s" * 10
+    s3_client.objects["large"] = b"l" * 600
+    cache = ObjectCache(str(tmp_path / "cache"), max_bytes=1000)
+    client = make_client(s3_client, cache=cache)
+
+    with client.get_object("b", "large") as f:
+        assert f.read() == b"l" * 600
+    assert cache.lookup("b", "large") is None
+
+    for key in ["small", "large"]:
+        path = client.download_file(
+            bucket="b",
+            key=key,
+            target_file_path=str(tmp_path / key),
+        )
+        with open(path, "rb") as f:
+            assert f.read() == s3_client.objects[key]
+    # the large object goes through the normal transfer, not the cache
+    assert s3_client.count("download_file") == 1
+    assert cache.lookup("b", "small") is not None
+    assert cache.lookup("b", "large") is None
+    assert cache.size() == 10
+
+
+def test_bulk_cache_miss_streams(tmp_path, make_client, s3_client):
+    s3_client.objects["k"] = b"x" * 10
+    client = make_client(
+        s3_client,
+        cache=ObjectCache(str(tmp_path / "cache"), max_bytes=1000),
+        request_policy=RequestPolicy(base_delay=0.001),
+    )
+
+    buffered = []
+    client._read_object_response = lambda *args: buffered.append(args)
+
+    with client._open_cached("b", "k", rate_limit.BULK) as f:
+        assert f.read() == b"x" * 10
+    # bulk misses stream into the cache instead of reading the object into memory
+    assert buffered == []
@@ -0,0 +1,32 @@
+import os
+
+import pytest
+
+from volcengine_ml_platform.io.range_download import plan_ranges
+from volcengine_ml_platform.io.range_download import RangeDownloader
+
+
+def test_plan_ranges():
+    assert plan_ranges(0, 10) == []
+    assert plan_ranges(25, 10) == [(0, 0, 9), (1, 10, 19), (2, 20, 24)]
+
+
+def test_resume_fetches_only_missing_ranges(tmp_path, s3_client):
+    data = os.urandom(1000)
+    client = s3_client
+    client.objects["key"] = data
+    client.fail_at = 300
+    target = str(tmp_path / "object.bin")
+    downloader = RangeDownloader(client, range_size=100, max_workers=1)
+
+    with pytest.raises(ConnectionError):
+        downloader.download("bucket", "key", target)
+    assert not os.path.exists(target)
+
+    client.fail_at = None
+    client.ranges = []
+    downloader.download("bucket", "key", target)
+    assert client.ranges == [(300, 399)]
+    with open(target, "rb") as f:
+        assert f.read() == data
+    assert os.listdir(tmp_path) == ["object.bin"]
@@ -0,0 +1,107 @@
+import threading
+import time
+
+from volcengine_ml_platform.io import rate_limit
+from volcengine_ml_platform.io.rate_limit import RateLimiter
+from volcengine_ml_platform.io.rate_limit import TokenBucket
+
+
+def test_token_bucket_rate():
+    bucket = TokenBucket(rate=100, burst=10)
+    start = time.monotonic()
+    for _ in range(30):
+        bucket.acquire(1)
+    # 10 tokens of burst, the remaining 20 arrive at 100 per second
+    assert 0.15 < time.monotonic() - start < 1
+
+
+def test_interactive_goes_first():
+    bucket = TokenBucket(rate=5, burst=1)
+    # leave the bucket in debt so both threads have to wait
+    bucket.acquire(2)
+    order = []
+
+    def _acquire(priority):
+        bucket.acquire(1, priority)
+        order.append(priority)
+
+    bulk = threading.Thread(target=_acquire, args=(rate_limit.BULK,))
+    bulk.start()
+    time.sleep(0.02)
+    interactive = threading.Thread(target=_acquire, args=(rate_limit.INTERACTIVE,))
+    interactive.start()
+    bulk.join()
+    interactive.join()
+    assert order == [rate_limit.INTERACTIVE, rate_limit.BULK]
+
+
+class RecordingLimiter(RateLimiter):
+    def __init__(self):
+        super().__init__()
+        self.calls = []
+
+    def request(self, priority=rate_limit.BULK):
+        self.calls.append(("request", priority))
+
+    def consume(self, nbytes, priority=rate_limit.BULK):
+        self.calls.append(("consume", nbytes, priority))
+
+
+def test_client_uses_registered_limiter(make_client, s3_client):
+    s3_client.objects["k"] = b"x" * 10
+    client = make_client(s3_client, rate_limiter="loader")
+    limiter = RecordingLimiter()
+    rate_limit.register("loader", limiter)
+    try:
+        assert client.get_object("b", "k").read() == b"x" * 10
+    finally:
+        rate_limit.register("loader", None)
+    assert limiter.calls == [
+        ("request", rate_limit.INTERACTIVE),
+        ("consume", 10, rate_limit.INTERACTIVE),
+    ]
+    assert rate_limit.get_limiter("loader") is None
+
+
+def test_limited_client_counts_requests_and_bytes(tmp_path, s3_client):
+    s3_client.objects["k"] = b"x" * 10
+    limiter = RecordingLimiter()
+    client = rate_limit.LimitedClient(s3_client, limiter, rate_limit.INTERACTIVE)
+
+    client.put_object(Bucket="b", Key="p", Body=b"y" * 3)
+    body = client.get_object(Bucket="b", Key="k")["Body"]
+    assert body.read(4) + body.read() == b"x" * 10
+    progress = []
+    client.download_file("b", "k", str(tmp_path / "k"), Callback=progress.append)
+
+    assert limiter.calls == [
+        ("request", rate_limit.INTERACTIVE),
+        ("consume", 3, rate_limit.INTERACTIVE),
+        ("request", rate_limit.INTERACTIVE),
+        ("consume", 4, rate_limit.INTERACTIVE),
+        ("consume", 6, rate_limit.INTERACTIVE),
+        ("request", rate_limit.INTERACTIVE),
+        ("consume", 10, rate_limit.INTERACTIVE),
+    ]
+    assert progress == [10]
+    # attributes that do not send a request pass through
+    assert client.objects is s3_client.objects
+
+
+def test_client_paths_use_limiter(tmp_path, make_client, s3_client):
+    for i in range(3):
+        s3_client.objects[f"data/{i}"] = b"z" * 100
+    limiter = RecordingLimiter()
+    client = make_client(s3_client, rate_limiter=limiter)
+
+    assert len(list(client.iter_objects("b", "data/"))) == 3
+    with client.open("b", "data/0") as f:
+        assert f.read() == b"z" * 100
+    client.sync_down("b", "data/", str(tmp_path))
+    assert client.delete_prefix("b", "data/") == 3
+
+    requests = [call for call in limiter.calls if call[0] == "request"]
+    consumed = sum(call[1] for call in limiter.calls if call[0] == "consume")
+    # list, head + get, list + 3 downloads, list + delete
+    assert len(requests) == 9
+    assert consumed == 100 + 300
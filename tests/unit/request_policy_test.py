@@ -0,0 +1,99 @@
+import socket
+import threading
+import time
+import types
+
+import pytest
+from botocore.exceptions import ClientError
+from botocore.exceptions import EndpointConnectionError
+
+from volcengine_ml_platform.io.request_policy import DeadlineExceeded
+from volcengine_ml_platform.io.request_policy import RequestPolicy
+from volcengine_ml_platform.io.tos import TOSClient
+from volcengine_ml_platform.util import client_pool
+
+
+def test_retry_retryable_errors():
+    policy = RequestPolicy(max_attempts=3, base_delay=0.001)
+    calls = []
+
+    def flaky():
+        calls.append(1)
+        if len(calls) < 3:
+            raise EndpointConnectionError(endpoint_url="http://tos")
+        return b"data"
+
+    assert policy.execute(flaky) == b"data"
+    assert policy.stats.retries == 2
+
+
+def test_do_not_retry_client_errors():
+    policy = RequestPolicy(max_attempts=3, base_delay=0.001)
+    calls = []
+
+    def not_found():
+        calls.append(1)
+        error = {
+            "Error": {"Code": "NoSuchKey"},
+            "ResponseMetadata": {"HTTPStatusCode": 404},
+        }
+        raise ClientError(error, "GetObject")
+
+    with pytest.raises(ClientError):
+        policy.execute(not_found)
+    assert len(calls) == 1
+
+
+def test_hedge_wins_over_slow_request():
+    policy = RequestPolicy(hedge=True, hedge_delay=0.01)
+    release = threading.Event()
+    calls = []
+
+    def sometimes_slow():
+        calls.append(1)
+        if len(calls) == 1:
+            release.wait(5)
+            return b"slow"
+        return b"fast"
+
+    assert policy.execute(sometimes_slow) == b"fast"
+    release.set()
+    assert policy.stats.hedges_fired == 1
+    assert policy.stats.hedges_won == 1
+
+
+def test_deadline():
+    policy = RequestPolicy(deadline=0.05)
+    with pytest.raises(DeadlineExceeded):
+        policy.execute(lambda: time.sleep(0.5))
+    assert policy.stats.deadline_exceeded == 1
+
+
+def test_retry_socket_timeout():
+    # socket.timeout is TimeoutError on Python 3.10+, it is not a deadline
+    policy = RequestPolicy(max_attempts=2, base_delay=0.001, deadline=5)
+    calls = []
+
+    def read_timeout():
+        calls.append(1)
+        if len(calls) == 1:
+            raise socket.timeout("timed out")
+        return b"data"
+
+    assert policy.execute(read_timeout) == b"data"
+    assert policy.stats.retries == 1
+    assert policy.stats.deadline_exceeded == 0
+
+
+def test_deadline_only_times_out_policy_reads():
+    credentials = types.SimpleNamespace(region="cn-beijing", ak="ak", sk="sk")
+    client = TOSClient(
+        credentials,
+        session_token="",
+        cache=False,
+        request_policy=RequestPolicy(deadline=3),
+    )
+    # uploads, listings and bulk transfers keep botocore's default
+    assert client.s3_client.meta.config.read_timeout == 60
+    assert client._policy_s3_client().meta.config.read_timeout == 3
+    client_pool.clear()
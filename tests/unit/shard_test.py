@@ -0,0 +1,34 @@
+import os
+import tarfile
+
+from volcengine_ml_platform.io import shard
+
+
+def make_samples():
+    return {f"img/{i:03d}.jpg": os.urandom(100 + i * 37) for i in range(50)}
+
+
+def test_write_and_read_shards(tmp_path, make_client, s3_client):
+    samples = make_samples()
+    done = []
+    with shard.ShardWriter(
+        str(tmp_path),
+        shard_size=1024,
+        on_shard_done=done.append,
+    ) as writer:
+        for name, data in samples.items():
+            writer.add(name, data)
+
+    assert len(done) == len(writer.index.shards) > 1
+    # shards are plain tar files
+    with tarfile.open(done[0]) as tar:
+        member = tar.getmembers()[0]
+        assert tar.extractfile(member).read() == samples[member.name]
+
+    for name in os.listdir(tmp_path):
+        s3_client.objects[name] = (tmp_path / name).read_bytes()
+    reader = shard.ShardReader(make_client(s3_client), "bucket", "")
+    assert len(reader) == len(samples)
+    for name, data in samples.items():
+        assert reader.read_by_name(name) == data
+    assert dict(reader) == samples
@@ -0,0 +1,51 @@
+import gc
+import os
+
+import pytest
+
+from volcengine_ml_platform.io import stream_upload
+from volcengine_ml_platform.io.stream_upload import MultipartWriter
+
+
+@pytest.fixture
+def small_parts(monkeypatch):
+    monkeypatch.setattr(stream_upload, "MIN_PART_SIZE", 10)
+
+
+def test_small_object_uses_put_object(small_parts, s3_client):
+    client = s3_client
+    with MultipartWriter(client, "b", "k", part_size=10) as f:
+        f.write(b"hello")
+    assert client.objects["k"] == b"hello"
+    assert client.count("upload_part") == 0
+
+
+def test_multipart_upload(small_parts, s3_client):
+    client = s3_client
+    data = os.urandom(95)
+    with MultipartWriter(client, "b", "k", part_size=10, max_workers=2) as f:
+        for i in range(0, len(data), 7):
+            f.write(data[i : i + 7])
+        assert f.tell() == 95
+    assert client.objects["k"] == data
+    assert client.count("upload_part") == 10
+
+
+def test_abort_on_error(small_parts, s3_client):
+    client = s3_client
+    with pytest.raises(RuntimeError):
+        with MultipartWriter(client, "b", "k", part_size=10) as f:
+            f.write(os.urandom(25))
+            raise RuntimeError("serialization failed")
+    assert client.aborted == ["k"]
+    assert "k" not in client.objects
+
+
+def test_unclosed_writer_aborts(small_parts, s3_client):
+    client = s3_client
+    f = MultipartWriter(client, "b", "k", part_size=10)
+    f.write(os.urandom(25))
+    del f
+    gc.collect()
+    assert client.aborted == ["k"]
+    assert "k" not in client.objects
@@ -0,0 +1,89 @@
+import hashlib
+import os
+
+from volcengine_ml_platform.io import sync
+
+MiB = 1024 * 1024
+
+
+def test_compute_etag(tmp_path):
+    data = os.urandom(12 * MiB)
+    path = tmp_path / "weights.bin"
+    path.write_bytes(data)
+
+    assert sync.compute_etag(str(path)) == hashlib.md5(data).hexdigest()
+    parts = hashlib.md5(
+        hashlib.md5(data[: 8 * MiB]).digest() + hashlib.md5(data[8 * MiB :]).digest()
+    )
+    assert sync.compute_etag(str(path), '"xxx-2"') == f"{parts.hexdigest()}-2"
+
+
+def test_sync_down_transfers_only_changed(tmp_path, monkeypatch, s3_client):
+    monkeypatch.setattr(sync.cache_dir, "HOME_DIR", str(tmp_path / "home"))
+    local_dir = str(tmp_path / "data")
+    client = s3_client
+    client.objects.update({"ds/a.jpg": b"a", "ds/sub/b.jpg": b"b"})
+
+    result = sync.sync_down(client, "bucket", "ds/", local_dir)
+    assert (result.transferred, result.skipped) == (2, 0)
+
+    client.objects["ds/a.jpg"] = b"changed"
+    client.requests = []
+
+    def _rehash(*args):
+        raise AssertionError("etags hashed while downloading are cached")
+
+    # the unchanged file is compared with the hash recorded by the download
+    monkeypatch.setattr(sync, "compute_etag", _rehash)
+    result = sync.sync_down(client, "bucket", "ds/", local_dir)
+    assert (result.transferred, result.skipped) == (1, 1)
+    assert client.requests[-1] == ("get_object", "ds/a.jpg")
+    assert client.count("get_object") == 1
+
+
+def test_sync_up_uploads_only_changed(tmp_path, monkeypatch, s3_client):
+    monkeypatch.setattr(sync.cache_dir, "HOME_DIR", str(tmp_path / "home"))
+    local_dir = tmp_path / "model"
+    (local_dir / "sub").mkdir(parents=True)
+    (local_dir / "a.bin").write_bytes(b"a")
+    (local_dir / "sub" / "b.bin").write_bytes(b"b")
+
+    def _sync():
+        files = [
+            (str(local_dir / "a.bin"), "up/a.bin"),
+            (str(local_dir / "sub" / "b.bin"), "up/sub/b.bin"),
+        ]
+        return sync.sync_up(s3_client, str(local_dir), files, "bucket", "up/")
+
+    result = _sync()
+    assert (result.transferred, result.skipped) == (2, 0)
+    assert s3_client.objects == {"up/a.bin": b"a", "up/sub/b.bin": b"b"}
+
+    result = _sync()
+    assert (result.transferred, result.skipped) == (0, 2)
+    assert s3_client.count("upload_file") == 2
+
+    (local_dir / "a.bin").write_bytes(b"changed")
+    result = _sync()
+    assert (result.transferred, result.skipped) == (1, 1)
+    assert s3_client.requests[-1] == ("upload_file", "up/a.bin")
+    assert s3_client.objects["up/a.bin"] == b"changed"
+
+
+def test_hash_cache_checks_part_count(tmp_path, monkeypatch):
+    monkeypatch.setattr(sync.cache_dir, "HOME_DIR", str(tmp_path / "home"))
+    path = tmp_path / "weights.bin"
+    path.write_bytes(b"w")
+    hash_cache = sync.HashCache(str(tmp_path))
+    hash_cache.put(str(path), os.stat(str(path)), "cached-2")
+    computed = []
+
+    def _compute_etag(file_path, remote_etag=""):
+        computed.append(remote_etag)
+        return "computed-3"
+
+    monkeypatch.setattr(sync, "compute_etag", _compute_etag)
+    assert hash_cache.etag(str(path), '"remote-2"') == "cached-2"
+    assert computed == []
+    assert hash_cache.etag(str(path), '"remote-3"') == "computed-3"
+    assert computed == ['"remote-3"']
@@ -0,0 +1,249 @@
+import os
+
+from volcengine_ml_platform.io import adaptive_concurrency
+from volcengine_ml_platform.io import rate_limit
+from volcengine_ml_platform.io.process_transfer import ProcessDownloader
+from volcengine_ml_platform.util import client_pool
+
+
+def put_keys(s3_client, keys):
+    """stores every key with its own name as the content"""
+    s3_client.objects.update({key: key.encode("utf-8") for key in keys})
+    return s3_client
+
+
+def test_download_dir(tmp_path, make_client, s3_client):
+    keys = ["model/1/", "model/1/empty/", "model/1/sub/deep/w.bin"]
+    keys += [f"model/1/shards/{i:04d}" for i in range(2100)]
+    put_keys(s3_client, keys)
+
+    make_client(s3_client).download_dir("bucket", "model/1/", "model/1/", tmp_path)
+
+    assert s3_client.count("download_file") == 2101
+    listings = [key for op, key in s3_client.requests if op == "list_objects"]
+    assert all(delimiter is None for _, delimiter in listings)
+    assert len(os.listdir(tmp_path / "shards")) == 2100
+    assert (tmp_path / "sub" / "deep" / "w.bin").read_text() == "model/1/sub/deep/w.bin"
+    assert (tmp_path / "empty").is_dir()
+
+
+def test_download_dir_sizes_pool(tmp_path, make_client, s3_client, monkeypatch):
+    put_keys(s3_client, [f"data/{i}" for i in range(20)])
+    pools = []
+    pooled_client = client_pool.s3_client
+
+    def _pooled_client(max_pool_connections, **config):
+        pools.append(max_pool_connections)
+        return pooled_client(max_pool_connections, **config)
+
+    monkeypatch.setattr(client_pool, "s3_client", _pooled_client)
+    configs = []
+    download_file = s3_client.download_file
+
+    def _download_file(*args, Config=None, **kwargs):
+        configs.append(Config)
+        return download_file(*args, Config=Config, **kwargs)
+
+    s3_client.download_file = _download_file
+
+    client = make_client(s3_client)
+    client.download_dir("bucket", "data/", "data/", tmp_path, max_workers=16)
+
+    assert pools == [16]
+    assert len(configs) == 20
+    # one connection per file, the workers already run in parallel
+    assert not any(config.use_threads for config in configs)
+
+
+def test_upload_dir(tmp_path, make_client, s3_client):
+    local_dir = tmp_path / "model"
+    (local_dir / "variables").mkdir(parents=True)
+    (local_dir / "saved_model.pb").write_bytes(b"x" * 10)
+    (local_dir / "variables" / "variables.data").write_bytes(b"x" * 1000)
+    (local_dir / "variables" / "variables.index").write_bytes(b"x")
+    metrics = []
+
+    tos_path = make_client(s3_client).upload(
+        str(local_dir), "bucket", "repo/", progress_callback=metrics.append
+    )
+
+    assert tos_path == "tos://bucket/repo/model/"
+    assert sorted(s3_client.objects) == [
+        "repo/model/saved_model.pb",
+        "repo/model/variables/variables.data",
+        "repo/model/variables/variables.index",
+    ]
+    assert metrics[-1].files_done == 3
+    assert metrics[-1].bytes_done == metrics[-1].bytes_total == 1011
+
+
+def test_upload_dir_budgets_connections(tmp_path, make_client, s3_client):
+    configs = []
+    upload_file = s3_client.upload_file
+
+    def _upload_file(*args, Config=None, **kwargs):
+        configs.append(Config)
+        return upload_file(*args, Config=Config, **kwargs)
+
+    s3_client.upload_file = _upload_file
+    client = make_client(s3_client, max_pool_connections=8)
+
+    def _upload(count):
+        local_dir = tmp_path / f"data{count}"
+        local_dir.mkdir()
+        for i in range(count):
+            (local_dir / f"{i}.bin").write_bytes(b"x" * i)
+        configs.clear()
+        client.upload(str(local_dir), "bucket", "")
+        assert len(configs) == count
+        return {config.max_request_concurrency for config in configs}
+
+    # a lone checkpoint gets the whole pool for its parts
+    assert _upload(1) == {8}
+    assert _upload(2) == {4}
+    # many files, one part each, never more than the pool in flight
+    assert _upload(20) == {1}
+
+
+def test_delete_prefix(make_client, s3_client):
+    keys = [f"data/{i:05d}" for i in range(2500)] + ["other/a"]
+    put_keys(s3_client, keys)
+
+    deleted = make_client(s3_client).delete_prefix("bucket", "data/")
+
+    assert deleted == 2500
+    assert sorted(len(batch) for batch in s3_client.delete_batches) == [500, 1000, 1000]
+
+
+def test_iter_download_files(tmp_path, make_client, s3_client):
+    keys = [f"data/{i:05d}.jpg" for i in range(500)]
+    put_keys(s3_client, keys)
+    consumed = []
+
+    def key_stream():
+        for key in keys:
+            consumed.append(key)
+            yield key
+
+    paths = make_client(s3_client).iter_download_files(
+        bucket="bucket",
+        keys=key_stream(),
+        target_dir_path=str(tmp_path),
+        parallelism=4,
+        ordered=True,
+    )
+    first = next(paths)
+    assert first == os.path.join(str(tmp_path), keys[0])
+    # only a bounded number of keys is read ahead of the consumer
+    assert len(consumed) <= 4 * 2 + 1
+    assert [first] + list(paths) == [os.path.join(str(tmp_path), k) for k in keys]
+
+
+def test_adaptive_download_counts_bytes_in_slot(
+    tmp_path, monkeypatch, make_client, s3_client
+):
+    keys = [f"data/{i}" for i in range(20)]
+    s3_client.objects.update({key: b"x" * 100 for key in keys})
+    configs = []
+    download_file = s3_client.download_file
+
+    def _download_file(*args, Config=None, **kwargs):
+        configs.append(Config)
+        return download_file(*args, Config=Config, **kwargs)
+
+    s3_client.download_file = _download_file
+    counted = []
+    release = adaptive_concurrency.AdaptiveConcurrency.release
+
+    def _release(self, latency=None, throttled=False):
+        # bytes seen by the window when the slot is given back
+        counted.append(self._bytes)
+        release(self, latency, throttled)
+
+    monkeypatch.setattr(adaptive_concurrency.AdaptiveConcurrency, "release", _release)
+
+    paths = make_client(s3_client).download_files(
+        bucket="bucket",
+        keys=keys,
+        target_dir_path=str(tmp_path),
+        parallelism=4,
+        adaptive=True,
+    )
+
+    assert len(paths) == 20
+    assert max(counted) == 20 * 100
+    assert {config.max_request_concurrency for config in configs} == {1}
+
+
+def test_process_downloader(tmp_path, make_client, s3_client):
+    keys = [f"data/{i:04d}.txt" for i in range(300)]
+    # forked workers re-create their client through the pool and get the same fake
+    client = make_client(put_keys(s3_client, keys))
+    tasks = (
+        {"bucket": "bucket", "key": key, "target_dir_path": str(tmp_path)}
+        for key in keys
+    )
+    reports = []
+    downloader = ProcessDownloader(
+        client,
+        processes=2,
+        threads_per_process=4,
+        batch_size=32,
+        start_method="fork",
+        progress_callback=reports.append,
+    )
+
+    paths = list(downloader.download(tasks))
+
+    assert paths == [os.path.join(str(tmp_path), key) for key in keys]
+    assert downloader.metrics.files_done == 300
+    assert downloader.metrics.bytes_done == sum(len(key) for key in keys)
+    assert len(reports) == 10
+    assert reports[-1].files_done == 300
+
+
+def test_process_downloader_splits_rate_limit(make_client):
+    limiter = rate_limit.RateLimiter(bytes_per_second=1000, requests_per_second=40)
+    client = make_client(rate_limiter=limiter)
+
+    worker_client = ProcessDownloader(client, processes=4)._worker_client()
+
+    assert worker_client.rate_limiter.bytes_per_second == 250
+    assert worker_client.rate_limiter.requests_per_second == 10
+    assert client.rate_limiter is limiter
+
+
+def test_download_files_reports_progress(tmp_path, make_client, s3_client):
+    keys = [f"data/{i}" for i in range(20)]
+    reports = []
+
+    make_client(put_keys(s3_client, keys)).download_files(
+        bucket="bucket",
+        keys=keys,
+        target_dir_path=str(tmp_path),
+        parallelism=4,
+        progress_callback=reports.append,
+    )
+
+    assert reports[-1].files_done == 20
+    assert reports[-1].bytes_done == sum(len(key) for key in keys)
+
+
+def test_download_file_verify_returns_path(tmp_path, make_client, s3_client):
+    s3_client.objects["k"] = b"x" * 10
+    client = make_client(s3_client)
+    target = str(tmp_path / "k")
+
+    assert client.download_file(bucket="b", key="k", target_file_path=target) == target
+    path = client.download_file(
+        bucket="b",
+        key="k",
+        target_file_path=target,
+        verify=True,
+    )
+    assert path == target
+    assert client.download_file_verified(
+        bucket="b",
+        key="k",
+        target_file_path=target,
+    ).verified
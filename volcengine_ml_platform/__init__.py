@@ -26,9 +26,10 @@ def set_session_token(token):
 
 
 def get_tos_endpoint_url():
-    return constant.TOS_REGION_ENDPOINT_URLS[get_env_name()][
-        EnvHolder.get_credentials().region
-    ]
+    return constant.get_tos_endpoint_url(
+        get_env_name(),
+        EnvHolder.get_credentials().region,
+    )
 
 
 def get_service_host():
@@ -0,0 +1,237 @@
+"""解析清单时把标注编译为稠密的 NumPy 数组，训练时按下标取标签，不再逐个样本解析标注
+
+- ``class_ids``: 每个样本的类别 id（第一个标签），没有标签时为 -1
+- ``labels``: 全部样本的标签拼接为一个数组，第 i 个样本的标签为
+  ``labels[label_offsets[i]:label_offsets[i + 1]]``，multi-hot 向量在取样本时生成
+- ``boxes``: 全部样本的检测框拼接为 ``(框数, 4)`` 的数组，第 i 个样本的框为
+  ``boxes[box_offsets[i]:box_offsets[i + 1]]``，``box_class_ids`` 为每个框的类别 id
+"""
+import array
+from typing import List
+from typing import Optional
+
+import numpy as np
+
+from volcengine_ml_platform.annotation.ttypes import AnnotationDataType
+
+CLASS_ID = "class_id"
+MULTI_HOT = "multi_hot"
+BOXES = "boxes"
+TARGET_TYPES = (CLASS_ID, MULTI_HOT, BOXES)
+
+# numeric labels are used as class ids only below this, larger values are
+# treated as names so a stray label cannot blow up the number of classes
+MAX_NUMERIC_CLASS_ID = 65535
+
+
+def get_result_labels(annotation_result):
+    """一个标注结果中的全部标签，与 ``Annotation._get_labels`` 一致，缺少 Type 时取 Label"""
+    labels = []
+    for data in annotation_result.get("Data") or []:
+        data_type = data.get("Type")
+        if data_type == AnnotationDataType.MultipleSelector:
+            labels.extend(data.get("Labels") or [])
+        elif data.get("Label") is not None:
+            labels.append(data["Label"])
+    return labels
+
+
+def _bbox_values(bbox):
+    """检测框按原顺序保存的 4 个数，``bbox`` 可以是 list 或 dict"""
+    values = bbox.values() if isinstance(bbox, dict) else bbox
+    values = [float(v) for v in values]
+    if len(values) != 4:
+        raise ValueError(f"bbox should have 4 values, got {bbox}")
+    return values
+
+
+def _numeric_id(name):
+    try:
+        value = int(name)
+    except ValueError:
+        return None
+    # "07" and "7" would otherwise share one id
+    if value < 0 or value > MAX_NUMERIC_CLASS_ID or str(value) != name:
+        return None
+    return value
+
+
+class CompiledLabels:
+    """编译后的标注
+
+    Attributes:
+        classes(list): 类别名，类别 id 为其下标
+        class_ids(np.ndarray): ``int64``，每个样本的类别 id
+        labels(np.ndarray): ``int64``，全部样本的类别 id
+        label_offsets(np.ndarray): ``int64``，长度为样本数加一
+        boxes(np.ndarray): ``float32``，``(框数, 4)``
+        box_class_ids(np.ndarray): ``int64``，每个框的类别 id
+        box_offsets(np.ndarray): ``int64``，长度为样本数加一
+
+    """
+
+    def __init__(
+        self,
+        classes,
+        class_ids,
+        labels,
+        label_offsets,
+        boxes,
+        box_class_ids,
+        box_offsets,
+    ):
+        self.classes = classes
+        self.class_ids = class_ids
+        self.labels = labels
+        self.label_offsets = label_offsets
+        self.boxes = boxes
+        self.box_class_ids = box_class_ids
+        self.box_offsets = box_offsets
+
+    def __len__(self):
+        return len(self.class_ids)
+
+    @property
+    def num_classes(self):
+        return len(self.classes)
+
+    def all_labeled(self):
+        """是否每个样本都有类别 id"""
+        return bool(np.all(self.class_ids >= 0))
+
+    def labels_of(self, index):
+        """第 ``index`` 个样本的全部类别 id"""
+        start = int(self.label_offsets[index])
+        end = int(self.label_offsets[index + 1])
+        return self.labels[start:end]
+
+    def multi_hot_of(self, index):
+        """第 ``index`` 个样本长度为类别数的 ``uint8`` 0/1 向量"""
+        row = np.zeros(self.num_classes, dtype=np.uint8)
+        row[self.labels_of(index)] = 1
+        return row
+
+    def boxes_of(self, index):
+        """第 ``index`` 个样本的检测框与其类别 id"""
+        start = int(self.box_offsets[index])
+        end = int(self.box_offsets[index + 1])
+        return self.boxes[start:end], self.box_class_ids[start:end]
+
+    def target(self, index, target_type=CLASS_ID):
+        """第 ``index`` 个样本 ``target_type`` 类型的标签
+
+        Args:
+            index(int): 样本下标
+            target_type(str): ``class_id``、``multi_hot`` 或 ``boxes``
+
+        Returns:
+            ``class_id`` 返回 int，``multi_hot`` 返回 np.ndarray，
+            ``boxes`` 返回检测框与其类别 id 组成的 tuple
+        """
+        if target_type == CLASS_ID:
+            return int(self.class_ids[index])
+        if target_type == MULTI_HOT:
+            return self.multi_hot_of(index)
+        if target_type == BOXES:
+            return self.boxes_of(index)
+        raise ValueError(f"unknown target_type {target_type}, expect {TARGET_TYPES}")
+
+
+class AnnotationCompiler:
+    """逐个样本收集标注，``compile`` 时生成 ``CompiledLabels``
+
+    未指定 ``classes`` 时，不超过 ``MAX_NUMERIC_CLASS_ID`` 的非负整数标签以标签本身作为类别 id，
+    其他标签按名字排序后依次排在最大的整数 id 之后，加入新的标签名不会改变已有整数标签的 id。
+
+    Args:
+        classes(list): 类别名，类别 id 为其下标；标注中出现其他标签时 ``compile`` 抛出 ValueError
+
+    """
+
+    def __init__(self, classes: Optional[List[str]] = None):
+        self.classes = None if classes is None else [str(c) for c in classes]
+        # labels get provisional ids in order of appearance, remapped in compile
+        self._names = []
+        self._name_ids = {}
+        self._labels = array.array("q")
+        self._label_offsets = array.array("q", [0])
+        self._boxes = array.array("d")
+        self._box_labels = array.array("q")
+        self._box_offsets = array.array("q", [0])
+
+    def __len__(self):
+        return len(self._label_offsets) - 1
+
+    def _label_id(self, label):
+        name = str(label)
+        label_id = self._name_ids.get(name)
+        if label_id is None:
+            label_id = self._name_ids[name] = len(self._names)
+            self._names.append(name)
+        return label_id
+
+    def add(self, annotation):
+        """添加一个样本的标注，没有 ``Result`` 的标注视为没有标签"""
+        results = []
+        if isinstance(annotation, dict):
+            results = annotation.get("Result") or []
+        for result in results:
+            label_ids = [self._label_id(label) for label in get_result_labels(result)]
+            self._labels.extend(label_ids)
+            bbox = result.get("Bbox")
+            if bbox is not None:
+                self._boxes.extend(_bbox_values(bbox))
+                self._box_labels.append(label_ids[0] if label_ids else -1)
+        self._label_offsets.append(len(self._labels))
+        self._box_offsets.append(len(self._box_labels))
+
+    def _resolve_classes(self):
+        """返回最终的类别名与临时 id 到类别 id 的映射"""
+        if self.classes is not None:
+            class_ids = {name: i for i, name in enumerate(self.classes)}
+            unknown = [name for name in self._names if name not in class_ids]
+            if unknown:
+                raise ValueError(f"labels {unknown} are not in classes")
+            return self.classes, [class_ids[name] for name in self._names]
+        ids = [_numeric_id(name) for name in self._names]
+        max_id = max((i for i in ids if i is not None), default=-1)
+        classes = [str(i) for i in range(max_id + 1)]
+        # names never shift the numeric ids, they are appended after them
+        names = sorted(name for name, i in zip(self._names, ids) if i is None)
+        class_ids = {name: len(classes) + i for i, name in enumerate(names)}
+        classes.extend(names)
+        return classes, [
+            class_ids[name] if i is None else i for name, i in zip(self._names, ids)
+        ]
+
+    def compile(self):
+        classes, remap = self._resolve_classes()
+        # the trailing -1 maps the -1 of unlabeled boxes to itself
+        remap = np.array(remap + [-1], dtype=np.int64)
+        labels = remap[np.array(self._labels, dtype=np.int64)]
+        offsets = np.array(self._label_offsets, dtype=np.int64)
+        counts = np.diff(offsets)
+
+        class_ids = np.full(len(counts), -1, dtype=np.int64)
+        labeled = counts > 0
+        class_ids[labeled] = labels[offsets[:-1][labeled]]
+
+        boxes = np.array(self._boxes, dtype=np.float32).reshape(-1, 4)
+        box_class_ids = remap[np.array(self._box_labels, dtype=np.int64)]
+        return CompiledLabels(
+            classes,
+            class_ids,
+            labels,
+            offsets,
+            boxes,
+            box_class_ids,
+            np.array(self._box_offsets, dtype=np.int64),
+        )
+
+
+def compile_annotations(annotations, classes: Optional[List[str]] = None):
+    """编译一组标注，返回 ``CompiledLabels``"""
+    compiler = AnnotationCompiler(classes)
+    for annotation in annotations:
+        compiler.add(annotation)
+    return compiler.compile()
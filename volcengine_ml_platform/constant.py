@@ -19,11 +19,13 @@ TOS_REGION_ENDPOINT_URLS = {
         "cn-north-1": "http://boe-s3-official-test.volces.com",
         "cn-north-4": "http://boe-s3-official-test.volces.com",
     },
-    PROD_ENV: {
-        "cn-qingdao": volce_util.get_tos_endpoint("cn-qingdao"),
-        "cn-north-1": volce_util.get_tos_endpoint("cn-qingdao"),
-        "cn-beijing": volce_util.get_tos_endpoint("cn-beijing"),
-    },
+}
+# PROD endpoints depend on whether we run in the volcengine intranet, which
+# needs a DNS probe, so they are resolved on first use by get_tos_endpoint_url
+PROD_TOS_REGIONS = {
+    "cn-qingdao": "cn-qingdao",
+    "cn-north-1": "cn-qingdao",
+    "cn-beijing": "cn-beijing",
 }
 
 PUBLIC_EXAMPLES_TOS_REGION = "cn-beijing"
@@ -43,3 +45,9 @@ MODULE_MODEL_REPO = "modelrepo"
 
 def get_public_examples_readonly_bucket():
     return PUBLIC_EXAMPLES_TOS_BUCKET
+
+
+def get_tos_endpoint_url(env_name, region):
+    if env_name == PROD_ENV:
+        return volce_util.get_tos_endpoint(PROD_TOS_REGIONS[region])
+    return TOS_REGION_ENDPOINT_URLS[env_name][region]
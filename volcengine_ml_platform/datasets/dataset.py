@@ -1,6 +1,7 @@
 """提供数据集下载，分裂操作
 
 """
+import collections
 import json
 import logging
 import os
@@ -10,6 +11,8 @@ from typing import Optional
 from typing import Tuple
 
 from volcengine_ml_platform import constant
+from volcengine_ml_platform.datasets import manifest_index
+from volcengine_ml_platform.datasets.manifest_index import ManifestWriter
 from volcengine_ml_platform.io import tos
 from volcengine_ml_platform.openapi import dataset_client
 
@@ -141,7 +144,17 @@ class _Dataset:
         manifest_keyword: str,
         limit=-1,
     ):
+        """逐行读取远端清单并流式下载数据，每下载完一条就追加到本地清单
 
+        清单的读取、解析与下载通过有界队列衔接，内存占用与清单大小无关；
+        本地清单按远端清单的顺序写入，下载完成前已经写入的条目即可使用，
+        完成后在清单旁写出行偏移索引。
+
+        Args:
+            manifest_keyword(str): 数据链接在清单 ``Data`` 中的字段名
+            limit(int): 最多下载的条目数，-1 表示不限制
+
+        """
         print("Downloading the mainfest file ...")
         self._get_detail()
 
@@ -149,34 +162,32 @@ class _Dataset:
             tos_url=self._get_storage_path(),
             target_dir_path=self.local_path,
         )
-        manifest_line = []
-        urls = []
-        with open(manifest_file_path, encoding="utf-8") as f:
-            for seqNum, line in enumerate(f.readlines()):
-                manifest_line.append(json.loads(line))
-                urls.append(manifest_line[seqNum]["Data"][manifest_keyword])
-                if limit != -1 and seqNum + 1 >= limit:
-                    break
+        # parsed lines of the downloads in flight, in manifest order
+        pending = collections.deque()
 
-        print("Downloading datasets ...")
-        paths = self.tos_client.download_files(
-            tos_urls=urls,
-            target_dir_path=self.local_path,
-            parallelism=10,
-        )
+        def _iter_urls(f):
+            for seq_num, line in enumerate(f):
+                if limit != -1 and seq_num >= limit:
+                    return
+                manifest_line = json.loads(line)
+                pending.append(manifest_line)
+                yield manifest_line["Data"][manifest_keyword]
 
-        # create a new thread to consume new local maifest file
-        print("Generating the local mainfest file...")
-        manifest_str = ""
-        for idx, path in enumerate(paths):
-            manifest_line[idx]["Data"]["FilePath"] = path
-            manifest_str += json.dumps(manifest_line[idx]) + "\n"
-        with open(
+        print("Downloading datasets ...")
+        with open(manifest_file_path, encoding="utf-8") as f, ManifestWriter(
             self._manifest_path(),
-            "w",
-            encoding="utf-8",
-        ) as new_manifest_file:
-            new_manifest_file.write(manifest_str)
+        ) as local_manifest:
+            paths = self.tos_client.iter_download_files(
+                tos_urls=_iter_urls(f),
+                target_dir_path=self.local_path,
+                parallelism=10,
+                ordered=True,
+            )
+            for path in paths:
+                manifest_line = pending.popleft()
+                manifest_line["Data"]["FilePath"] = path
+                local_manifest.write(manifest_line)
+        self.data_count = len(local_manifest)
         print("Update the local mainfest file successful")
         self.created = True
 
@@ -195,17 +206,13 @@ class _Dataset:
             return [self.tabular_path], None
         paths = []
         annotations = []
-
-        with open(self._manifest_path(), encoding="utf-8") as f:
-            for i, line in enumerate(f):
-                manifest_line = json.loads(line)
-                if i < offset:
-                    continue
-                if limit != -1 and i >= offset + limit:
-                    break
-                file_path = manifest_line["data"]["FilePath"]
-                paths.append(file_path)
-                annotations.append(manifest_line["annotation"])
+        for manifest_line in manifest_index.iter_lines(
+            self._manifest_path(),
+            offset,
+            limit,
+        ):
+            paths.append(manifest_line["Data"]["FilePath"])
+            annotations.append(manifest_line["Annotation"])
 
         return paths, annotations
 
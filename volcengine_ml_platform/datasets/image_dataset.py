@@ -1,16 +1,42 @@
+import array
 import json
 import math
 import os
+import tempfile
 from collections.abc import Callable
+from typing import List
 from typing import Optional
 
 import numpy as np
-from PIL import Image
 
 from volcengine_ml_platform import constant
+from volcengine_ml_platform.annotation import compiler
+from volcengine_ml_platform.datasets import manifest_index
 from volcengine_ml_platform.datasets.dataset import _Dataset
 from volcengine_ml_platform.datasets.dataset import dataset_copy_file
-from volcengine_ml_platform.io.tos_dataset import TorchTOSDataset
+from volcengine_ml_platform.datasets.manifest_index import ManifestWriter
+from volcengine_ml_platform.io import shard
+from volcengine_ml_platform.io import tos
+from volcengine_ml_platform.io.manifest_columns import ManifestColumnsBuilder
+
+SHARD_MANIFEST_NAME = "manifest.jsonl"
+MANIFEST_READ_SIZE = 1024 * 1024
+
+
+def _iter_body_lines(body, chunk_size=MANIFEST_READ_SIZE):
+    """按块读取对象内容并逐行产出，内存中只保留一个块与未读完的一行"""
+    pending = b""
+    while True:
+        chunk = body.read(chunk_size)
+        if not chunk:
+            break
+        lines = (pending + chunk).split(b"\n")
+        pending = lines.pop()
+        for line in lines:
+            if line.strip():
+                yield line
+    if pending.strip():
+        yield pending
 
 
 class ImageDataset(_Dataset):
@@ -43,6 +69,7 @@ class ImageDataset(_Dataset):
             self.local_path = local_path
         self._create_manifest_dataset(
             manifest_keyword="ImageURL",
+            limit=limit,
         )
 
     def split(self, training_dir: str, testing_dir: str, ratio=0.8, random_state=0):
@@ -100,16 +127,8 @@ class ImageDataset(_Dataset):
             testing_dir,
             constant.DATASET_LOCAL_METADATA_FILENAME,
         )
-        with open(
-            test_metadata_path,
-            mode="w",
-            encoding="utf-8",
-        ) as testing_manifest_file:
-            with open(
-                train_metadata_path,
-                mode="w",
-                encoding="utf-8",
-            ) as training_manifest_file:
+        with ManifestWriter(test_metadata_path) as testing_manifest_file:
+            with ManifestWriter(train_metadata_path) as training_manifest_file:
                 index = 0
                 with open(self._manifest_path(), encoding="utf-8") as f:
                     for line in f:
@@ -120,16 +139,14 @@ class ImageDataset(_Dataset):
                                 self.local_path,
                                 testing_dir,
                             )
-                            json.dump(manifest_line, testing_manifest_file)
-                            testing_manifest_file.write("\n")
+                            testing_manifest_file.write(manifest_line)
                         else:
                             dataset_copy_file(
                                 manifest_line,
                                 self.local_path,
                                 training_dir,
                             )
-                            json.dump(manifest_line, training_manifest_file)
-                            training_manifest_file.write("\n")
+                            training_manifest_file.write(manifest_line)
                         index = index + 1
 
         train_dataset.created = True
@@ -147,49 +164,176 @@ class ImageDataset(_Dataset):
             np array of images
             list of annotations
         """
+        from PIL import Image
+
         images = []
         annotations = []
-
-        with open(self._manifest_path(), encoding="utf-8") as f:
-            for i, line in enumerate(f):
-                manifest_line = json.loads(line)
-                if i < offset:
-                    continue
-                if limit != -1 and i >= offset + limit:
-                    break
-                file_path = manifest_line["Data"]["FilePath"]
-                image = Image.open(file_path)
-                images.append(np.asarray(image))
-                annotations.append(manifest_line["Annotation"])
+        for manifest_line in manifest_index.iter_lines(
+            self._manifest_path(),
+            offset,
+            limit,
+        ):
+            image = Image.open(manifest_line["Data"]["FilePath"])
+            images.append(np.asarray(image))
+            annotations.append(manifest_line["Annotation"])
 
         return np.array(images), annotations
 
-    def parse_image_manifest(self, manifest_file_path):
-        # parse manifest
-        manifest_info = {"buckets": [], "keys": [], "annotations": []}
+    def parse_image_manifest(self, manifest_file_path, classes=None):
+        """解析清单为列式的 ``ManifestColumns``，标注同时编译为标签数组
+
+        Args:
+            manifest_file_path(str): 本地清单文件路径
+            classes(list): 类别名，类别 id 为其下标，见 ``AnnotationCompiler``
+        """
+        builder = ManifestColumnsBuilder(classes)
         with open(manifest_file_path, encoding="utf-8") as f:
-            for _, line in enumerate(f):
+            for line in f:
                 manifest_line = json.loads(line)
                 url = manifest_line["Data"]["ImageURL"]
                 bucket = url.split("//")[1].split("/")[0]
                 key = url.split(f"{bucket}/")[1]
-                manifest_info["buckets"].append(bucket)
-                manifest_info["keys"].append(key)
-                manifest_info["annotations"].append(
-                    manifest_line["Annotation"],
+                builder.add(bucket, key, manifest_line["Annotation"])
+        return builder.build()
+
+    def publish_shards(self, tos_url: str, shard_size=shard.DEFAULT_SHARD_SIZE):
+        """把已下载到本地的数据集打包为分片并上传
+
+        图片按 manifest 的顺序写入约 ``shard_size`` 大小的 tar 分片，每写完一个分片就上传；
+        ``tos_url`` 下同时上传分片索引与带有样本名的 manifest，
+        可以通过 ``init_torch_shard_dataset`` 读取。
+
+        Args:
+            tos_url(str): 分片数据集的 tos 链接前缀，比如 ``tos://bucket/datasets/shards/``
+            shard_size(int): 单个分片的目标大小，默认为 256 MiB
+
+        Returns:
+            分片的索引 ``ShardIndex``
+        """
+        if not self.created:
+            raise Exception("datasets has not been created")
+        bucket, prefix = tos.parse_tos_url(tos_url)
+        if prefix and not prefix.endswith("/"):
+            prefix += "/"
+
+        with tempfile.TemporaryDirectory() as work_dir:
+            manifest_path = os.path.join(work_dir, SHARD_MANIFEST_NAME)
+            with open(self._manifest_path(), encoding="utf-8") as src, open(
+                manifest_path,
+                "w",
+                encoding="utf-8",
+            ) as dst:
+
+                def _files():
+                    for line in src:
+                        manifest_line = json.loads(line)
+                        file_path = manifest_line["Data"]["FilePath"]
+                        name = os.path.relpath(file_path, self.local_path)
+                        manifest_line["Data"]["ShardSample"] = name
+                        json.dump(manifest_line, dst)
+                        dst.write("\n")
+                        yield file_path, name
+
+                index = shard.pack_and_upload(
+                    self.tos_client,
+                    _files(),
+                    bucket,
+                    prefix,
+                    work_dir,
+                    shard_size,
                 )
-        return manifest_info
+            self.tos_client.upload_file(
+                manifest_path,
+                bucket,
+                prefix + SHARD_MANIFEST_NAME,
+            )
+        return index
+
+    def init_torch_shard_dataset(
+        self,
+        tos_url: str,
+        transform: Optional[Callable] = None,
+        target_transform: Optional[Callable] = None,
+        target_type: str = compiler.CLASS_ID,
+        classes: Optional[List[str]] = None,
+    ):
+        """读取 ``publish_shards`` 上传的分片数据集，每个样本通过一次 Range 请求读取
+
+        Args:
+            tos_url(str): 分片数据集的 tos 链接前缀
+            target_type(str): ``class_id``、``multi_hot`` 或 ``boxes``
+            classes(list): 类别名，类别 id 为其下标
+
+        Returns:
+            TorchShardDataset
+        """
+        # torch is imported on first use, it takes seconds to import
+        from volcengine_ml_platform.io.tos_dataset import TorchShardDataset
+
+        reader, positions, columns = self.load_shard_manifest(tos_url, classes)
+        return TorchShardDataset(
+            reader,
+            positions,
+            columns.annotations,
+            transform=transform,
+            target_transform=target_transform,
+            target_type=target_type,
+            classes=classes,
+            targets=columns.targets,
+        )
+
+    def load_shard_manifest(self, tos_url: str, classes: Optional[List[str]] = None):
+        """流式读取 ``publish_shards`` 上传的 manifest，逐行写入列式的 ``ManifestColumns``
+
+        Args:
+            tos_url(str): 分片数据集的 tos 链接前缀
+            classes(list): 类别名，类别 id 为其下标
+
+        Returns:
+            ``(ShardReader, 每个样本在分片索引中的下标, ManifestColumns)``，
+            ``ManifestColumns`` 的 key 为样本名
+        """
+        bucket, prefix = tos.parse_tos_url(tos_url)
+        if prefix and not prefix.endswith("/"):
+            prefix += "/"
+        reader = shard.ShardReader(self.tos_client, bucket, prefix)
+        positions = array.array("q")
+        builder = ManifestColumnsBuilder(classes)
+        body = self.tos_client.get_object(bucket, prefix + SHARD_MANIFEST_NAME)
+        try:
+            for line in _iter_body_lines(body):
+                manifest_line = json.loads(line)
+                name = manifest_line["Data"]["ShardSample"]
+                positions.append(reader.index.position(name))
+                builder.add(bucket, name, manifest_line["Annotation"])
+        finally:
+            body.close()
+        return reader, np.frombuffer(positions, dtype=np.int64), builder.build()
 
     def init_torch_dataset(
         self,
         transform: Optional[Callable] = None,
         target_transform: Optional[Callable] = None,
+        target_type: str = compiler.CLASS_ID,
+        classes: Optional[List[str]] = None,
     ):
-        manifest_info = self.get_manifest_info(self.parse_image_manifest)
+        """返回按样本从 TOS 读取的 ``TorchTOSDataset``
+
+        Args:
+            target_type(str): 未指定 ``target_transform`` 时返回的标签类型，
+                ``class_id``、``multi_hot`` 或 ``boxes``
+            classes(list): 类别名，类别 id 为其下标
+        """
+        from volcengine_ml_platform.io.tos_dataset import TorchTOSDataset
+
+        manifest_info = self.get_manifest_info(
+            lambda path: self.parse_image_manifest(path, classes),
+        )
         torch_dataset = TorchTOSDataset(
             manifest_info=manifest_info,
             transform=transform,
             target_transform=target_transform,
+            target_type=target_type,
         )
 
         return torch_dataset
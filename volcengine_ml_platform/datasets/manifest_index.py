@@ -0,0 +1,158 @@
+"""本地清单文件的行偏移索引，按行号 seek 读取而不用从头解析
+
+索引以 NumPy ``uint64`` 数组保存在清单旁边的 ``<manifest>.idx.npy`` 中，
+开头的 ``HEADER_SIZE`` 个元素记录生成索引时清单的修改时间与最后一行的 CRC32，
+之后第 i 个元素为第 i 行的起始字节偏移，最后一个元素为清单文件的大小。
+清单的大小、修改时间或最后一行与索引记录的不一致时视为过期并重新生成，
+同样大小的清单被重写也能发现。
+"""
+import array
+import json
+import os
+import zlib
+
+import numpy as np
+
+INDEX_SUFFIX = ".idx.npy"
+# "MANFIDX1", tells indexes with a header from the older plain offset arrays
+INDEX_MAGIC = 0x31584449464E414D
+HEADER_SIZE = 3
+
+
+def index_path(manifest_path):
+    return manifest_path + INDEX_SUFFIX
+
+
+def _last_line_crc(f, offsets):
+    """清单最后一行的 CRC32，``offsets`` 为行偏移，最后一个元素为文件大小"""
+    start = int(offsets[-2]) if len(offsets) > 1 else 0
+    end = int(offsets[-1])
+    f.seek(start)
+    return zlib.crc32(f.read(end - start))
+
+
+def _save_index(manifest_path, offsets):
+    with open(manifest_path, "rb") as f:
+        mtime_ns = os.fstat(f.fileno()).st_mtime_ns
+        crc = _last_line_crc(f, offsets)
+    header = array.array("Q", [INDEX_MAGIC, mtime_ns, crc])
+    path = index_path(manifest_path)
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, "wb") as f:
+        np.save(f, np.frombuffer(header + offsets, dtype=np.uint64))
+    os.replace(temp_path, path)
+
+
+def _is_fresh(manifest_path, raw):
+    """``raw`` 为读取的索引文件，判断其是否与清单当前的内容一致"""
+    if len(raw) <= HEADER_SIZE or int(raw[0]) != INDEX_MAGIC:
+        return False
+    offsets = raw[HEADER_SIZE:]
+    with open(manifest_path, "rb") as f:
+        stat = os.fstat(f.fileno())
+        if int(offsets[-1]) != stat.st_size or int(raw[1]) != stat.st_mtime_ns:
+            return False
+        return int(raw[2]) == _last_line_crc(f, offsets)
+
+
+class ManifestWriter:
+    """逐行写入清单，同时记录每行的偏移，关闭时写出索引
+
+    每写一行就 flush，写入过程中清单中已有的行即可被读取。
+
+    Args:
+        manifest_path(str): 清单文件路径
+
+    """
+
+    def __init__(self, manifest_path):
+        self.manifest_path = manifest_path
+        self._file = open(manifest_path, "wb")
+        self._offsets = array.array("Q")
+        self._position = 0
+        self._lines = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def __len__(self):
+        return self._lines
+
+    def write(self, manifest_line):
+        """写入一行，``manifest_line`` 为清单中一行的 dict"""
+        data = json.dumps(manifest_line).encode("utf-8") + b"\n"
+        self._offsets.append(self._position)
+        self._file.write(data)
+        self._file.flush()
+        self._position += len(data)
+        self._lines += 1
+
+    def close(self):
+        if self._file is None:
+            return
+        self._file.close()
+        self._file = None
+        self._offsets.append(self._position)
+        _save_index(self.manifest_path, self._offsets)
+
+
+def build_index(manifest_path):
+    """扫描清单文件生成索引
+
+    Returns:
+        np.ndarray，长度为行数加一
+    """
+    offsets = array.array("Q")
+    position = 0
+    with open(manifest_path, "rb") as f:
+        for line in f:
+            offsets.append(position)
+            position += len(line)
+    offsets.append(position)
+    _save_index(manifest_path, offsets)
+    return np.frombuffer(offsets, dtype=np.uint64)
+
+
+def load_index(manifest_path):
+    """读取清单的索引，索引不存在或已过期时重新生成"""
+    path = index_path(manifest_path)
+    if os.path.exists(path):
+        try:
+            raw = np.load(path, mmap_mode="r")
+        except (OSError, ValueError):
+            raw = None
+        if raw is not None and _is_fresh(manifest_path, raw):
+            return raw[HEADER_SIZE:]
+    return build_index(manifest_path)
+
+
+def count_lines(manifest_path):
+    """清单的行数"""
+    return len(load_index(manifest_path)) - 1
+
+
+def iter_lines(manifest_path, offset=0, limit=-1):
+    """从第 ``offset`` 行开始读取至多 ``limit`` 行并解析
+
+    Args:
+        manifest_path(str): 清单文件路径
+        offset(int): 跳过的行数
+        limit(int): 读取的行数，-1 表示读到文件末尾
+
+    Returns:
+        生成每行 dict 的迭代器
+    """
+    index = load_index(manifest_path)
+    count = len(index) - 1
+    start = min(offset, count)
+    stop = count if limit == -1 else min(count, offset + limit)
+    if start >= stop:
+        return
+    end = int(index[stop])
+    with open(manifest_path, "rb") as f:
+        f.seek(int(index[start]))
+        while f.tell() < end:
+            yield json.loads(f.readline())
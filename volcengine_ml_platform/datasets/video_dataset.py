@@ -7,6 +7,7 @@ import numpy as np
 from volcengine_ml_platform import constant
 from volcengine_ml_platform.datasets.dataset import _Dataset
 from volcengine_ml_platform.datasets.dataset import dataset_copy_file
+from volcengine_ml_platform.datasets.manifest_index import ManifestWriter
 
 
 class VideoDataset(_Dataset):
@@ -33,6 +34,7 @@ class VideoDataset(_Dataset):
 
         self._create_manifest_dataset(
             manifest_keyword="VideoURL",
+            limit=limit,
         )
 
     def split(self, training_dir: str, testing_dir: str, ratio=0.8, random_state=0):
@@ -90,16 +92,8 @@ class VideoDataset(_Dataset):
             testing_dir,
             constant.DATASET_LOCAL_METADATA_FILENAME,
         )
-        with open(
-            test_metadata_path,
-            mode="w",
-            encoding="utf-8",
-        ) as testing_manifest_file:
-            with open(
-                train_metadata_path,
-                mode="w",
-                encoding="utf-8",
-            ) as training_manifest_file:
+        with ManifestWriter(test_metadata_path) as testing_manifest_file:
+            with ManifestWriter(train_metadata_path) as training_manifest_file:
                 index = 0
                 with open(self._manifest_path(), encoding="utf-8") as f:
                     for line in f:
@@ -110,16 +104,14 @@ class VideoDataset(_Dataset):
                                 self.local_path,
                                 testing_dir,
                             )
-                            json.dump(manifest_line, testing_manifest_file)
-                            testing_manifest_file.write("\n")
+                            testing_manifest_file.write(manifest_line)
                         else:
                             dataset_copy_file(
                                 manifest_line,
                                 self.local_path,
                                 training_dir,
                             )
-                            json.dump(manifest_line, training_manifest_file)
-                            training_manifest_file.write("\n")
+                            training_manifest_file.write(manifest_line)
                         index = index + 1
 
         train_dataset.created = True
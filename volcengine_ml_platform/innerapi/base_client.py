@@ -4,11 +4,11 @@ import threading
 from typing import Dict
 from typing import Union
 
-import requests
 from volcengine.ApiInfo import ApiInfo
 
 import volcengine_ml_platform
 from volcengine_ml_platform import constant
+from volcengine_ml_platform.util import client_pool
 from volcengine_ml_platform.util import metric
 
 
@@ -55,7 +55,6 @@ class InnerApiBaseClient:
         self.inner_api_info = INNER_API_INFOS
         self.connection_timeout = 10
         self.socket_timeout = 10
-        self.session = requests.session()
 
     @staticmethod
     def _get_url(api, token):
@@ -75,7 +74,7 @@ class InnerApiBaseClient:
             url = self._get_url(api, token)
             headers = self.inner_api_info[api].header
             body = json.dumps(body)
-            resp = self.session.post(
+            resp = client_pool.http_session().post(
                 url,
                 headers=headers,
                 data=body,
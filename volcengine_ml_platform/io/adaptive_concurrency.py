@@ -0,0 +1,200 @@
+"""根据吞吐、延迟与限流响应自动调整并发数的 AIMD 控制器"""
+import threading
+import time
+from logging import debug
+
+from botocore.exceptions import ClientError
+
+THROTTLE_ERROR_CODES = {
+    "503",
+    "SlowDown",
+    "Throttling",
+    "ThrottlingException",
+    "TooManyRequests",
+    "RequestLimitExceeded",
+    "ServiceUnavailable",
+}
+
+DEFAULT_INITIAL_LIMIT = 4
+DEFAULT_MAX_LIMIT = 64
+DEFAULT_WINDOW = 1.0
+# throughput must grow by this fraction to count as an improvement
+IMPROVEMENT_THRESHOLD = 0.05
+
+
+def is_throttled(exc):
+    """判断异常是否为服务端限流（503 / SlowDown 等）"""
+    if not isinstance(exc, ClientError):
+        return False
+    err = exc.response.get("Error", {})
+    status = exc.response.get("ResponseMetadata", {}).get("HTTPStatusCode")
+    return err.get("Code") in THROTTLE_ERROR_CODES or status in (429, 503)
+
+
+class AdaptiveConcurrency:
+    """按 AIMD（加性增、乘性减）调整同时进行的请求数
+
+    每隔 ``window`` 秒评估一次：
+
+    - 这段时间内出现限流（503 / SlowDown）时，并发数乘以 ``decrease_factor``
+    - 平均延迟超过观测到的最小延迟的 ``latency_tolerance`` 倍、且吞吐没有提升时，
+      说明链路已经排队，同样按乘性减回退
+    - 吞吐仍在提升时增大并发数：第一次回退之前每次翻倍（慢启动），之后每次加 1
+    - 其它情况保持不变
+
+    吞吐按传输的字节数计算；没有记录字节时（比如大量小对象的请求）按完成的请求数计算。
+    因此既适用于大量小对象，也适用于少量大对象的分段传输。
+
+    比如：::
+
+        limiter = AdaptiveConcurrency(max_limit=128)
+        with ThreadPoolExecutor(max_workers=limiter.max_limit) as executor:
+            for key in keys:
+                executor.submit(limiter.call, s3_client.download_file, bucket, key, path)
+
+    Args:
+        initial(int): 初始并发数
+        min_limit(int): 并发数下限
+        max_limit(int): 并发数上限，调用方的线程数与连接池大小应不小于该值
+        window(float): 评估周期，单位为秒
+        decrease_factor(float): 回退时并发数的乘数
+        latency_tolerance(float): 判定延迟上升的倍数
+        max_retries(int): ``call`` 遇到限流时的最大重试次数
+
+    """
+
+    def __init__(
+        self,
+        initial=DEFAULT_INITIAL_LIMIT,
+        min_limit=1,
+        max_limit=DEFAULT_MAX_LIMIT,
+        window=DEFAULT_WINDOW,
+        decrease_factor=0.5,
+        latency_tolerance=2.0,
+        max_retries=3,
+    ):
+        self.min_limit = max(1, min_limit)
+        self.max_limit = max(self.min_limit, max_limit)
+        self.window = window
+        self.decrease_factor = decrease_factor
+        self.latency_tolerance = latency_tolerance
+        self.max_retries = max_retries
+        self._limit = min(max(initial, self.min_limit), self.max_limit)
+        self._in_flight = 0
+        self._peak_in_flight = 0
+        self._slow_start = True
+        self._cond = threading.Condition()
+        self._min_latency = None
+        self._last_throughput = 0.0
+        self._reset_window(time.monotonic())
+
+    @property
+    def limit(self):
+        """当前允许的并发数"""
+        return self._limit
+
+    def acquire(self):
+        """占用一个并发名额，名额用完时阻塞"""
+        with self._cond:
+            while self._in_flight >= self._limit:
+                self._cond.wait()
+            self._in_flight += 1
+            self._peak_in_flight = max(self._peak_in_flight, self._in_flight)
+
+    def release(self, latency=None, throttled=False):
+        """归还名额并记录这次请求的结果
+
+        Args:
+            latency(float): 请求耗时，单位为秒
+            throttled(bool): 请求是否被限流
+
+        """
+        with self._cond:
+            self._in_flight -= 1
+            self._requests += 1
+            if throttled:
+                self._throttled += 1
+            if latency is not None:
+                self._latency_sum += latency
+                self._latency_count += 1
+                if self._min_latency is None or latency < self._min_latency:
+                    self._min_latency = latency
+            self._maybe_adjust(time.monotonic())
+            self._cond.notify_all()
+
+    def add_bytes(self, n):
+        """记录传输的 ``n`` 个字节，可直接作为 boto3 的 ``Callback``"""
+        with self._cond:
+            self._bytes += n
+
+    def call(self, fn, *args, **kwargs):
+        """在并发名额内执行 ``fn``，被限流时回退并重试
+
+        Returns:
+            ``fn`` 的返回值
+
+        """
+        attempt = 0
+        while True:
+            self.acquire()
+            start = time.monotonic()
+            try:
+                result = fn(*args, **kwargs)
+            except Exception as e:
+                throttled = is_throttled(e)
+                self.release(time.monotonic() - start, throttled=throttled)
+                if not throttled or attempt >= self.max_retries:
+                    raise
+                attempt += 1
+                debug("request throttled, retry %d: %s", attempt, e)
+                continue
+            self.release(time.monotonic() - start)
+            return result
+
+    def _reset_window(self, now):
+        self._window_start = now
+        self._bytes = 0
+        self._requests = 0
+        self._throttled = 0
+        self._latency_sum = 0.0
+        self._latency_count = 0
+        self._peak_in_flight = self._in_flight
+
+    def _maybe_adjust(self, now):
+        elapsed = now - self._window_start
+        if elapsed < self.window:
+            return
+        if self._bytes:
+            throughput = self._bytes / elapsed
+        else:
+            throughput = self._requests / elapsed
+        improved = throughput > self._last_throughput * (1 + IMPROVEMENT_THRESHOLD)
+        latency_rising = (
+            self._latency_count > 0
+            and self._min_latency
+            and self._latency_sum / self._latency_count
+            > self._min_latency * self.latency_tolerance
+        )
+
+        limit = self._limit
+        baseline = throughput
+        if self._throttled or (latency_rising and not improved):
+            limit = int(limit * self.decrease_factor)
+            self._slow_start = False
+            # probe upwards again from the reduced limit
+            baseline = 0.0
+        elif improved and self._peak_in_flight >= limit:
+            # only grow when the current limit is actually being used
+            limit = limit * 2 if self._slow_start else limit + 1
+        limit = min(max(limit, self.min_limit), self.max_limit)
+        if limit != self._limit:
+            debug(
+                "concurrency %d -> %d, throughput %.1f/s, throttled %d",
+                self._limit,
+                limit,
+                throughput,
+                self._throttled,
+            )
+            self._limit = limit
+        self._last_throughput = baseline
+        self._reset_window(now)
@@ -0,0 +1,333 @@
+"""提供基于 asyncio 的 TOS 访问接口，适合在单个事件循环中并发大量小对象请求"""
+import asyncio
+import functools
+import os
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from logging import debug
+from typing import List
+
+from volcengine_ml_platform.io import listing
+from volcengine_ml_platform.io import object_cache
+from volcengine_ml_platform.io import rate_limit
+from volcengine_ml_platform.io.tos import iter_upload_files
+from volcengine_ml_platform.io.tos import parse_tos_url
+from volcengine_ml_platform.io.tos import TOSClient
+from volcengine_ml_platform.io.tos import upload_prefix
+
+DEFAULT_MAX_CONCURRENCY = 64
+DEFAULT_PART_SIZE = 20971520
+
+
+class _TaskWindow:
+    """最多保留 ``limit`` 个未完成的 task，已满时 ``submit`` 等待其中一个完成
+
+    任一 task 失败时取消其余的 task 并抛出异常。
+    """
+
+    def __init__(self, limit):
+        self.limit = limit
+        self.pending = set()
+
+    async def submit(self, aw):
+        try:
+            while len(self.pending) >= self.limit:
+                await self._wait()
+        except BaseException:
+            if asyncio.iscoroutine(aw):
+                aw.close()
+            raise
+        task = asyncio.ensure_future(aw)
+        self.pending.add(task)
+        return task
+
+    async def join(self):
+        while self.pending:
+            await self._wait()
+
+    async def _wait(self):
+        done, self.pending = await asyncio.wait(
+            self.pending,
+            return_when=asyncio.FIRST_COMPLETED,
+        )
+        for task in done:
+            # exception() raises CancelledError for a cancelled task
+            if task.cancelled() or task.exception() is not None:
+                self.cancel()
+                task.result()
+
+    def cancel(self):
+        for task in self.pending:
+            task.cancel()
+        self.pending = set()
+
+
+class AsyncTOSClient:
+    """TOSClient 的 asyncio 版本
+
+    boto3 没有 asyncio 的传输层，阻塞的请求在 ``max_concurrency`` 个线程中执行，
+    线程数与 HTTP 连接池大小相同。请求先在事件循环中等待信号量，拿到之后才提交给线程池，
+    更多的请求以协程的形式排队，线程池的队列中不会堆积任务。
+    每个 ``download_file`` / ``upload_file`` 只使用调用它的那个线程，不再额外启动传输线程；
+    ``download_dir`` / ``upload`` 边列举边提交，未完成的任务数不超过 ``max_concurrency``。
+
+    比如：::
+
+        async with AsyncTOSClient(max_concurrency=128) as client:
+            bodies = await asyncio.gather(
+                *[client.get_object(bucket, key) for key in keys]
+            )
+
+    Args:
+        credentials: 认证信息，默认从环境变量中读取
+        session_token(str): STS 临时凭证的 session token
+        max_concurrency(int): 最大在途请求数，同时也是 HTTP 连接池的大小
+        tos_client(TOSClient): 使用已有的 TOSClient，此时忽略认证参数
+
+    """
+
+    def __init__(
+        self,
+        credentials=None,
+        session_token=None,
+        max_concurrency=DEFAULT_MAX_CONCURRENCY,
+        tos_client=None,
+    ):
+        self.max_concurrency = max_concurrency
+        if tos_client is None:
+            tos_client = TOSClient(
+                credentials,
+                session_token,
+                max_pool_connections=max_concurrency,
+            )
+        else:
+            tos_client = tos_client._with_pool_connections(max_concurrency)
+        self.tos_client = tos_client
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency)
+        self._semaphore = None
+        self._semaphore_loop = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def close(self):
+        """释放连接池占用的资源"""
+        self._executor.shutdown(wait=True)
+
+    def _get_semaphore(self, loop):
+        # a semaphore is bound to the event loop it is first used in
+        if self._semaphore is None or self._semaphore_loop is not loop:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._semaphore_loop = loop
+        return self._semaphore
+
+    async def _run(self, func, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        async with self._get_semaphore(loop):
+            return await loop.run_in_executor(
+                self._executor,
+                functools.partial(func, *args, **kwargs),
+            )
+
+    def _transfer_config(self, part_size=DEFAULT_PART_SIZE):
+        # imported lazily, boto3 is slow to import
+        from boto3.s3.transfer import TransferConfig
+
+        # transfers run in the executor thread that called them
+        return TransferConfig(multipart_threshold=part_size, use_threads=False)
+
+    def _download_object(self, bucket, key, file_path):
+        client = self.tos_client
+        client._create_dir(os.path.dirname(file_path))
+        if client._use_cache(bucket, key):
+            with client._open_cached(bucket, key, rate_limit.BULK) as src, open(
+                file_path,
+                "wb",
+            ) as dst:
+                shutil.copyfileobj(src, dst, object_cache.COPY_CHUNK_SIZE)
+            return file_path
+        client.s3_client.download_file(
+            bucket,
+            key,
+            file_path,
+            Config=self._transfer_config(),
+            **client._bulk_transfer_kwargs(),
+        )
+        return file_path
+
+    async def list_objects(
+        self,
+        bucket,
+        max_keys,
+        marker="",
+        delimiter="",
+        encoding_type="url",
+        prefix="",
+    ):
+        """列出桶里的对象, 最多一次列出 1000 个，参数与返回值同 ``TOSClient.list_objects``"""
+        return await self._run(
+            self.tos_client.list_objects,
+            bucket,
+            max_keys,
+            marker=marker,
+            delimiter=delimiter,
+            encoding_type=encoding_type,
+            prefix=prefix,
+        )
+
+    async def put_object(self, bucket, key, body):
+        """上传对象到 bucket，参数与返回值同 ``TOSClient.put_object``"""
+        return await self._run(self.tos_client.put_object, bucket, key, body)
+
+    async def get_object(self, bucket, key) -> bytes:
+        """获取 bucket 中的一个对象
+
+        与 ``TOSClient.get_object`` 不同，这里直接返回对象的全部内容，
+        避免在事件循环中阻塞读取网络流。
+
+        Args:
+            bucket(str):  bucket 名
+            key(str):  对应 object 的 key
+
+        Returns:
+            对象内容的 bytes
+
+        """
+
+        def _get():
+            body = self.tos_client.get_object(bucket, key)
+            try:
+                return body.read()
+            finally:
+                body.close()
+
+        return await self._run(_get)
+
+    async def download_file(
+        self,
+        bucket: str = "",
+        key: str = "",
+        tos_url: str = "",
+        target_file_path: str = "",
+        target_dir_path: str = "",
+    ) -> str:
+        """下载TOS对象到本地，参数与返回值同 ``TOSClient.download_file``
+
+        单个对象只占用一个线程与一个连接，并发度由 ``max_concurrency`` 统一控制。
+
+        Raises:
+            ValueError: 参数填写错误
+
+        """
+        if (not bucket or not key) and not tos_url:
+            raise ValueError("Please assign a set of value as non-None")
+        if not target_file_path and not target_dir_path:
+            raise ValueError("Please set a correct dir_path or file_path")
+        if tos_url:
+            bucket, key = parse_tos_url(tos_url)
+        if not target_file_path:
+            target_file_path = os.path.join(target_dir_path, key)
+        return await self._run(self._download_object, bucket, key, target_file_path)
+
+    async def download_files(
+        self,
+        bucket: str = "",
+        keys: list = [],
+        tos_urls: list = [],
+        target_file_paths: list = [],
+        target_dir_path: str = "",
+    ) -> List[str]:
+        """下载多个TOS对象到本地，参数与返回值同 ``TOSClient.download_files``
+
+        Raises:
+            ValueError: 参数填写错误
+
+        """
+        if (not bucket or not keys) and not tos_urls:
+            raise ValueError("Please assign a set of value as non-None")
+
+        if not target_file_paths and not target_dir_path:
+            raise ValueError("Please set a correct dir_path or file_path")
+
+        if tos_urls:
+            sources = [parse_tos_url(url) for url in tos_urls]
+        else:
+            sources = [(bucket, key) for key in keys]
+
+        window = _TaskWindow(self.max_concurrency)
+        tasks = []
+        for idx, (src_bucket, src_key) in enumerate(sources):
+            kwargs = {"bucket": src_bucket, "key": src_key}
+            if target_dir_path:
+                kwargs["target_dir_path"] = target_dir_path
+            else:
+                kwargs["target_file_path"] = target_file_paths[idx]
+            tasks.append(await window.submit(self.download_file(**kwargs)))
+        await window.join()
+        return [task.result() for task in tasks]
+
+    async def download_dir(self, bucket, key, prefix, local_dir):
+        """下载 ``key`` 前缀下的所有对象到 ``local_dir``，参数同 ``TOSClient.download_dir``
+
+        在列举下一页的同时，已列出的对象就开始下载。
+        """
+        window = _TaskWindow(self.max_concurrency)
+        objects = listing.iter_objects(
+            self.tos_client._limited_s3_client(), bucket, key
+        )
+        while True:
+            # about one listing request per batch, pulled in the executor
+            contents = await self._run(lambda: list(islice(objects, listing.MAX_KEYS)))
+            if not contents:
+                break
+            for content in contents:
+                k = content["Key"]
+                if k.endswith("/"):
+                    continue
+                dest_pathname = os.path.join(local_dir, os.path.relpath(k, prefix))
+                debug(f"dest_pathname: {dest_pathname}")
+                await window.submit(
+                    self.download_file(
+                        bucket=bucket,
+                        key=k,
+                        target_file_path=dest_pathname,
+                    ),
+                )
+        await window.join()
+
+    def _upload_file(self, file_path, bucket, key, part_size):
+        client = self.tos_client
+        client.s3_client.upload_file(
+            file_path,
+            bucket,
+            key,
+            Config=self._transfer_config(part_size),
+            **client._bulk_transfer_kwargs(),
+        )
+
+    async def upload_file(
+        self, file_path, bucket, key=None, part_size=DEFAULT_PART_SIZE
+    ):
+        """上传文件到 bucket，参数同 ``TOSClient.upload_file``
+
+        大于 ``part_size`` 的文件在同一个线程中依次上传各个分片。
+        """
+        if key is None:
+            key = file_path
+        return await self._run(self._upload_file, file_path, bucket, key, part_size)
+
+    async def upload(self, local_path, bucket, prefix):
+        """上传本地文件或目录，参数与返回值同 ``TOSClient.upload``
+
+        目录中的文件并发上传，边遍历目录边提交。
+        """
+        prefix = upload_prefix(local_path, prefix)
+        window = _TaskWindow(self.max_concurrency)
+        for file_path, key in iter_upload_files(local_path, prefix):
+            await window.submit(self.upload_file(file_path, bucket, key=key))
+        await window.join()
+        return f"tos://{bucket}/{prefix}"
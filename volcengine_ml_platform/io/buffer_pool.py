@@ -0,0 +1,161 @@
+"""读取对象内容的可复用缓冲区，避免逐样本读取时反复分配与拷贝大块内存"""
+import os
+import threading
+
+DEFAULT_MIN_SIZE = 64 * 1024
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+
+def read_into(fileobj, view):
+    """从 ``fileobj`` 读满 ``view``
+
+    Args:
+        fileobj: 二进制文件对象，支持 ``readinto`` 时直接写入 ``view``
+        view(memoryview): 字节格式的目标内存
+
+    Returns:
+        读取的字节数，即 ``len(view)``
+
+    Raises:
+        OSError: 数据不足 ``len(view)`` 字节
+
+    """
+    size = len(view)
+    offset = 0
+    readinto = getattr(fileobj, "readinto", None)
+    while offset < size:
+        if readinto is not None:
+            n = readinto(view[offset:])
+        else:
+            chunk = fileobj.read(size - offset)
+            n = len(chunk)
+            view[offset : offset + n] = chunk
+        if not n:
+            raise OSError(f"unexpected end of stream at {offset}, expected {size}")
+        offset += n
+    return offset
+
+
+def _size_class(size, min_size):
+    capacity = min_size
+    while capacity < size:
+        capacity <<= 1
+    return capacity
+
+
+class PooledBuffer:
+    """从 ``BufferPool`` 借出的缓冲区，``view`` 为其中有效的数据
+
+    使用完毕后调用 ``release`` 或使用 ``with`` 归还，归还后不能再访问 ``view``
+    及由其创建的对象（比如 ``np.frombuffer`` 的结果）。
+    """
+
+    def __init__(self, pool, buffer, size):
+        self._pool = pool
+        self.buffer = buffer
+        self.size = size
+
+    def __len__(self):
+        return self.size
+
+    @property
+    def view(self):
+        return memoryview(self.buffer)[: self.size]
+
+    def release(self):
+        if self.buffer is not None:
+            if self._pool is not None:
+                self._pool._release(self.buffer)
+            self.buffer = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.release()
+
+
+class BufferPool:
+    """按 2 的幂次分级缓存 ``bytearray``，线程安全
+
+    Args:
+        min_size(int): 最小的缓冲区大小
+        max_bytes(int): 池中最多保留的空闲缓冲区总大小，超出时归还的缓冲区直接丢弃
+
+    """
+
+    def __init__(self, min_size=DEFAULT_MIN_SIZE, max_bytes=DEFAULT_MAX_BYTES):
+        self.min_size = min_size
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._free = {}
+        self._free_bytes = 0
+        self._pid = os.getpid()
+
+    def __getstate__(self):
+        # free buffers stay in this process, the receiver starts empty
+        state = self.__dict__.copy()
+        state["_lock"] = None
+        state["_free"] = {}
+        state["_free_bytes"] = 0
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+
+    @property
+    def free_bytes(self):
+        """池中空闲缓冲区的总大小"""
+        return self._free_bytes
+
+    def acquire(self, size):
+        """借出一个至少 ``size`` 字节的缓冲区
+
+        Returns:
+            PooledBuffer，``view`` 的长度为 ``size``
+
+        """
+        capacity = _size_class(size, self.min_size)
+        self._check_pid()
+        buffer = None
+        with self._lock:
+            free = self._free.get(capacity)
+            if free:
+                buffer = free.pop()
+                self._free_bytes -= capacity
+        if buffer is None:
+            buffer = bytearray(capacity)
+        return PooledBuffer(self, buffer, size)
+
+    def _release(self, buffer):
+        capacity = len(buffer)
+        self._check_pid()
+        with self._lock:
+            if self._free_bytes + capacity > self.max_bytes:
+                return
+            self._free.setdefault(capacity, []).append(buffer)
+            self._free_bytes += capacity
+
+    def _check_pid(self):
+        # the lock may have been held by another thread when the process forked
+        if self._pid != os.getpid():
+            self._lock = threading.Lock()
+            self._free = {}
+            self._free_bytes = 0
+            self._pid = os.getpid()
+
+
+_default_pool = None
+_default_pool_lock = threading.Lock()
+
+
+def default_pool():
+    """进程内共享的默认缓冲池"""
+    global _default_pool
+    if _default_pool is None:
+        with _default_pool_lock:
+            if _default_pool is None:
+                _default_pool = BufferPool()
+    return _default_pool
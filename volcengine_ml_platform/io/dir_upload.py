@@ -0,0 +1,144 @@
+"""并发上传本地目录"""
+import os
+from concurrent.futures import as_completed
+from concurrent.futures import ThreadPoolExecutor
+
+from volcengine_ml_platform.io import multipart_upload
+from volcengine_ml_platform.io import rate_limit
+from volcengine_ml_platform.io.progress import TransferProgress
+
+DEFAULT_MAX_WORKERS = 8
+DEFAULT_PART_SIZE = 20 * 1024 * 1024
+# parts boto3 uploads at once for a single file by default
+BOTO3_MAX_CONCURRENCY = 10
+
+
+def schedule_files(files):
+    """按文件大小从大到小排序
+
+    大文件先开始上传，小文件排在后面填补空闲的 worker，
+    避免最后只剩一个大文件在单独上传。
+
+    Args:
+        files(list): ``[(file_path, key, size), ...]``
+
+    Returns:
+        排序后的 list
+
+    """
+    return sorted(files, key=lambda item: item[2], reverse=True)
+
+
+class DirectoryUploader:
+    """用线程池并发上传多个文件，并汇总按字节计算的进度
+
+    文件与分片共享 ``max_connections`` 个连接：同时上传 ``n`` 个文件时，每个文件最多
+    同时上传 ``max_connections // n`` 个分片。只有一个大文件时所有连接都用于它的分片，
+    文件很多时每个文件一次上传一个分片。``s3_client`` 的连接池应不小于 ``max_connections``。
+
+    大于 ``part_size`` 的文件使用 ``MultipartUploader`` 并发上传分片，并保存 checkpoint，
+    中断后再次上传同一个文件时只上传缺少的分片。
+
+    Args:
+        s3_client: boto3 的 s3 client
+        max_workers(int): 同时上传的文件数
+        part_size(int): 超过该大小的文件使用分片上传，同时也是分片大小
+        max_connections(int): 文件与分片共享的连接数，默认为 ``max_workers`` 乘以
+            boto3 默认的分片并发数
+        progress_callback(callable): 进度回调，参数为 ``TransferMetrics``
+        show_progress(bool): 是否显示进度条
+        rate_limiter(rate_limit.RateLimiter): 限速器，上传使用 ``BULK`` 优先级
+
+    """
+
+    def __init__(
+        self,
+        s3_client,
+        max_workers=DEFAULT_MAX_WORKERS,
+        part_size=DEFAULT_PART_SIZE,
+        max_connections=None,
+        progress_callback=None,
+        show_progress=True,
+        rate_limiter=None,
+    ):
+        self.s3_client = s3_client
+        self.max_workers = max_workers
+        self.part_size = part_size
+        if max_connections is None:
+            max_connections = max_workers * BOTO3_MAX_CONCURRENCY
+        self.max_connections = max_connections
+        self.progress_callback = progress_callback
+        self.show_progress = show_progress
+        self.rate_limiter = rate_limiter
+
+    def upload(self, files, bucket):
+        """上传文件
+
+        Args:
+            files(iterable): ``(file_path, key)`` 的迭代器
+            bucket(str): 上传 bucket 名
+
+        Returns:
+            本次上传的 ``TransferMetrics``
+
+        """
+        files = schedule_files(
+            [(path, key, os.path.getsize(path)) for path, key in files],
+        )
+        progress = TransferProgress(
+            len(files),
+            sum(item[2] for item in files),
+            callback=self.progress_callback,
+            show_progress=self.show_progress,
+        )
+        # imported lazily, boto3 is slow to import
+        from boto3.s3.transfer import TransferConfig
+
+        workers = max(1, min(self.max_workers, len(files)))
+        parts_per_file = max(1, self.max_connections // workers)
+        transfer_config = TransferConfig(
+            multipart_threshold=self.part_size,
+            max_concurrency=parts_per_file,
+        )
+        throttle = None
+        if self.rate_limiter is not None:
+            throttle = self.rate_limiter.callback(rate_limit.BULK)
+
+        def _callback(nbytes):
+            if throttle is not None:
+                throttle(nbytes)
+            progress.add_bytes(nbytes)
+
+        def _upload(file_path, key, size):
+            if size > self.part_size:
+                multipart_upload.MultipartUploader(
+                    self.s3_client,
+                    part_size=self.part_size,
+                    max_workers=parts_per_file,
+                    rate_limiter=self.rate_limiter,
+                    callback=progress.add_bytes,
+                ).upload(file_path, bucket, key)
+                progress.file_done()
+                return
+            if self.rate_limiter is not None:
+                self.rate_limiter.request(rate_limit.BULK)
+            self.s3_client.upload_file(
+                file_path,
+                bucket,
+                key,
+                Config=transfer_config,
+                Callback=_callback,
+            )
+            progress.file_done()
+
+        try:
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                futures = [
+                    executor.submit(_upload, file_path, key, size)
+                    for file_path, key, size in files
+                ]
+                for future in as_completed(futures):
+                    future.result()
+        finally:
+            progress.close()
+        return progress.metrics()
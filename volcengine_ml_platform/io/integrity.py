@@ -0,0 +1,333 @@
+"""传输过程中增量计算 MD5 / CRC64，与服务端的 ETag、CRC64 比对校验数据完整性"""
+import binascii
+import hashlib
+import os
+from logging import warning
+
+try:
+    import crcmod
+except ImportError:  # pragma: no cover, optional dependency
+    crcmod = None
+
+CRC64_HEADER = "x-tos-hash-crc64ecma"
+# CRC-64/XZ (ECMA-182, reflected), the variant TOS returns in x-tos-hash-crc64ecma
+CRC64_POLY = 0xC96C5795D7870F42
+CRC64_MASK = 0xFFFFFFFFFFFFFFFF
+
+# the pure python fallback is slow, only compute CRC64 by default with crcmod
+HAS_FAST_CRC64 = crcmod is not None
+
+
+def warn_unverified(what):
+    """没有任何可比对的校验值时给出警告，避免调用方误以为数据已经校验过"""
+    if HAS_FAST_CRC64:
+        warning("%s was not verified: no checksum to compare", what)
+    else:
+        warning(
+            "%s was not verified: install crcmod "
+            "(pip install volcengine_ml_platform[integrity]) to check its CRC64",
+            what,
+        )
+
+
+def _make_table():
+    table = []
+    for i in range(256):
+        crc = i
+        for _ in range(8):
+            crc = (crc >> 1) ^ CRC64_POLY if crc & 1 else crc >> 1
+        table.append(crc)
+    return table
+
+
+_CRC64_TABLE = _make_table()
+
+if crcmod is not None:
+    _crcmod_crc64 = crcmod.mkCrcFun(
+        0x142F0E1EBA9EA3693,
+        initCrc=0,
+        xorOut=CRC64_MASK,
+        rev=True,
+    )
+else:
+    _crcmod_crc64 = None
+
+
+def crc64(data, crc=0):
+    """计算 ``data`` 的 CRC64，``crc`` 为之前数据的 CRC64，用于增量计算"""
+    if _crcmod_crc64 is not None:
+        return _crcmod_crc64(bytes(data), crc)
+    table = _CRC64_TABLE
+    crc ^= CRC64_MASK
+    for b in bytes(data):
+        crc = table[(crc ^ b) & 0xFF] ^ (crc >> 8)
+    return crc ^ CRC64_MASK
+
+
+def _gf2_times(mat, vec):
+    result = 0
+    i = 0
+    while vec:
+        if vec & 1:
+            result ^= mat[i]
+        vec >>= 1
+        i += 1
+    return result
+
+
+def _gf2_square(mat):
+    return [_gf2_times(mat, mat[n]) for n in range(64)]
+
+
+def crc64_combine(crc1, crc2, len2):
+    """由相邻两段数据各自的 CRC64 计算拼接后的 CRC64，``len2`` 为第二段的长度"""
+    if len2 == 0:
+        return crc1
+    # operator for one zero bit, then two, then four zero bits
+    odd = [CRC64_POLY] + [1 << n for n in range(63)]
+    even = _gf2_square(odd)
+    odd = _gf2_square(even)
+    while True:
+        even = _gf2_square(odd)
+        if len2 & 1:
+            crc1 = _gf2_times(even, crc1)
+        len2 >>= 1
+        if not len2:
+            break
+        odd = _gf2_square(even)
+        if len2 & 1:
+            crc1 = _gf2_times(odd, crc1)
+        len2 >>= 1
+        if not len2:
+            break
+    return crc1 ^ crc2
+
+
+def normalize_etag(etag):
+    """去掉 ETag 两端的引号，None 视为空字符串"""
+    return etag.strip('"') if etag else ""
+
+
+def etag_part_count(etag):
+    """分片上传对象的 ETag 形如 ``<md5>-<N>``，返回分片数 N，普通上传的对象返回 0"""
+    etag = normalize_etag(etag)
+    if "-" not in etag:
+        return 0
+    try:
+        return int(etag.rsplit("-", 1)[1])
+    except ValueError:
+        return 0
+
+
+def multipart_etag(part_md5s):
+    """由各分片的 MD5（十六进制）计算分片上传对象的 ETag"""
+    digest = hashlib.md5(b"".join(binascii.unhexlify(m) for m in part_md5s))
+    return f"{digest.hexdigest()}-{len(part_md5s)}"
+
+
+def remote_crc64(response):
+    """从 boto3 的响应中取出服务端计算的 CRC64，没有时返回 None"""
+    headers = response.get("ResponseMetadata", {}).get("HTTPHeaders", {})
+    value = headers.get(CRC64_HEADER)
+    return int(value) if value else None
+
+
+class IntegrityError(Exception):
+    """本地计算的校验值与服务端不一致"""
+
+
+class Checksum:
+    """增量计算 MD5 与 CRC64
+
+    设置了 ``part_size`` 时同时按分片计算 MD5，得到与分片上传一致的 ETag。
+
+    Args:
+        md5(bool): 是否计算 MD5
+        crc64(bool): 是否计算 CRC64，默认只在安装了 crcmod 时计算
+        part_size(int): 分片上传的分片大小，None 表示按普通上传计算 ETag
+
+    """
+
+    def __init__(self, md5=True, crc64=None, part_size=None):
+        self._md5 = hashlib.md5() if md5 else None
+        self._crc64 = 0 if (HAS_FAST_CRC64 if crc64 is None else crc64) else None
+        self.part_size = part_size
+        self._part_md5 = hashlib.md5() if md5 and part_size else None
+        self._part_remaining = part_size
+        self._part_md5s = []
+        self.size = 0
+
+    def update(self, data):
+        if self._crc64 is not None:
+            self._crc64 = crc64(data, self._crc64)
+        if self._md5 is not None:
+            self._md5.update(data)
+        if self._part_md5 is not None:
+            view = memoryview(data)
+            while len(view) >= self._part_remaining:
+                self._part_md5.update(view[: self._part_remaining])
+                view = view[self._part_remaining :]
+                self._part_md5s.append(self._part_md5.hexdigest())
+                self._part_md5 = hashlib.md5()
+                self._part_remaining = self.part_size
+            self._part_md5.update(view)
+            self._part_remaining -= len(view)
+        self.size += len(data)
+
+    @property
+    def md5(self):
+        return self._md5.hexdigest() if self._md5 is not None else None
+
+    @property
+    def crc64(self):
+        return self._crc64
+
+    def etag(self, multipart=False):
+        """本地计算的 ETag，``multipart`` 表示对象是否通过分片上传"""
+        if self._md5 is None:
+            return None
+        if not multipart:
+            return self.md5
+        part_md5s = list(self._part_md5s)
+        if self._part_remaining != self.part_size or not part_md5s:
+            part_md5s.append(self._part_md5.hexdigest())
+        return multipart_etag(part_md5s)
+
+
+class HashingReader:
+    """读取时顺带更新 ``checksum`` 的只读文件对象，不支持 seek，保证每个字节只被计算一次"""
+
+    def __init__(self, fileobj, checksum):
+        self._fileobj = fileobj
+        self.checksum = checksum
+
+    def read(self, size=-1):
+        data = self._fileobj.read(size)
+        if data:
+            self.checksum.update(data)
+        return data
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return False
+
+
+class TransferResult:
+    """一次带校验的传输的结果
+
+    Attributes:
+        path(str): 本地文件路径
+        bucket(str): bucket 名
+        key(str): 对象的 key
+        size(int): 传输的字节数
+        etag(str): 服务端返回的 ETag，不带引号
+        md5(str): 本地计算的内容 MD5，无法计算时为 None
+        crc64(int): 本地计算的 CRC64，未计算时为 None
+        verified(bool): 是否与服务端的 ETag 或 CRC64 比对一致；
+            没有可比对的校验值时为 None
+
+    """
+
+    def __init__(self, path, bucket, key, size, etag, md5, crc64, verified):
+        self.path = path
+        self.bucket = bucket
+        self.key = key
+        self.size = size
+        self.etag = etag
+        self.md5 = md5
+        self.crc64 = crc64
+        self.verified = verified
+
+    def __repr__(self):
+        return (
+            f"TransferResult(path={self.path!r}, key={self.key!r}, size={self.size}, "
+            f"etag={self.etag!r}, crc64={self.crc64}, verified={self.verified})"
+        )
+
+
+def verify(checksum, remote_etag, crc, what):
+    """比对本地计算的校验值与服务端的 ETag / CRC64
+
+    Returns:
+        比对过至少一项时返回 True，没有可比对的校验值时给出警告并返回 None
+
+    Raises:
+        IntegrityError: 任何一项不一致
+
+    """
+    verified = None
+    if crc is not None and checksum.crc64 is not None:
+        if crc != checksum.crc64:
+            raise IntegrityError(
+                f"crc64 mismatch for {what}: local {checksum.crc64}, remote {crc}",
+            )
+        verified = True
+    remote_etag = normalize_etag(remote_etag)
+    multipart = "-" in remote_etag
+    if (
+        remote_etag
+        and checksum.md5 is not None
+        and (not multipart or checksum.part_size)
+    ):
+        local_etag = checksum.etag(multipart)
+        if local_etag != remote_etag:
+            raise IntegrityError(
+                f"etag mismatch for {what}: local {local_etag}, remote {remote_etag}",
+            )
+        verified = True
+    if verified is None:
+        warn_unverified(what)
+    return verified
+
+
+def download_verified(s3_client, bucket, key, file_path, chunk_size=1024 * 1024):
+    """流式下载对象并在写入的同时计算校验值，全部比对通过后才生成目标文件
+
+    数据先写入 ``file_path + ".tosdownload"``，校验失败时删除临时文件。
+
+    Returns:
+        TransferResult
+
+    Raises:
+        IntegrityError: 校验值不一致
+
+    """
+    rsp = s3_client.get_object(Bucket=bucket, Key=key)
+    etag = normalize_etag(rsp.get("ETag"))
+    # the part size of a multipart object is unknown here, rely on CRC64 for those
+    checksum = Checksum(md5="-" not in etag)
+    temp_path = file_path + ".tosdownload"
+    body = rsp["Body"]
+    try:
+        with open(temp_path, "wb") as f:
+            while True:
+                chunk = body.read(chunk_size)
+                if not chunk:
+                    break
+                checksum.update(chunk)
+                f.write(chunk)
+        verified = verify(
+            checksum,
+            etag,
+            remote_crc64(rsp),
+            f"tos://{bucket}/{key}",
+        )
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    finally:
+        body.close()
+    os.replace(temp_path, file_path)
+    return TransferResult(
+        file_path,
+        bucket,
+        key,
+        checksum.size,
+        etag,
+        checksum.md5,
+        checksum.crc64,
+        verified,
+    )
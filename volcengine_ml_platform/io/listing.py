@@ -0,0 +1,187 @@
+"""逐页、按需列举 TOS 对象，支持把大前缀切分为多个分片并发列举"""
+import queue
+import threading
+
+SHARD_BY_DELIMITER = "delimiter"
+SHARD_BY_CHARS = "chars"
+
+MAX_KEYS = 1000
+# characters that usually start a key segment, in byte order
+SHARD_ALPHABET = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ_abcdefghijklmnopqrstuvwxyz"
+
+_DONE = object()
+
+
+def iter_objects(s3_client, bucket, prefix="", marker="", end_key=None):
+    """逐页列举前缀下的对象
+
+    只有在消费完当前页之后才会请求下一页。
+
+    Args:
+        s3_client: boto3 的 s3 client
+        bucket(str): bucket 名
+        prefix(str): 对象的 key 前缀
+        marker(str): 只返回 key 大于 ``marker`` 的对象
+        end_key(str): 只返回 key 不大于 ``end_key`` 的对象，默认不限制
+
+    Returns:
+        生成 list_objects 中 ``Contents`` 元素（包含 Key/Size/ETag/LastModified）的迭代器
+
+    """
+    while True:
+        res = s3_client.list_objects(
+            Bucket=bucket,
+            Marker=marker,
+            MaxKeys=MAX_KEYS,
+            Prefix=prefix,
+        )
+        contents = res.get("Contents", list())
+        for content in contents:
+            if end_key is not None and content["Key"] > end_key:
+                return
+            yield content
+        if not res["IsTruncated"] or not contents:
+            return
+        marker = res.get("NextMarker") or contents[-1]["Key"]
+
+
+def char_range_shards(prefix, shard_count):
+    """按 ``prefix`` 之后的第一个字符把 key 空间切分为 ``shard_count`` 段
+
+    Returns:
+        ``[(marker, end_key), ...]``，第 i 段包含 ``marker < key <= end_key`` 的对象，
+        各段首尾相接，不重不漏
+
+    """
+    shard_count = max(1, min(shard_count, len(SHARD_ALPHABET)))
+    step = len(SHARD_ALPHABET) / shard_count
+    bounds = [prefix + SHARD_ALPHABET[int(i * step)] for i in range(1, shard_count)]
+    markers = [""] + bounds
+    end_keys = bounds + [None]
+    return list(zip(markers, end_keys))
+
+
+def iter_objects_parallel(
+    s3_client,
+    bucket,
+    prefix="",
+    parallelism=8,
+    shard_by=SHARD_BY_DELIMITER,
+    delimiter="/",
+    max_buffered_pages=None,
+):
+    """把前缀切分为多个分片并发列举
+
+    - ``shard_by="delimiter"``：先用 ``delimiter`` 列出下一级的 CommonPrefixes，
+      每个子前缀作为一个分片
+    - ``shard_by="chars"``：按前缀之后的第一个字符把 key 空间切分为 ``parallelism`` 段
+
+    各分片的结果交错返回，不保证全局有序。已列出但未被消费的结果最多缓存
+    ``max_buffered_pages`` 页，消费方停止迭代时后台的列举也会停止。
+
+    Args:
+        s3_client: boto3 的 s3 client
+        bucket(str): bucket 名
+        prefix(str): 对象的 key 前缀
+        parallelism(int): 并发列举的分片数
+        shard_by(str): 分片方式，``"delimiter"`` 或 ``"chars"``
+        delimiter(str): ``shard_by="delimiter"`` 时使用的分隔符
+        max_buffered_pages(int): 缓存的最大页数，默认为 ``2 * parallelism``
+
+    Returns:
+        生成对象信息的迭代器
+
+    Raises:
+        ValueError: 不支持的 ``shard_by``
+
+    """
+    if shard_by == SHARD_BY_CHARS:
+        shards = [
+            (prefix, marker, end_key)
+            for marker, end_key in char_range_shards(prefix, parallelism)
+        ]
+    elif shard_by == SHARD_BY_DELIMITER:
+        shards = []
+        marker = ""
+        while True:
+            res = s3_client.list_objects(
+                Bucket=bucket,
+                Delimiter=delimiter,
+                Marker=marker,
+                MaxKeys=MAX_KEYS,
+                Prefix=prefix,
+            )
+            contents = res.get("Contents", list())
+            common_prefixes = res.get("CommonPrefixes", list())
+            yield from contents
+            shards.extend((p["Prefix"], "", None) for p in common_prefixes)
+            if not res["IsTruncated"]:
+                break
+            # NextMarker is optional, resume after the last entry of the page
+            last = [contents[-1]["Key"]] if contents else []
+            if common_prefixes:
+                last.append(common_prefixes[-1]["Prefix"])
+            marker = res.get("NextMarker") or max(last, default="")
+            if not marker:
+                break
+    else:
+        raise ValueError(f"unsupported shard_by: {shard_by}")
+
+    if max_buffered_pages is None:
+        max_buffered_pages = parallelism * 2
+    pages = queue.Queue(maxsize=max_buffered_pages)
+    shard_queue = queue.Queue()
+    for shard in shards:
+        shard_queue.put(shard)
+    stop = threading.Event()
+
+    def _put(item):
+        while not stop.is_set():
+            try:
+                pages.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _worker():
+        try:
+            while not stop.is_set():
+                try:
+                    shard_prefix, marker, end_key = shard_queue.get_nowait()
+                except queue.Empty:
+                    break
+                page = []
+                for content in iter_objects(
+                    s3_client, bucket, shard_prefix, marker, end_key
+                ):
+                    page.append(content)
+                    if len(page) >= MAX_KEYS:
+                        if not _put(page):
+                            return
+                        page = []
+                if page and not _put(page):
+                    return
+        except Exception as e:
+            _put(e)
+        finally:
+            _put(_DONE)
+
+    workers = [
+        threading.Thread(target=_worker, daemon=True)
+        for _ in range(max(1, min(parallelism, len(shards))))
+    ]
+    for worker in workers:
+        worker.start()
+    running = len(workers) if shards else 0
+    try:
+        while running:
+            item = pages.get()
+            if item is _DONE:
+                running -= 1
+            elif isinstance(item, Exception):
+                raise item
+            else:
+                yield from item
+    finally:
+        stop.set()
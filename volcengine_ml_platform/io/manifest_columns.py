@@ -0,0 +1,167 @@
+"""以列式 NumPy 数组保存数据集清单
+
+DataLoader 的 worker 通过 fork 共享父进程的内存，但访问 Python list 中的对象会修改其引用计数，
+触发写时复制，每个 worker 的内存最终会增长到整个清单的大小。这里把清单拆成若干列，
+每列只由少数几个 NumPy 数组组成，访问某一行时只创建这一行的 Python 对象：
+
+- bucket 名去重后保存为 id 数组
+- key 打包为一个 ``uint8`` 缓冲区与一个 ``uint64`` 偏移数组
+- 标注序列化为 JSON 后同样打包保存，访问时再解析
+- 标注预先由 ``AnnotationCompiler`` 编译为类别 id、标签与检测框数组
+"""
+import array
+import json
+
+import numpy as np
+
+from volcengine_ml_platform.annotation.compiler import AnnotationCompiler
+
+
+class StringColumn:
+    """多个字符串打包为一个 UTF-8 缓冲区，第 i 个字符串为 ``data[offsets[i]:offsets[i + 1]]``"""
+
+    def __init__(self, data, offsets):
+        self.data = np.asarray(data, dtype=np.uint8)
+        self.offsets = np.asarray(offsets, dtype=np.uint64)
+
+    @classmethod
+    def from_strings(cls, strings):
+        data = bytearray()
+        offsets = array.array("Q", [0])
+        for s in strings:
+            data += s.encode("utf-8")
+            offsets.append(len(data))
+        return cls(np.frombuffer(bytes(data), dtype=np.uint8), offsets)
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def _decode(self, i):
+        start, end = int(self.offsets[i]), int(self.offsets[i + 1])
+        return self.data[start:end].tobytes().decode("utf-8")
+
+    def __getitem__(self, i):
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError(f"index {i} out of range")
+        return self._decode(i)
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self._decode(i)
+
+
+class JsonColumn(StringColumn):
+    """以 JSON 字符串保存任意可序列化的值，访问时解析"""
+
+    @classmethod
+    def from_values(cls, values):
+        return cls.from_strings(json.dumps(v) for v in values)
+
+    def _decode(self, i):
+        return json.loads(super()._decode(i))
+
+
+class CategoricalColumn:
+    """取值种类很少的字符串列，保存去重后的取值与每行取值的下标"""
+
+    def __init__(self, names, ids):
+        self.names = list(names)
+        self.ids = np.asarray(ids, dtype=np.uint32)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __getitem__(self, i):
+        return self.names[self.ids[i]]
+
+    def __iter__(self):
+        for i in self.ids:
+            yield self.names[i]
+
+
+class ManifestColumns:
+    """列式保存的数据集清单
+
+    Attributes:
+        buckets(CategoricalColumn): 每个样本的 bucket
+        keys(StringColumn): 每个样本的 key
+        annotations(JsonColumn): 每个样本的标注
+        targets(CompiledLabels): 编译后的标注
+
+    """
+
+    def __init__(self, buckets, keys, annotations, targets=None):
+        assert len(buckets) == len(keys) and len(keys) == len(annotations)
+        self.buckets = buckets
+        self.keys = keys
+        self.annotations = annotations
+        self.targets = targets
+
+    @property
+    def labels(self):
+        """``int64`` 的类别 id 数组，有样本没有标签时为 None"""
+        if self.targets is None or not self.targets.all_labeled():
+            return None
+        return self.targets.class_ids
+
+    def __len__(self):
+        return len(self.keys)
+
+    @classmethod
+    def from_manifest_info(cls, manifest_info, classes=None):
+        """由 ``{"buckets": [...], "keys": [...], "annotations": [...]}`` 构建"""
+        builder = ManifestColumnsBuilder(classes)
+        for bucket, key, annotation in zip(
+            manifest_info["buckets"],
+            manifest_info["keys"],
+            manifest_info["annotations"],
+        ):
+            builder.add(bucket, key, annotation)
+        return builder.build()
+
+
+class ManifestColumnsBuilder:
+    """逐行构建 ``ManifestColumns``，构建过程中不保留每行的 Python 对象
+
+    Args:
+        classes(list): 类别名，见 ``AnnotationCompiler``
+
+    """
+
+    def __init__(self, classes=None):
+        self._bucket_names = []
+        self._bucket_index = {}
+        self._bucket_ids = array.array("I")
+        self._keys = bytearray()
+        self._key_offsets = array.array("Q", [0])
+        self._annotations = bytearray()
+        self._annotation_offsets = array.array("Q", [0])
+        self._compiler = AnnotationCompiler(classes)
+
+    def add(self, bucket, key, annotation):
+        bucket_id = self._bucket_index.get(bucket)
+        if bucket_id is None:
+            bucket_id = self._bucket_index[bucket] = len(self._bucket_names)
+            self._bucket_names.append(bucket)
+        self._bucket_ids.append(bucket_id)
+        self._keys += key.encode("utf-8")
+        self._key_offsets.append(len(self._keys))
+        self._annotations += json.dumps(annotation).encode("utf-8")
+        self._annotation_offsets.append(len(self._annotations))
+        self._compiler.add(annotation)
+
+    def build(self):
+        return ManifestColumns(
+            CategoricalColumn(self._bucket_names, self._bucket_ids),
+            StringColumn(
+                np.frombuffer(bytes(self._keys), dtype=np.uint8),
+                self._key_offsets,
+            ),
+            JsonColumn(
+                np.frombuffer(bytes(self._annotations), dtype=np.uint8),
+                self._annotation_offsets,
+            ),
+            self._compiler.compile(),
+        )
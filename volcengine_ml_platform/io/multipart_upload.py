@@ -0,0 +1,423 @@
+"""并发、可断点续传的分片上传"""
+import base64
+import hashlib
+import io
+import json
+import math
+import mmap
+import os
+import threading
+from concurrent.futures import as_completed
+from concurrent.futures import ThreadPoolExecutor
+from logging import debug
+from logging import warning
+
+from botocore.exceptions import ClientError
+
+from volcengine_ml_platform.io import integrity
+from volcengine_ml_platform.io import rate_limit
+from volcengine_ml_platform.util import cache_dir
+
+MIN_PART_SIZE = 5 * 1024 * 1024
+MAX_PART_COUNT = 10000
+DEFAULT_PART_SIZE = 20 * 1024 * 1024
+DEFAULT_MAX_WORKERS = 8
+
+
+def plan_parts(file_size, part_size=DEFAULT_PART_SIZE):
+    """把文件切分为若干分片
+
+    分片大小不小于 ``MIN_PART_SIZE``；如果分片数超过 ``MAX_PART_COUNT``，
+    会自动增大分片大小。
+
+    Args:
+        file_size(int): 文件大小
+        part_size(int): 期望的分片大小
+
+    Returns:
+        ``[(part_number, offset, length), ...]``，part_number 从 1 开始
+
+    """
+    part_size = max(part_size, MIN_PART_SIZE)
+    if math.ceil(file_size / part_size) > MAX_PART_COUNT:
+        part_size = math.ceil(file_size / MAX_PART_COUNT)
+    part_count = max(1, math.ceil(file_size / part_size))
+    return [
+        (i + 1, i * part_size, min(part_size, file_size - i * part_size))
+        for i in range(part_count)
+    ]
+
+
+class MemoryViewReader(io.RawIOBase):
+    """把 ``memoryview`` 包装成可 seek 的只读文件对象
+
+    读取时直接从底层内存拷贝到调用方的缓冲区，不会为整个分片创建 ``bytes`` 对象。
+    """
+
+    def __init__(self, view):
+        super().__init__()
+        self._view = view
+        self._pos = 0
+
+    def __len__(self):
+        return len(self._view)
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def readinto(self, b):
+        n = min(len(b), len(self._view) - self._pos)
+        if n <= 0:
+            return 0
+        b[:n] = self._view[self._pos : self._pos + n]
+        self._pos += n
+        return n
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_SET:
+            pos = offset
+        elif whence == io.SEEK_CUR:
+            pos = self._pos + offset
+        elif whence == io.SEEK_END:
+            pos = len(self._view) + offset
+        else:
+            raise ValueError(f"invalid whence: {whence}")
+        if pos < 0:
+            raise ValueError(f"negative seek position: {pos}")
+        self._pos = pos
+        return self._pos
+
+    def tell(self):
+        return self._pos
+
+    def close(self):
+        if not self.closed:
+            self._view.release()
+        super().close()
+
+
+class UploadCheckpoint:
+    """记录一次分片上传的进度，用于中断后续传
+
+    checkpoint 以 json 格式保存，每完成一个分片就原子地重写一次；``path`` 为 None 时
+    只在内存中记录，不写文件。
+    """
+
+    def __init__(self, path, bucket, key, file_path, part_size):
+        self.path = path
+        stat = os.stat(file_path)
+        self.identity = {
+            "bucket": bucket,
+            "key": key,
+            "file_size": stat.st_size,
+            "mtime": stat.st_mtime,
+            "part_size": part_size,
+        }
+        self.upload_id = None
+        self.parts = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def default_path(file_path, bucket, key):
+        digest = hashlib.sha1(
+            f"{os.path.abspath(file_path)}|{bucket}|{key}".encode("utf-8"),
+        ).hexdigest()
+        return os.path.join(
+            cache_dir.HOME_DIR,
+            cache_dir.CHECKPOINT_ROOT,
+            f"{digest}.upload.json",
+        )
+
+    def load(self):
+        """读取已有的 checkpoint，文件与本次上传不一致时忽略
+
+        Returns:
+            bool，是否存在可用的 checkpoint
+
+        """
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                record = json.load(f)
+        except (OSError, ValueError):
+            return False
+        if record.get("identity") != self.identity:
+            debug("ignore stale upload checkpoint: %s", self.path)
+            return False
+        self.upload_id = record["upload_id"]
+        self.parts = {int(k): v for k, v in record["parts"].items()}
+        return True
+
+    def start(self, upload_id):
+        self.upload_id = upload_id
+        self.parts = {}
+        self._save()
+
+    def add_part(self, part_number, etag):
+        with self._lock:
+            self.parts[part_number] = etag
+            self._save()
+
+    def remove(self):
+        if self.path is None:
+            return
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+
+    def _save(self):
+        if self.path is None:
+            return
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        record = {
+            "identity": self.identity,
+            "upload_id": self.upload_id,
+            "parts": self.parts,
+        }
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(record, f)
+        os.replace(tmp_path, self.path)
+
+
+class MultipartUploader:
+    """并发分片上传
+
+    - 分片由线程池并发上传
+    - 分片内容通过 ``mmap`` + ``memoryview`` 切片读取，不额外拷贝
+    - 已完成分片的 ETag 记录到本地 checkpoint，再次上传同一文件时只上传缺失的分片
+
+    Args:
+        s3_client: boto3 的 s3 client
+        part_size(int): 分片大小
+        max_workers(int): 并发上传的分片数
+        resume(bool): 是否使用 checkpoint 断点续传；为 False 时不写 checkpoint，
+            上传失败时取消这次分片上传
+        verify(bool): 是否校验数据完整性。每个分片带上 ``Content-MD5`` 并比对返回的 ETag，
+            完成后比对整个对象的 ETag，服务端返回 CRC64 时同时比对 CRC64
+        rate_limiter(rate_limit.RateLimiter): 限速器，分片请求使用 ``BULK`` 优先级
+        callback(callable): 每上传完一个分片调用一次，参数为分片的字节数
+
+    """
+
+    def __init__(
+        self,
+        s3_client,
+        part_size=DEFAULT_PART_SIZE,
+        max_workers=DEFAULT_MAX_WORKERS,
+        resume=True,
+        verify=False,
+        rate_limiter=None,
+        callback=None,
+    ):
+        self.s3_client = s3_client
+        self.part_size = part_size
+        self.max_workers = max_workers
+        self.resume = resume
+        self.verify = verify
+        self.rate_limiter = rate_limiter
+        self.callback = callback
+        # results of the last verified upload
+        self.etag = None
+        self.crc64 = None
+        self.verified = None
+        self._part_crcs = {}
+
+    def upload(self, file_path, bucket, key, checkpoint_path=None):
+        """分片上传一个文件
+
+        Args:
+            file_path(str): 上传文件的路径
+            bucket(str): 上传 bucket 名
+            key(str): 上传 object 的 key
+            checkpoint_path(str): checkpoint 文件路径，默认保存在用户目录下，``resume=False`` 时忽略
+
+        Returns:
+            complete_multipart_upload 的返回结果
+
+        """
+        if not self.resume:
+            checkpoint_path = None
+        elif checkpoint_path is None:
+            checkpoint_path = UploadCheckpoint.default_path(file_path, bucket, key)
+        checkpoint = UploadCheckpoint(
+            checkpoint_path,
+            bucket,
+            key,
+            file_path,
+            self.part_size,
+        )
+        if not (self.resume and checkpoint.load() and self._verify(checkpoint)):
+            rsp = self.s3_client.create_multipart_upload(Bucket=bucket, Key=key)
+            debug("Multipart upload initiated: %s", rsp)
+            checkpoint.start(rsp["UploadId"])
+
+        parts = plan_parts(checkpoint.identity["file_size"], self.part_size)
+        pending = [part for part in parts if part[0] not in checkpoint.parts]
+        debug(
+            "upload %s: %d parts, %d already uploaded",
+            key,
+            len(parts),
+            len(parts) - len(pending),
+        )
+
+        try:
+            with open(file_path, mode="rb") as f, mmap.mmap(
+                f.fileno(),
+                0,
+                access=mmap.ACCESS_READ,
+            ) as mm:
+                view = memoryview(mm)
+                try:
+                    self._upload_parts(view, bucket, key, checkpoint, pending)
+                finally:
+                    view.release()
+
+            rsp = self.s3_client.complete_multipart_upload(
+                Bucket=bucket,
+                Key=key,
+                UploadId=checkpoint.upload_id,
+                MultipartUpload={
+                    "Parts": [
+                        {
+                            "PartNumber": part_number,
+                            "ETag": checkpoint.parts[part_number],
+                        }
+                        for part_number, _, _ in parts
+                    ],
+                },
+            )
+        except BaseException:
+            if not self.resume:
+                # nothing can resume it, do not leave the parts behind
+                self._abort(bucket, key, checkpoint.upload_id)
+            raise
+        debug("Multipart upload completed: %s", rsp)
+        checkpoint.remove()
+        if self.verify:
+            self._verify_object(rsp, parts, checkpoint, f"tos://{bucket}/{key}")
+        return rsp
+
+    def _abort(self, bucket, key, upload_id):
+        try:
+            self.s3_client.abort_multipart_upload(
+                Bucket=bucket,
+                Key=key,
+                UploadId=upload_id,
+            )
+        except Exception as e:
+            warning("Cannot abort multipart upload %s: %s", upload_id, e)
+
+    def _upload_parts(self, view, bucket, key, checkpoint, pending):
+        failed = threading.Event()
+
+        def _upload_part(part_number, offset, length):
+            if failed.is_set():
+                return
+            kwargs = {}
+            if self.verify:
+                part_view = view[offset : offset + length]
+                digest = hashlib.md5(part_view).digest()
+                kwargs["ContentMD5"] = base64.b64encode(digest).decode("ascii")
+                if integrity.HAS_FAST_CRC64:
+                    self._part_crcs[part_number] = integrity.crc64(part_view)
+                part_view.release()
+            if self.rate_limiter is not None:
+                self.rate_limiter.request(rate_limit.BULK)
+                self.rate_limiter.consume(length, rate_limit.BULK)
+            body = MemoryViewReader(view[offset : offset + length])
+            try:
+                rsp = self.s3_client.upload_part(
+                    Bucket=bucket,
+                    Key=key,
+                    PartNumber=part_number,
+                    UploadId=checkpoint.upload_id,
+                    Body=body,
+                    **kwargs,
+                )
+            finally:
+                body.close()
+            if self.verify and integrity.normalize_etag(rsp["ETag"]) != digest.hex():
+                raise integrity.IntegrityError(
+                    f"etag mismatch for part {part_number} of {key}: "
+                    f"local {digest.hex()}, remote {rsp['ETag']}",
+                )
+            checkpoint.add_part(part_number, rsp["ETag"])
+            if self.callback is not None:
+                self.callback(length)
+
+        def _upload_or_stop(*part):
+            try:
+                _upload_part(*part)
+            except BaseException:
+                # stop at the first failure instead of sending the remaining parts
+                failed.set()
+                raise
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = [executor.submit(_upload_or_stop, *part) for part in pending]
+            try:
+                for future in as_completed(futures):
+                    future.result()
+            except BaseException:
+                failed.set()
+                for future in futures:
+                    future.cancel()
+                raise
+
+    def _verify_object(self, rsp, parts, checkpoint, what):
+        # every part etag was checked against its md5 when it was uploaded
+        part_md5s = [
+            integrity.normalize_etag(checkpoint.parts[part_number])
+            for part_number, _, _ in parts
+        ]
+        self.etag = integrity.normalize_etag(rsp["ETag"])
+        expected = integrity.multipart_etag(part_md5s)
+        if self.etag != expected:
+            raise integrity.IntegrityError(
+                f"etag mismatch for {what}: local {expected}, remote {self.etag}",
+            )
+        self.verified = True
+        self.crc64 = None
+        if all(part_number in self._part_crcs for part_number, _, _ in parts):
+            crc = 0
+            for part_number, _, length in parts:
+                crc = integrity.crc64_combine(crc, self._part_crcs[part_number], length)
+            self.crc64 = crc
+            remote = integrity.remote_crc64(rsp)
+            if remote is not None and remote != crc:
+                raise integrity.IntegrityError(
+                    f"crc64 mismatch for {what}: local {crc}, remote {remote}",
+                )
+        self._part_crcs = {}
+
+    def _verify(self, checkpoint):
+        """确认 checkpoint 中的 upload 仍然存在，并以服务端的分片列表为准"""
+        identity = checkpoint.identity
+        remote_parts = {}
+        marker = 0
+        try:
+            while True:
+                rsp = self.s3_client.list_parts(
+                    Bucket=identity["bucket"],
+                    Key=identity["key"],
+                    UploadId=checkpoint.upload_id,
+                    PartNumberMarker=marker,
+                )
+                for part in rsp.get("Parts", []):
+                    remote_parts[part["PartNumber"]] = part["ETag"]
+                if not rsp.get("IsTruncated"):
+                    break
+                marker = rsp["NextPartNumberMarker"]
+        except ClientError as e:
+            warning("Cannot resume multipart upload %s: %s", checkpoint.upload_id, e)
+            return False
+        checkpoint.parts = {
+            part_number: etag
+            for part_number, etag in checkpoint.parts.items()
+            if remote_parts.get(part_number) == etag
+        }
+        return True
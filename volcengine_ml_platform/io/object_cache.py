@@ -0,0 +1,296 @@
+"""本地磁盘上的 TOS 对象缓存，按 LRU 淘汰，可在同一台机器的多个进程间共享"""
+import hashlib
+import os
+import shutil
+import tempfile
+import threading
+from logging import debug
+
+from volcengine_ml_platform.io.integrity import normalize_etag
+from volcengine_ml_platform.util import cache_dir
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover, windows
+    fcntl = None
+
+CACHE_DIR_ENV_NAME = "VOLC_ML_PLATFORM_CACHE_DIR"
+CACHE_SIZE_ENV_NAME = "VOLC_ML_PLATFORM_CACHE_SIZE"
+
+# evict down to this fraction of the budget so that eviction is not run on every put
+LOW_WATERMARK = 0.9
+# larger objects are not cached, one of them would evict most of the cache
+MAX_OBJECT_FRACTION = 0.5
+COPY_CHUNK_SIZE = 1024 * 1024
+
+
+class _FileLock:
+    """跨进程的互斥锁，基于 ``flock``；不支持 ``flock`` 的平台退化为进程内的锁"""
+
+    _thread_lock = threading.Lock()
+
+    def __init__(self, path):
+        self.path = path
+        self._fd = None
+
+    def __enter__(self):
+        if fcntl is None:
+            self._thread_lock.acquire()
+            return self
+        self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        fcntl.flock(self._fd, fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if fcntl is None:
+            self._thread_lock.release()
+            return
+        fcntl.flock(self._fd, fcntl.LOCK_UN)
+        os.close(self._fd)
+        self._fd = None
+
+
+class ObjectCache:
+    """以 bucket/key/ETag 为键的本地对象缓存
+
+    - 总大小不超过 ``max_bytes``，超出时按最近访问时间淘汰（LRU）
+    - 写入先落到临时文件，完成后再原子地 rename 到缓存目录，读者不会看到写了一半的文件
+    - 元数据的更新由文件锁保护，同一台机器上的多个 DataLoader worker 或多个 rank
+      可以共用一个缓存目录
+
+    对象默认被视为不可变：命中缓存时不再请求 TOS。对象可能被覆盖写时，
+    设置 ``validate=True``，每次读取前用 HEAD 请求校验 ETag。
+
+    大于 ``max_object_bytes`` 的对象不写入缓存，读取时直接返回 TOS 的响应流。
+
+    Args:
+        root(str): 缓存目录
+        max_bytes(int): 缓存的字节数上限
+        validate(bool): 命中缓存前是否校验远端 ETag
+        max_object_bytes(int): 单个对象的字节数上限，默认为 ``max_bytes`` 的一半
+
+    """
+
+    def __init__(self, root, max_bytes, validate=False, max_object_bytes=None):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.validate = validate
+        if max_object_bytes is None:
+            max_object_bytes = int(max_bytes * MAX_OBJECT_FRACTION)
+        self.max_object_bytes = min(max_object_bytes, max_bytes)
+        self._objects_dir = os.path.join(root, "objects")
+        self._tmp_dir = os.path.join(root, "tmp")
+        self._size_path = os.path.join(root, "size")
+        os.makedirs(self._objects_dir, exist_ok=True)
+        os.makedirs(self._tmp_dir, exist_ok=True)
+        self._lock_path = os.path.join(root, "lock")
+
+    def _entry_dir(self, bucket, key):
+        digest = hashlib.sha1(f"{bucket}/{key}".encode("utf-8")).hexdigest()
+        return os.path.join(self._objects_dir, digest[:2], digest[2:4]), digest
+
+    def accepts(self, size):
+        """大小为 ``size`` 的对象是否会被缓存"""
+        return size <= self.max_object_bytes
+
+    def lookup(self, bucket, key, etag=None):
+        """查找缓存的对象
+
+        Args:
+            bucket(str): bucket 名
+            key(str): 对象的 key
+            etag(str): 对象的 ETag，为 None 时返回该对象任意版本的缓存
+
+        Returns:
+            缓存文件路径，未命中时返回 None
+
+        """
+        entry_dir, digest = self._entry_dir(bucket, key)
+        etag = normalize_etag(etag)
+        try:
+            names = os.listdir(entry_dir)
+        except OSError:
+            return None
+        for name in names:
+            name_digest, _, name_etag = name.partition(".")
+            if name_digest == digest and (not etag or name_etag == etag):
+                path = os.path.join(entry_dir, name)
+                try:
+                    # mtime records the last access, which drives LRU eviction
+                    os.utime(path)
+                except OSError:
+                    return None
+                return path
+        return None
+
+    def put(self, bucket, key, etag, fileobj):
+        """把 ``fileobj`` 的内容写入缓存
+
+        Returns:
+            缓存文件路径，对象大于 ``max_object_bytes`` 时不写入，返回 None
+
+        """
+        entry_dir, digest = self._entry_dir(bucket, key)
+        etag = normalize_etag(etag)
+        fd, tmp_path = tempfile.mkstemp(dir=self._tmp_dir)
+        try:
+            with os.fdopen(fd, "wb") as f:
+                shutil.copyfileobj(fileobj, f, COPY_CHUNK_SIZE)
+            size = os.path.getsize(tmp_path)
+            if not self.accepts(size):
+                debug("object too large to cache: %s/%s", bucket, key)
+                return None
+            os.makedirs(entry_dir, exist_ok=True)
+            path = os.path.join(entry_dir, f"{digest}.{etag}")
+            with _FileLock(self._lock_path):
+                added = size
+                for name in os.listdir(entry_dir):
+                    if name.startswith(digest + "."):
+                        stale = os.path.join(entry_dir, name)
+                        added -= os.path.getsize(stale)
+                        if stale != path:
+                            os.remove(stale)
+                os.replace(tmp_path, path)
+                total = self._read_size() + added
+                if total > self.max_bytes:
+                    total = self._evict(int(self.max_bytes * LOW_WATERMARK), path)
+                self._write_size(total)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        return path
+
+    def put_result(self, result):
+        """把一次带校验的下载（``integrity.TransferResult``）得到的本地文件加入缓存
+
+        之后读取同一对象时直接命中缓存，校验未通过的结果不加入。
+
+        Returns:
+            缓存文件路径，未加入时返回 None
+
+        """
+        if not result.verified or not result.etag:
+            return None
+        if not self.accepts(os.path.getsize(result.path)):
+            return None
+        with open(result.path, "rb") as f:
+            return self.put(result.bucket, result.key, result.etag, f)
+
+    def fetch(self, s3_client, bucket, key):
+        """读取对象，未命中时从 TOS 下载并写入缓存
+
+        Returns:
+            缓存文件路径，对象大于 ``max_object_bytes`` 时返回 None
+
+        """
+        path, body = self._fetch(s3_client, bucket, key)
+        if body is not None:
+            body.close()
+        return path
+
+    def open(self, s3_client, bucket, key):
+        """以只读方式打开缓存的对象，未命中时先下载
+
+        在打开之前缓存文件可能被其它进程淘汰，此时重新下载一次。
+        对象大于 ``max_object_bytes`` 时直接返回响应的 ``Body``，不落盘。
+
+        Returns:
+            二进制文件对象
+
+        """
+        for _ in range(2):
+            path, body = self._fetch(s3_client, bucket, key)
+            if body is not None:
+                return body
+            try:
+                return open(path, "rb")
+            except FileNotFoundError:
+                continue
+        raise FileNotFoundError(path)
+
+    def _fetch(self, s3_client, bucket, key):
+        # returns (path, None) for cached objects, (None, body) for oversized ones
+        etag = None
+        if self.validate:
+            etag = s3_client.head_object(Bucket=bucket, Key=key)["ETag"]
+        path = self.lookup(bucket, key, etag)
+        if path is not None:
+            debug("object cache hit: %s/%s", bucket, key)
+            return path, None
+        rsp = s3_client.get_object(Bucket=bucket, Key=key)
+        if not self.accepts(rsp["ContentLength"]):
+            debug("object too large to cache: %s/%s", bucket, key)
+            return None, rsp["Body"]
+        try:
+            return self.put(bucket, key, rsp["ETag"], rsp["Body"]), None
+        finally:
+            rsp["Body"].close()
+
+    def size(self):
+        with _FileLock(self._lock_path):
+            return self._read_size()
+
+    def clear(self):
+        """删除所有缓存的对象"""
+        with _FileLock(self._lock_path):
+            shutil.rmtree(self._objects_dir, ignore_errors=True)
+            os.makedirs(self._objects_dir, exist_ok=True)
+            self._write_size(0)
+
+    def _evict(self, target_bytes, keep_path):
+        entries = []
+        total = 0
+        for root, _, files in os.walk(self._objects_dir):
+            for name in files:
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                total += stat.st_size
+                if path != keep_path:
+                    entries.append((stat.st_mtime, stat.st_size, path))
+        entries.sort()
+        evicted = 0
+        for _, size, path in entries:
+            if total <= target_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            evicted += 1
+        debug("object cache evicted %d entries, %d bytes left", evicted, total)
+        return total
+
+    def _read_size(self):
+        try:
+            with open(self._size_path, encoding="utf-8") as f:
+                return int(f.read() or 0)
+        except (OSError, ValueError):
+            return 0
+
+    def _write_size(self, size):
+        with open(self._size_path, "w", encoding="utf-8") as f:
+            f.write(str(max(size, 0)))
+
+
+def default_cache():
+    """根据环境变量创建缓存
+
+    设置了 ``VOLC_ML_PLATFORM_CACHE_SIZE`` （字节数）时启用缓存，缓存目录由
+    ``VOLC_ML_PLATFORM_CACHE_DIR`` 指定，默认为 ``~/.volcengine_ml_platform/cache/``。
+
+    Returns:
+        ObjectCache，未启用时返回 None
+
+    """
+    max_bytes = os.getenv(CACHE_SIZE_ENV_NAME)
+    if not max_bytes:
+        return None
+    root = os.getenv(CACHE_DIR_ENV_NAME) or os.path.join(
+        cache_dir.HOME_DIR,
+        cache_dir.OBJECT_CACHE_ROOT,
+    )
+    return ObjectCache(root, int(max_bytes))
@@ -0,0 +1,151 @@
+"""把大量小对象的下载分散到多个进程，绕开 botocore 请求构造与签名受 GIL 限制的瓶颈"""
+import collections
+import copy
+import multiprocessing
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+
+from volcengine_ml_platform.io.progress import TransferMetrics
+
+DEFAULT_THREADS_PER_PROCESS = 16
+DEFAULT_BATCH_SIZE = 256
+
+# per-process state, set up by _init_worker in each pool process
+_worker_client = None
+_worker_executor = None
+
+
+def _init_worker(client, threads_per_process):
+    global _worker_client, _worker_executor
+    _worker_client = client
+    _worker_executor = ThreadPoolExecutor(max_workers=threads_per_process)
+
+
+def _download_one(kwargs):
+    path = _worker_client.download_file(**kwargs)
+    return path, os.path.getsize(path)
+
+
+def _download_batch(batch):
+    results = list(_worker_executor.map(_download_one, batch))
+    return [path for path, _ in results], sum(size for _, size in results)
+
+
+def _batches(iterable, batch_size):
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, batch_size))
+        if not batch:
+            return
+        yield batch
+
+
+class ProcessDownloader:
+    """在进程池中下载对象
+
+    每个进程持有自己的 s3 client 与线程池，任务按 ``batch_size`` 个一批分发，
+    每批的结果与字节数汇总回父进程。最多有 ``max_pending_batches`` 批任务在排队或执行，
+    输入可以是任意长的迭代器。
+
+    限速器的令牌桶不能跨进程共享，``client`` 的限速器按进程数均分，每个进程使用其中一份，
+    所有进程合计不超过原来的速率。
+
+    使用 ``spawn`` 或 ``forkserver`` 启动方式时，调用方的脚本需要放在
+    ``if __name__ == "__main__":`` 之下。
+
+    Args:
+        client(TOSClient): 用于下载的 TOSClient，会被序列化到每个进程中
+        processes(int): 进程数，默认为 CPU 核数
+        threads_per_process(int): 每个进程的下载线程数
+        batch_size(int): 每批的对象数
+        max_pending_batches(int): 最多同时提交的批数，默认为 ``2 * processes``
+        start_method(str): 进程启动方式，默认使用平台的默认方式
+        progress_callback(callable): 每完成一批调用一次，参数为 ``progress.TransferMetrics``
+
+    """
+
+    def __init__(
+        self,
+        client,
+        processes=None,
+        threads_per_process=DEFAULT_THREADS_PER_PROCESS,
+        batch_size=DEFAULT_BATCH_SIZE,
+        max_pending_batches=None,
+        start_method=None,
+        progress_callback=None,
+    ):
+        self.client = client
+        self.processes = processes or os.cpu_count() or 1
+        self.threads_per_process = threads_per_process
+        self.batch_size = batch_size
+        self.max_pending_batches = max_pending_batches or self.processes * 2
+        self.start_method = start_method
+        self.progress_callback = progress_callback
+        self._files_done = 0
+        self._bytes_done = 0
+        self._elapsed = 0.0
+
+    @property
+    def metrics(self):
+        """已完成部分的统计信息"""
+        return TransferMetrics(
+            self._files_done,
+            self._files_done,
+            self._bytes_done,
+            self._bytes_done,
+            self._elapsed,
+        )
+
+    def _worker_client(self):
+        # every process refills its own buckets, give each one a share of the limit
+        limiter = self.client._get_rate_limiter()
+        if limiter is None:
+            return self.client
+        client = copy.copy(self.client)
+        client.rate_limiter = limiter.split(self.processes)
+        return client
+
+    def download(self, tasks):
+        """下载 ``tasks`` 中的所有对象
+
+        Args:
+            tasks(iterable): ``TOSClient.download_file`` 关键字参数的字典
+
+        Returns:
+            按输入顺序生成本地文件路径的迭代器
+
+        """
+        ctx = multiprocessing.get_context(self.start_method)
+        start = time.monotonic()
+        pool = ctx.Pool(
+            self.processes,
+            initializer=_init_worker,
+            initargs=(self._worker_client(), self.threads_per_process),
+        )
+        pending = collections.deque()
+
+        def _collect():
+            paths, nbytes = pending.popleft().get()
+            self._files_done += len(paths)
+            self._bytes_done += nbytes
+            self._elapsed = time.monotonic() - start
+            if self.progress_callback is not None:
+                self.progress_callback(self.metrics)
+            return paths
+
+        try:
+            for batch in _batches(tasks, self.batch_size):
+                if len(pending) >= self.max_pending_batches:
+                    yield from _collect()
+                pending.append(pool.apply_async(_download_batch, (batch,)))
+            while pending:
+                yield from _collect()
+        except BaseException:
+            pool.terminate()
+            raise
+        else:
+            pool.close()
+        finally:
+            pool.join()
@@ -0,0 +1,116 @@
+"""汇总多个并发传输的进度与统计信息"""
+import threading
+import time
+
+from tqdm import tqdm
+
+
+class TransferMetrics:
+    """某一时刻的传输统计信息
+
+    Attributes:
+        files_total(int): 文件总数
+        files_done(int): 已完成的文件数
+        bytes_total(int): 字节总数
+        bytes_done(int): 已传输的字节数
+        elapsed(float): 已用时间，单位秒
+        bytes_per_second(float): 平均吞吐
+
+    """
+
+    def __init__(self, files_total, files_done, bytes_total, bytes_done, elapsed):
+        self.files_total = files_total
+        self.files_done = files_done
+        self.bytes_total = bytes_total
+        self.bytes_done = bytes_done
+        self.elapsed = elapsed
+        self.bytes_per_second = bytes_done / elapsed if elapsed > 0 else 0.0
+
+    def __repr__(self):
+        return (
+            f"TransferMetrics(files={self.files_done}/{self.files_total}, "
+            f"bytes={self.bytes_done}/{self.bytes_total}, "
+            f"bytes_per_second={self.bytes_per_second:.0f})"
+        )
+
+
+class TransferProgress:
+    """线程安全的传输进度汇总
+
+    所有并发传输共享一个按字节计数的 tqdm 进度条；``callback`` 最多每隔
+    ``callback_interval`` 秒被调用一次，传输结束时再调用一次，参数为 ``TransferMetrics``。
+
+    Args:
+        files_total(int): 文件总数，None 表示未知，此时统计信息中的总数等于已完成数
+        bytes_total(int): 字节总数，None 表示未知
+        callback(callable): 进度回调，默认为 None
+        callback_interval(float): 回调的最小间隔，单位秒
+        show_progress(bool): 是否显示 tqdm 进度条
+
+    """
+
+    def __init__(
+        self,
+        files_total,
+        bytes_total,
+        callback=None,
+        callback_interval=1.0,
+        show_progress=True,
+    ):
+        self.files_total = files_total
+        self.bytes_total = bytes_total
+        self.files_done = 0
+        self.bytes_done = 0
+        self.callback = callback
+        self.callback_interval = callback_interval
+        self._lock = threading.Lock()
+        self._start = time.monotonic()
+        self._last_callback = self._start
+        self._bar = None
+        if show_progress:
+            self._bar = tqdm(total=bytes_total, unit="B", unit_scale=True)
+
+    def add_bytes(self, n):
+        """记录新传输的 ``n`` 个字节，可直接作为 boto3 的 ``Callback``"""
+        with self._lock:
+            self.bytes_done += n
+            if self._bar is not None:
+                self._bar.update(n)
+            now = time.monotonic()
+            if (
+                self.callback is None
+                or now - self._last_callback < self.callback_interval
+            ):
+                return
+            self._last_callback = now
+            metrics = self._metrics(now)
+        self.callback(metrics)
+
+    def file_done(self):
+        with self._lock:
+            self.files_done += 1
+
+    def metrics(self):
+        with self._lock:
+            return self._metrics(time.monotonic())
+
+    def close(self):
+        if self._bar is not None:
+            self._bar.close()
+        if self.callback is not None:
+            self.callback(self.metrics())
+
+    def _metrics(self, now):
+        files_total = self.files_total
+        if files_total is None:
+            files_total = self.files_done
+        bytes_total = self.bytes_total
+        if bytes_total is None:
+            bytes_total = self.bytes_done
+        return TransferMetrics(
+            files_total,
+            self.files_done,
+            bytes_total,
+            self.bytes_done,
+            now - self._start,
+        )
@@ -0,0 +1,290 @@
+"""分段并发、可断点续传的对象下载"""
+import json
+import os
+import threading
+from concurrent.futures import as_completed
+from concurrent.futures import ThreadPoolExecutor
+from logging import debug
+
+from volcengine_ml_platform.io import integrity
+from volcengine_ml_platform.io import rate_limit
+
+DEFAULT_RANGE_SIZE = 16 * 1024 * 1024
+DEFAULT_MAX_WORKERS = 10
+READ_CHUNK_SIZE = 1024 * 1024
+
+TEMP_SUFFIX = ".tosdownload"
+JOURNAL_SUFFIX = ".tosdownload.journal"
+
+
+def plan_ranges(object_size, range_size=DEFAULT_RANGE_SIZE):
+    """把对象切分为若干字节区间
+
+    Returns:
+        ``[(index, start, end), ...]``，``end`` 为闭区间，与 HTTP Range 头一致
+
+    """
+    return [
+        (i, start, min(start + range_size, object_size) - 1)
+        for i, start in enumerate(range(0, object_size, range_size))
+    ]
+
+
+def _pwrite(fd, data, offset, lock):
+    data = memoryview(data)
+    if hasattr(os, "pwrite"):
+        while data:
+            n = os.pwrite(fd, data, offset)
+            data = data[n:]
+            offset += n
+    else:
+        with lock:
+            os.lseek(fd, offset, os.SEEK_SET)
+            while data:
+                n = os.write(fd, data)
+                data = data[n:]
+
+
+class DownloadJournal:
+    """记录已完成的字节区间
+
+    第一行是对象的元信息（大小、ETag、分段大小），之后每完成一个区间追加一行区间序号，
+    校验下载时序号之后还记录该区间的 CRC64。元信息与当前对象不一致时，已有的记录全部作废。
+    """
+
+    def __init__(self, path, meta):
+        self.path = path
+        self.meta = meta
+        self.done = set()
+        self.crcs = {}
+        self._lock = threading.Lock()
+        self._file = None
+
+    def open(self):
+        """读取已有记录并打开文件用于追加
+
+        Returns:
+            bool，是否沿用了已有记录
+
+        """
+        resumed = False
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                if json.loads(f.readline()) == self.meta:
+                    for line in f:
+                        fields = line.split()
+                        if fields:
+                            self.done.add(int(fields[0]))
+                        if len(fields) > 1:
+                            self.crcs[int(fields[0])] = int(fields[1])
+                    resumed = True
+        except (OSError, ValueError):
+            pass
+
+        if resumed:
+            self._file = open(self.path, "a", encoding="utf-8")
+        else:
+            self.done = set()
+            self.crcs = {}
+            self._file = open(self.path, "w", encoding="utf-8")
+            self._file.write(json.dumps(self.meta) + "\n")
+            self._file.flush()
+        return resumed
+
+    def mark_done(self, index, crc=None):
+        with self._lock:
+            self.done.add(index)
+            if crc is None:
+                self._file.write(f"{index}\n")
+            else:
+                self.crcs[index] = crc
+                self._file.write(f"{index} {crc}\n")
+            self._file.flush()
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def remove(self):
+        self.close()
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+
+
+class RangeDownloader:
+    """把对象切分为多个字节区间并发下载
+
+    - 下载前按对象大小预分配（稀疏）临时文件，各区间通过 ``pwrite`` 写入各自的位置
+    - 每完成一个区间就记录到旁路的 journal 文件中
+    - 下载中断后再次下载同一对象时，只会下载 journal 中缺失的区间
+    - 所有区间请求都带有 ``IfMatch`` ，对象在续传期间被修改会导致下载失败而不是文件损坏
+
+    Args:
+        s3_client: boto3 的 s3 client
+        range_size(int): 每个区间的大小
+        max_workers(int): 并发下载的区间数
+        limiter(adaptive_concurrency.AdaptiveConcurrency): 自适应并发控制器，
+            设置后同时下载的区间数由它决定，``max_workers`` 取其上限
+        verify(bool): 是否校验数据完整性。每个区间在写入时计算 CRC64，最后合并为整个对象的
+            CRC64 与服务端比对；需要安装 crcmod，否则给出警告，``result.verified`` 为 None
+        rate_limiter(rate_limit.RateLimiter): 限速器，区间请求使用 ``BULK`` 优先级
+
+    """
+
+    def __init__(
+        self,
+        s3_client,
+        range_size=DEFAULT_RANGE_SIZE,
+        max_workers=DEFAULT_MAX_WORKERS,
+        limiter=None,
+        verify=False,
+        rate_limiter=None,
+    ):
+        self.s3_client = s3_client
+        self.range_size = range_size
+        self.max_workers = max_workers if limiter is None else limiter.max_limit
+        self.limiter = limiter
+        self.verify = verify
+        self.rate_limiter = rate_limiter
+        # without crcmod the pure python CRC64 is too slow for large objects
+        self._compute_crc = verify and integrity.HAS_FAST_CRC64
+        # integrity.TransferResult of the last download when verify is set
+        self.result = None
+
+    def download(self, bucket, key, target_file_path):
+        """下载对象到 ``target_file_path``
+
+        下载过程中数据写入 ``target_file_path + ".tosdownload"``，全部完成后再重命名，
+        不会留下不完整的目标文件。
+
+        Returns:
+            返回下载文件路径
+
+        """
+        head = self.s3_client.head_object(Bucket=bucket, Key=key)
+        object_size = head["ContentLength"]
+        etag = head["ETag"]
+        meta = {"size": object_size, "etag": etag, "range_size": self.range_size}
+
+        temp_path = target_file_path + TEMP_SUFFIX
+        journal = DownloadJournal(target_file_path + JOURNAL_SUFFIX, meta)
+        if not os.path.exists(temp_path):
+            journal.remove()
+        resumed = journal.open()
+
+        try:
+            fd = os.open(
+                temp_path,
+                os.O_RDWR | os.O_CREAT | getattr(os, "O_BINARY", 0),
+                0o644,
+            )
+            try:
+                if not resumed:
+                    os.ftruncate(fd, 0)
+                os.ftruncate(fd, object_size)
+                ranges = [
+                    r
+                    for r in plan_ranges(object_size, self.range_size)
+                    if r[0] not in journal.done
+                ]
+                debug(
+                    "download %s/%s: %d ranges left, resumed=%s",
+                    bucket,
+                    key,
+                    len(ranges),
+                    resumed,
+                )
+                self._download_ranges(fd, bucket, key, etag, ranges, journal)
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+            if self.verify:
+                self._verify(head, bucket, key, temp_path, target_file_path, journal)
+        finally:
+            journal.close()
+
+        os.replace(temp_path, target_file_path)
+        journal.remove()
+        return target_file_path
+
+    def _verify(self, head, bucket, key, temp_path, target_file_path, journal):
+        object_size = head["ContentLength"]
+        crc = None
+        verified = None
+        remote = integrity.remote_crc64(head)
+        ranges = plan_ranges(object_size, self.range_size)
+        if all(index in journal.crcs for index, _, _ in ranges):
+            crc = 0
+            for index, start, end in ranges:
+                crc = integrity.crc64_combine(crc, journal.crcs[index], end + 1 - start)
+        if crc is not None and remote is not None:
+            if crc != remote:
+                # start over next time instead of resuming from corrupted data
+                os.remove(temp_path)
+                journal.remove()
+                raise integrity.IntegrityError(
+                    f"crc64 mismatch for tos://{bucket}/{key}: "
+                    f"local {crc}, remote {remote}",
+                )
+            verified = True
+        else:
+            integrity.warn_unverified(f"tos://{bucket}/{key}")
+        self.result = integrity.TransferResult(
+            target_file_path,
+            bucket,
+            key,
+            object_size,
+            integrity.normalize_etag(head["ETag"]),
+            None,
+            crc,
+            verified,
+        )
+
+    def _download_ranges(self, fd, bucket, key, etag, ranges, journal):
+        lock = threading.Lock()
+
+        def _download_range(index, start, end):
+            if self.rate_limiter is not None:
+                self.rate_limiter.request(rate_limit.BULK)
+            rsp = self.s3_client.get_object(
+                Bucket=bucket,
+                Key=key,
+                Range=f"bytes={start}-{end}",
+                IfMatch=etag,
+            )
+            body = rsp["Body"]
+            offset = start
+            crc = 0 if self._compute_crc else None
+            try:
+                while offset <= end:
+                    chunk = body.read(min(READ_CHUNK_SIZE, end + 1 - offset))
+                    if not chunk:
+                        raise OSError(
+                            f"unexpected end of stream at {offset}, range {start}-{end}",
+                        )
+                    if crc is not None:
+                        crc = integrity.crc64(chunk, crc)
+                    _pwrite(fd, chunk, offset, lock)
+                    offset += len(chunk)
+                    if self.limiter is not None:
+                        self.limiter.add_bytes(len(chunk))
+                    if self.rate_limiter is not None:
+                        self.rate_limiter.consume(len(chunk), rate_limit.BULK)
+            finally:
+                body.close()
+            os.fsync(fd)
+            journal.mark_done(index, crc)
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            if self.limiter is not None:
+                futures = [
+                    executor.submit(self.limiter.call, _download_range, *r)
+                    for r in ranges
+                ]
+            else:
+                futures = [executor.submit(_download_range, *r) for r in ranges]
+            for future in as_completed(futures):
+                future.result()
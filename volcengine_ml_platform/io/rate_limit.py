@@ -0,0 +1,275 @@
+"""限制 TOS 传输的带宽与请求速率，交互式读取优先于后台批量传输
+
+限速器可以在创建 TOSClient 时传入，也可以注册到进程内的 registry 中，
+未指定限速器的 TOSClient 使用 registry 中的默认限速器，比如：::
+
+    rate_limit.set_default_limiter(
+        rate_limit.RateLimiter(bytes_per_second=200 * 1024 * 1024),
+    )
+
+``get_object`` 等逐个读取对象的调用使用 ``INTERACTIVE`` 优先级，``download_file``、
+``upload_file`` 等批量传输使用 ``BULK`` 优先级；令牌不足时 ``INTERACTIVE`` 的请求先拿到令牌。
+"""
+import functools
+import os
+import threading
+import time
+
+INTERACTIVE = 0
+BULK = 1
+PRIORITIES = (INTERACTIVE, BULK)
+
+DEFAULT_LIMITER = "default"
+
+
+class TokenBucket:
+    """线程安全的令牌桶，按优先级分配令牌
+
+    令牌数为正时即可取走任意数量的令牌，令牌数可以变为负数，之后的调用等待令牌补足，
+    因此单次取走大于 ``burst`` 的令牌也不会死锁，长期的平均速率仍为 ``rate``。
+
+    Args:
+        rate(float): 每秒补充的令牌数
+        burst(float): 令牌数上限，默认为 ``rate``，即最多积攒一秒的令牌
+
+    """
+
+    def __init__(self, rate, burst=None):
+        if rate <= 0:
+            raise ValueError(f"rate should be positive, got {rate}")
+        self.rate = rate
+        self.burst = rate if burst is None else burst
+        self._tokens = self.burst
+        self._last = time.monotonic()
+        self._cond = threading.Condition()
+        self._waiting = [0] * len(PRIORITIES)
+
+    def __getstate__(self):
+        return {"rate": self.rate, "burst": self.burst}
+
+    def __setstate__(self, state):
+        self.__init__(state["rate"], state["burst"])
+
+    def acquire(self, amount, priority=BULK):
+        """取走 ``amount`` 个令牌，令牌不足或有更高优先级的调用在等待时阻塞"""
+        with self._cond:
+            self._waiting[priority] += 1
+            try:
+                while True:
+                    self._refill()
+                    blocked = any(self._waiting[p] for p in range(priority))
+                    if not blocked and self._tokens > 0:
+                        self._tokens -= amount
+                        return
+                    timeout = None
+                    if self._tokens <= 0:
+                        timeout = -self._tokens / self.rate + 0.001
+                    self._cond.wait(timeout)
+            finally:
+                self._waiting[priority] -= 1
+                self._cond.notify_all()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._last) * self.rate)
+        self._last = now
+
+
+class RateLimiter:
+    """带宽与请求速率限制
+
+    Args:
+        bytes_per_second(float): 带宽上限，None 表示不限制
+        requests_per_second(float): 请求速率上限，None 表示不限制
+        burst_seconds(float): 令牌最多积攒的时长
+
+    """
+
+    def __init__(
+        self,
+        bytes_per_second=None,
+        requests_per_second=None,
+        burst_seconds=1.0,
+    ):
+        self.bytes_per_second = bytes_per_second
+        self.requests_per_second = requests_per_second
+        self.burst_seconds = burst_seconds
+        self._bytes = None
+        self._requests = None
+        if bytes_per_second:
+            self._bytes = TokenBucket(
+                bytes_per_second,
+                bytes_per_second * burst_seconds,
+            )
+        if requests_per_second:
+            self._requests = TokenBucket(
+                requests_per_second,
+                requests_per_second * burst_seconds,
+            )
+        self._pid = os.getpid()
+
+    def request(self, priority=BULK):
+        """发出一个请求之前调用"""
+        self._check_pid()
+        if self._requests is not None:
+            self._requests.acquire(1, priority)
+
+    def consume(self, nbytes, priority=BULK):
+        """传输 ``nbytes`` 字节之前（或之后）调用"""
+        self._check_pid()
+        if self._bytes is not None and nbytes > 0:
+            self._bytes.acquire(nbytes, priority)
+
+    def split(self, parts):
+        """返回速率为当前 ``1 / parts`` 的新限速器，用于把总的限额分给 ``parts`` 个进程
+
+        令牌桶不能跨进程共享，每个进程持有其中一份时，所有进程合计仍不超过原来的速率。
+        """
+        return RateLimiter(
+            self.bytes_per_second / parts if self.bytes_per_second else None,
+            self.requests_per_second / parts if self.requests_per_second else None,
+            self.burst_seconds,
+        )
+
+    def callback(self, priority=BULK):
+        """返回可作为 boto3 传输 ``Callback`` 的函数，在传输线程中按字节数限速"""
+        return lambda nbytes: self.consume(nbytes, priority)
+
+    def _check_pid(self):
+        # a forked child gets fresh buckets, a condition held at fork would deadlock
+        if self._pid != os.getpid():
+            self.__init__(
+                self.bytes_per_second,
+                self.requests_per_second,
+                self.burst_seconds,
+            )
+
+
+_registry = {}
+_registry_lock = threading.Lock()
+
+
+def register(name, limiter):
+    """以 ``name`` 注册进程内共享的限速器，``limiter`` 为 None 时取消注册"""
+    with _registry_lock:
+        if limiter is None:
+            _registry.pop(name, None)
+        else:
+            _registry[name] = limiter
+
+
+def get_limiter(name=DEFAULT_LIMITER):
+    """返回以 ``name`` 注册的限速器，不存在时返回 None"""
+    return _registry.get(name)
+
+
+def set_default_limiter(limiter):
+    """设置未指定限速器的 TOSClient 使用的默认限速器"""
+    register(DEFAULT_LIMITER, limiter)
+
+
+class _LimitedBody:
+    """``get_object`` 返回的 ``Body`` 的代理，读取时按字节数限速"""
+
+    def __init__(self, body, limiter, priority):
+        self._body = body
+        self._limiter = limiter
+        self._priority = priority
+
+    def read(self, amt=None):
+        data = self._body.read(amt)
+        self._limiter.consume(len(data), self._priority)
+        return data
+
+    def readinto(self, b):
+        n = self._body.readinto(b)
+        self._limiter.consume(n or 0, self._priority)
+        return n
+
+    def iter_chunks(self, chunk_size=1024 * 1024):
+        while True:
+            chunk = self.read(chunk_size)
+            if not chunk:
+                break
+            yield chunk
+
+    def __getattr__(self, name):
+        return getattr(self._body, name)
+
+
+class LimitedClient:
+    """boto3 s3 client 的代理，所有请求经过同一个限速器
+
+    - 每个 API 调用之前计一次请求
+    - ``put_object`` / ``upload_part`` 等请求的 ``Body`` 有长度时按长度计数，
+      响应中的 ``Body`` 在读取时按字节数计数
+    - ``upload_file`` / ``download_file`` 等传输计一次请求，字节数通过 ``Callback`` 计数，
+      调用方传入的 ``Callback`` 仍会被调用
+
+    没有限速参数的模块（比如 ``sync``、``tos_file``、``listing``）拿到这个代理即可限速，
+    已经接受 ``rate_limiter`` 参数的模块应直接传入原始 client，避免重复计数。
+
+    Args:
+        s3_client: boto3 的 s3 client
+        limiter(RateLimiter): 限速器
+        priority(int): ``INTERACTIVE`` 或 ``BULK``
+
+    """
+
+    _TRANSFERS = frozenset(
+        ["upload_file", "download_file", "upload_fileobj", "download_fileobj"],
+    )
+    # client methods that do not send a request
+    _LOCAL = frozenset(
+        [
+            "can_paginate",
+            "close",
+            "generate_presigned_post",
+            "generate_presigned_url",
+            "get_paginator",
+            "get_waiter",
+        ],
+    )
+
+    def __init__(self, s3_client, limiter, priority=BULK):
+        self.s3_client = s3_client
+        self.limiter = limiter
+        self.priority = priority
+
+    def __getattr__(self, name):
+        attr = getattr(self.s3_client, name)
+        if name.startswith("_") or name in self._LOCAL or not callable(attr):
+            return attr
+        if name in self._TRANSFERS:
+            return functools.partial(self._transfer, attr)
+        return functools.partial(self._call, attr)
+
+    def _call(self, method, *args, **kwargs):
+        self.limiter.request(self.priority)
+        body = kwargs.get("Body")
+        if isinstance(body, (bytes, bytearray)):
+            self.limiter.consume(len(body), self.priority)
+        elif isinstance(body, memoryview):
+            self.limiter.consume(body.nbytes, self.priority)
+        elif hasattr(body, "__len__"):
+            # e.g. multipart_upload.MemoryViewReader
+            self.limiter.consume(len(body), self.priority)
+        rsp = method(*args, **kwargs)
+        if isinstance(rsp, dict) and "Body" in rsp:
+            rsp["Body"] = _LimitedBody(rsp["Body"], self.limiter, self.priority)
+        return rsp
+
+    def _transfer(self, method, *args, **kwargs):
+        self.limiter.request(self.priority)
+        throttle = self.limiter.callback(self.priority)
+        callback = kwargs.get("Callback")
+        if callback is None:
+            kwargs["Callback"] = throttle
+        else:
+
+            def _callback(nbytes):
+                throttle(nbytes)
+                callback(nbytes)
+
+            kwargs["Callback"] = _callback
+        return method(*args, **kwargs)
@@ -0,0 +1,255 @@
+"""控制尾延迟的请求策略：带抖动的指数退避重试、请求截止时间与对冲请求"""
+import collections
+import os
+import random
+import socket
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import wait
+from logging import debug
+
+import botocore.exceptions
+
+from volcengine_ml_platform.io.adaptive_concurrency import is_throttled
+
+RETRYABLE_ERRORS = (
+    botocore.exceptions.ConnectionError,
+    botocore.exceptions.HTTPClientError,
+    botocore.exceptions.IncompleteReadError,
+    ConnectionError,
+    socket.timeout,
+)
+if hasattr(botocore.exceptions, "ResponseStreamingError"):
+    RETRYABLE_ERRORS += (botocore.exceptions.ResponseStreamingError,)
+
+# hedge only once this many latencies have been observed
+MIN_LATENCY_SAMPLES = 20
+
+
+class DeadlineExceeded(TimeoutError):
+    """请求（包括所有重试）超过了截止时间"""
+
+
+def is_retryable(exc):
+    """判断异常是否值得重试：网络错误、限流与服务端 5xx"""
+    if isinstance(exc, RETRYABLE_ERRORS) or is_throttled(exc):
+        return True
+    if isinstance(exc, botocore.exceptions.ClientError):
+        status = exc.response.get("ResponseMetadata", {}).get("HTTPStatusCode")
+        return status is not None and status >= 500
+    return False
+
+
+class RequestStats:
+    """请求策略的计数器
+
+    Attributes:
+        requests(int): 执行的请求数
+        retries(int): 重试次数
+        hedges_fired(int): 发出的对冲请求数
+        hedges_won(int): 对冲请求先于原请求返回的次数
+        deadline_exceeded(int): 超过截止时间而失败的请求数
+
+    """
+
+    def __init__(self):
+        self.requests = 0
+        self.retries = 0
+        self.hedges_fired = 0
+        self.hedges_won = 0
+        self.deadline_exceeded = 0
+
+    def __repr__(self):
+        return (
+            f"RequestStats(requests={self.requests}, retries={self.retries}, "
+            f"hedges_fired={self.hedges_fired}, hedges_won={self.hedges_won}, "
+            f"deadline_exceeded={self.deadline_exceeded})"
+        )
+
+
+class RequestPolicy:
+    """对读请求执行重试、截止时间与对冲
+
+    - 网络错误、限流与 5xx 按带完全抖动的指数退避重试，最多 ``max_attempts`` 次
+    - ``deadline`` 限制一次请求（包括所有重试）的总耗时，超时抛出 ``DeadlineExceeded``；
+      TOSClient 同时把 botocore 的 ``read_timeout`` 设为 ``deadline``，被放弃的请求不会一直占用线程
+    - ``hedge=True`` 时，请求在最近延迟的 ``hedge_quantile`` 分位数之后仍未返回，
+      就再发出一个相同的请求，使用先返回的结果；样本不足时使用 ``hedge_delay``
+
+    被放弃的请求会在后台执行完，结果直接丢弃，因此只应对幂等的读请求使用。
+
+    比如：::
+
+        policy = RequestPolicy(deadline=5, hedge=True)
+        client = TOSClient(request_policy=policy)
+        data = client.get_object(bucket, key).read()
+        print(policy.stats)
+
+    Args:
+        max_attempts(int): 最大尝试次数，包括第一次请求
+        base_delay(float): 第一次重试的最大退避时间，单位为秒
+        max_delay(float): 退避时间的上限
+        deadline(float): 一次请求的截止时间，单位为秒，None 表示不限制
+        hedge(bool): 是否发出对冲请求
+        hedge_quantile(float): 计算对冲延迟使用的分位数
+        hedge_delay(float): 延迟样本不足时的对冲延迟
+        latency_samples(int): 保留的最近延迟样本数
+        max_workers(int): 执行请求的线程数
+
+    """
+
+    def __init__(
+        self,
+        max_attempts=3,
+        base_delay=0.1,
+        max_delay=2.0,
+        deadline=None,
+        hedge=False,
+        hedge_quantile=0.95,
+        hedge_delay=0.5,
+        latency_samples=1000,
+        max_workers=16,
+    ):
+        self.max_attempts = max(1, max_attempts)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.deadline = deadline
+        self.hedge = hedge
+        self.hedge_quantile = hedge_quantile
+        self.initial_hedge_delay = hedge_delay
+        self.max_workers = max_workers
+        self.stats = RequestStats()
+        self._latencies = collections.deque(maxlen=latency_samples)
+        self._lock = threading.Lock()
+        self._executor = None
+        self._executor_pid = None
+
+    def __getstate__(self):
+        # executors can not be pickled, the receiver creates its own
+        state = self.__dict__.copy()
+        state["_executor"] = None
+        state["_lock"] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def hedge_delay(self):
+        """当前的对冲延迟：最近请求延迟的 ``hedge_quantile`` 分位数"""
+        with self._lock:
+            if len(self._latencies) < MIN_LATENCY_SAMPLES:
+                return self.initial_hedge_delay
+            latencies = sorted(self._latencies)
+        index = min(int(len(latencies) * self.hedge_quantile), len(latencies) - 1)
+        return latencies[index]
+
+    def backoff(self, attempt):
+        """第 ``attempt`` 次失败后的退避时间（完全抖动）"""
+        return random.uniform(
+            0,
+            min(self.max_delay, self.base_delay * 2 ** (attempt - 1)),
+        )
+
+    def execute(self, fn):
+        """按策略执行 ``fn``
+
+        Args:
+            fn(callable): 无参数的幂等函数
+
+        Returns:
+            ``fn`` 的返回值
+
+        Raises:
+            DeadlineExceeded: 超过截止时间
+
+        """
+        deadline = None
+        if self.deadline is not None:
+            deadline = time.monotonic() + self.deadline
+        with self._lock:
+            self.stats.requests += 1
+        attempt = 0
+        while True:
+            attempt += 1
+            try:
+                return self._attempt(fn, deadline)
+            except DeadlineExceeded:
+                with self._lock:
+                    self.stats.deadline_exceeded += 1
+                raise
+            except Exception as e:
+                if not is_retryable(e) or attempt >= self.max_attempts:
+                    raise
+                delay = self.backoff(attempt)
+                if deadline is not None and time.monotonic() + delay >= deadline:
+                    raise
+                debug("request failed, retry %d in %.3fs: %s", attempt, delay, e)
+                with self._lock:
+                    self.stats.retries += 1
+                time.sleep(delay)
+
+    def _get_executor(self):
+        if self._executor is None or self._executor_pid != os.getpid():
+            with self._lock:
+                if self._executor is None or self._executor_pid != os.getpid():
+                    self._executor = ThreadPoolExecutor(max_workers=self.max_workers)
+                    self._executor_pid = os.getpid()
+        return self._executor
+
+    def _timed(self, fn):
+        start = time.monotonic()
+        result = fn()
+        with self._lock:
+            self._latencies.append(time.monotonic() - start)
+        return result
+
+    def _attempt(self, fn, deadline):
+        executor = self._get_executor()
+        primary = executor.submit(self._timed, fn)
+        pending = {primary}
+        hedge = None
+        if self.hedge:
+            done, pending = wait(
+                pending, timeout=_remaining(deadline, self.hedge_delay())
+            )
+            if not done and not _expired(deadline):
+                hedge = executor.submit(self._timed, fn)
+                pending.add(hedge)
+                with self._lock:
+                    self.stats.hedges_fired += 1
+            pending |= done
+
+        error = None
+        while pending:
+            done, pending = wait(
+                pending,
+                timeout=_remaining(deadline),
+                return_when=FIRST_COMPLETED,
+            )
+            if not done:
+                raise DeadlineExceeded(
+                    f"request did not finish within {self.deadline}s",
+                )
+            for future in done:
+                exc = future.exception()
+                if exc is None:
+                    if future is hedge:
+                        with self._lock:
+                            self.stats.hedges_won += 1
+                    return future.result()
+                error = exc
+        raise error
+
+
+def _remaining(deadline, timeout=None):
+    if deadline is None:
+        return timeout
+    remaining = max(deadline - time.monotonic(), 0)
+    return remaining if timeout is None else min(remaining, timeout)
+
+
+def _expired(deadline):
+    return deadline is not None and time.monotonic() >= deadline
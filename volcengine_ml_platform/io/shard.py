@@ -0,0 +1,313 @@
+"""把大量小文件打包为带偏移索引的 tar 分片，按样本随机读取或按分片顺序读取
+
+一个分片数据集由若干 tar 文件与一个索引组成：::
+
+    <prefix>shard-00000.tar
+    <prefix>shard-00001.tar
+    ...
+    <prefix>index.npz
+
+分片是标准的 tar 文件，可以直接用 ``tar -xf`` 解开；每个样本的内容在分片中连续存放。
+索引记录每个样本所在的分片、数据起始偏移与长度，读取单个样本只需一次 Range 请求。
+"""
+import io
+import os
+import tarfile
+import time
+from logging import debug
+
+import numpy as np
+
+from volcengine_ml_platform.io import rate_limit
+
+DEFAULT_SHARD_SIZE = 256 * 1024 * 1024
+SHARD_NAME_FORMAT = "shard-{:05d}.tar"
+INDEX_NAME = "index.npz"
+
+
+class ShardIndex:
+    """分片数据集的索引
+
+    Attributes:
+        shards(list): 分片文件名
+        names(list): 样本名
+        shard_ids(np.ndarray): 每个样本所在分片的下标
+        offsets(np.ndarray): 每个样本的数据在分片中的起始偏移
+        sizes(np.ndarray): 每个样本的字节数
+
+    """
+
+    def __init__(self, shards, names, shard_ids, offsets, sizes):
+        self.shards = list(shards)
+        self.names = list(names)
+        self.shard_ids = np.asarray(shard_ids, dtype=np.uint32)
+        self.offsets = np.asarray(offsets, dtype=np.uint64)
+        self.sizes = np.asarray(sizes, dtype=np.uint64)
+        self._positions = None
+
+    def __len__(self):
+        return len(self.names)
+
+    def position(self, name):
+        """返回样本名对应的下标"""
+        if self._positions is None:
+            self._positions = {n: i for i, n in enumerate(self.names)}
+        return self._positions[name]
+
+    def save(self, fileobj):
+        # names are stored as one utf-8 blob plus end offsets, no pickle needed
+        encoded = [name.encode("utf-8") for name in self.names]
+        np.savez_compressed(
+            fileobj,
+            shards=np.array(self.shards),
+            names=np.frombuffer(b"".join(encoded), dtype=np.uint8),
+            name_ends=np.cumsum([len(n) for n in encoded], dtype=np.uint64),
+            shard_ids=self.shard_ids,
+            offsets=self.offsets,
+            sizes=self.sizes,
+        )
+
+    @classmethod
+    def load(cls, fileobj):
+        with np.load(fileobj) as data:
+            blob = data["names"].tobytes()
+            ends = data["name_ends"].tolist()
+            starts = [0] + ends[:-1]
+            names = [blob[s:e].decode("utf-8") for s, e in zip(starts, ends)]
+            return cls(
+                [str(s) for s in data["shards"]],
+                names,
+                data["shard_ids"],
+                data["offsets"],
+                data["sizes"],
+            )
+
+
+class ShardWriter:
+    """把样本依次写入本地的 tar 分片，分片大小超过 ``shard_size`` 时开始新的分片
+
+    比如：::
+
+        with ShardWriter("/tmp/shards", on_shard_done=upload) as writer:
+            for path in paths:
+                writer.add_file(path, os.path.relpath(path, root))
+
+    Args:
+        output_dir(str): 分片与索引的输出目录
+        shard_size(int): 单个分片的目标大小
+        on_shard_done(callable): 每写完一个分片调用一次，参数为分片的本地路径，
+            可用于边打包边上传
+
+    """
+
+    def __init__(self, output_dir, shard_size=DEFAULT_SHARD_SIZE, on_shard_done=None):
+        self.output_dir = output_dir
+        self.shard_size = shard_size
+        self.on_shard_done = on_shard_done
+        os.makedirs(output_dir, exist_ok=True)
+        self._shards = []
+        self._names = []
+        self._shard_ids = []
+        self._offsets = []
+        self._sizes = []
+        self._tar = None
+        self._fileobj = None
+        self.index = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if exc_type is None:
+            self.close()
+        elif self._tar is not None:
+            self._tar.close()
+            self._fileobj.close()
+
+    def add(self, name, data):
+        """写入一个样本
+
+        Args:
+            name(str): 样本名，通常为相对路径
+            data(bytes): 样本内容
+
+        """
+        self.add_fileobj(name, io.BytesIO(data), len(data))
+
+    def add_file(self, file_path, name=None):
+        """写入一个本地文件，``name`` 默认为文件名"""
+        with open(file_path, "rb") as f:
+            self.add_fileobj(
+                name or os.path.basename(file_path),
+                f,
+                os.fstat(f.fileno()).st_size,
+            )
+
+    def add_fileobj(self, name, fileobj, size):
+        if self._tar is None or self._fileobj.tell() >= self.shard_size:
+            self._next_shard()
+        info = tarfile.TarInfo(name)
+        info.size = size
+        info.mtime = int(time.time())
+        self._tar.addfile(info, fileobj)
+        # addfile works on a copy of info, derive the data offset from the end
+        padded = -(-size // tarfile.BLOCKSIZE) * tarfile.BLOCKSIZE
+        self._names.append(name)
+        self._shard_ids.append(len(self._shards) - 1)
+        self._offsets.append(self._tar.offset - padded)
+        self._sizes.append(size)
+
+    def close(self):
+        """结束最后一个分片并写出索引
+
+        Returns:
+            ShardIndex
+
+        """
+        if self.index is not None:
+            return self.index
+        self._finish_shard()
+        index = ShardIndex(
+            self._shards,
+            self._names,
+            self._shard_ids,
+            self._offsets,
+            self._sizes,
+        )
+        with open(os.path.join(self.output_dir, INDEX_NAME), "wb") as f:
+            index.save(f)
+        self.index = index
+        return index
+
+    def _next_shard(self):
+        self._finish_shard()
+        name = SHARD_NAME_FORMAT.format(len(self._shards))
+        self._shards.append(name)
+        self._fileobj = open(os.path.join(self.output_dir, name), "wb")
+        self._tar = tarfile.open(
+            fileobj=self._fileobj,
+            mode="w",
+            format=tarfile.PAX_FORMAT,
+        )
+
+    def _finish_shard(self):
+        if self._tar is None:
+            return
+        self._tar.close()
+        self._fileobj.close()
+        path = self._fileobj.name
+        self._tar = None
+        self._fileobj = None
+        debug("shard done: %s", path)
+        if self.on_shard_done is not None:
+            self.on_shard_done(path)
+
+
+class ShardReader:
+    """读取 TOS 上的分片数据集
+
+    ``read`` 通过一次 Range 请求读取单个样本，适合随机访问；``iter_shard`` 顺序读取整个
+    分片，适合按分片打乱后的顺序遍历。
+
+    Args:
+        tos_client(TOSClient): 用于读取的 TOSClient
+        bucket(str): bucket 名
+        prefix(str): 分片数据集的前缀，以 ``/`` 结尾
+        index(ShardIndex): 已加载的索引，默认从 ``<prefix>index.npz`` 读取
+
+    """
+
+    def __init__(self, tos_client, bucket, prefix, index=None):
+        self.tos_client = tos_client
+        self.bucket = bucket
+        self.prefix = prefix
+        if index is None:
+            body = tos_client.get_object(bucket, prefix + INDEX_NAME)
+            try:
+                index = ShardIndex.load(io.BytesIO(body.read()))
+            finally:
+                body.close()
+        self.index = index
+
+    def __len__(self):
+        return len(self.index)
+
+    def _s3_client(self):
+        return self.tos_client._limited_s3_client(rate_limit.INTERACTIVE)
+
+    def read(self, i):
+        """读取第 ``i`` 个样本的内容"""
+        index = self.index
+        offset = int(index.offsets[i])
+        size = int(index.sizes[i])
+        key = self.prefix + index.shards[index.shard_ids[i]]
+        if size == 0:
+            return b""
+        rsp = self._s3_client().get_object(
+            Bucket=self.bucket,
+            Key=key,
+            Range=f"bytes={offset}-{offset + size - 1}",
+        )
+        body = rsp["Body"]
+        try:
+            return body.read()
+        finally:
+            body.close()
+
+    def read_by_name(self, name):
+        """按样本名读取样本的内容"""
+        return self.read(self.index.position(name))
+
+    def iter_shard(self, shard_id):
+        """顺序读取一个分片
+
+        Returns:
+            生成 ``(样本名, 内容)`` 的迭代器
+
+        """
+        key = self.prefix + self.index.shards[shard_id]
+        body = self._s3_client().get_object(Bucket=self.bucket, Key=key)["Body"]
+        try:
+            with tarfile.open(fileobj=body, mode="r|") as tar:
+                for member in tar:
+                    if not member.isfile():
+                        continue
+                    yield member.name, tar.extractfile(member).read()
+        finally:
+            body.close()
+
+    def __iter__(self):
+        for shard_id in range(len(self.index.shards)):
+            yield from self.iter_shard(shard_id)
+
+
+def pack_and_upload(tos_client, files, bucket, prefix, work_dir, shard_size):
+    """把文件打包为分片并上传到 ``bucket/prefix``，每写完一个分片就上传并删除本地文件
+
+    Args:
+        tos_client(TOSClient): 用于上传的 TOSClient
+        files(iterable): ``(file_path, name)`` 的迭代器
+        bucket(str): 上传 bucket 名
+        prefix(str): 分片数据集的前缀，以 ``/`` 结尾
+        work_dir(str): 本地临时目录，最多同时存放一个分片
+        shard_size(int): 单个分片的目标大小
+
+    Returns:
+        ShardIndex
+
+    """
+
+    def _upload(path):
+        tos_client.upload_file_low_level(
+            path,
+            bucket,
+            prefix + os.path.basename(path),
+            resume=False,
+        )
+        os.remove(path)
+
+    with ShardWriter(work_dir, shard_size, on_shard_done=_upload) as writer:
+        for file_path, name in files:
+            writer.add_file(file_path, name)
+    _upload(os.path.join(work_dir, INDEX_NAME))
+    return writer.index
@@ -0,0 +1,197 @@
+"""把内存中逐步产生的数据以分片上传写入 TOS，不需要先写到本地文件"""
+import io
+import threading
+from logging import debug
+
+from volcengine_ml_platform.io import rate_limit
+from volcengine_ml_platform.io.multipart_upload import DEFAULT_MAX_WORKERS
+from volcengine_ml_platform.io.multipart_upload import DEFAULT_PART_SIZE
+from volcengine_ml_platform.io.multipart_upload import MAX_PART_COUNT
+from volcengine_ml_platform.io.multipart_upload import MemoryViewReader
+from volcengine_ml_platform.io.multipart_upload import MIN_PART_SIZE
+from volcengine_ml_platform.util.bounded_executor import BoundedExecutor
+
+# the total size is unknown up front, double the part size every this many parts
+PART_SIZE_GROWTH_INTERVAL = 1000
+
+
+class MultipartWriter(io.BufferedIOBase):
+    """只写的文件对象，写入的数据按分片大小缓存并在后台并发上传
+
+    数据不超过一个分片时，``close`` 通过一次 ``put_object`` 上传；否则在第一个分片写满时
+    创建分片上传，``close`` 时上传最后一个分片并完成上传。``with`` 块中抛出异常时取消上传，
+    不会留下不完整的对象；没有调用 ``close`` 就被回收时同样取消上传。
+
+    最多有 ``max_workers`` 个分片在上传，写入方在更多分片写满时阻塞，
+    内存占用不超过 ``(max_workers + 1) * part_size``。
+
+    比如：::
+
+        with client.open_write(bucket, "ckpt/model.pt") as f:
+            torch.save(model.state_dict(), f)
+
+    Args:
+        s3_client: boto3 的 s3 client
+        bucket(str): bucket 名
+        key(str): 对象的 key
+        part_size(int): 分片大小，不小于 ``MIN_PART_SIZE``
+        max_workers(int): 并发上传的分片数
+        rate_limiter(rate_limit.RateLimiter): 限速器，分片请求使用 ``BULK`` 优先级
+
+    """
+
+    def __init__(
+        self,
+        s3_client,
+        bucket,
+        key,
+        part_size=DEFAULT_PART_SIZE,
+        max_workers=DEFAULT_MAX_WORKERS,
+        rate_limiter=None,
+    ):
+        super().__init__()
+        self.s3_client = s3_client
+        self.bucket = bucket
+        self.key = key
+        self.part_size = max(part_size, MIN_PART_SIZE)
+        self.max_workers = max_workers
+        self.rate_limiter = rate_limiter
+        self.upload_id = None
+        self._buffer = bytearray()
+        self._part_number = 0
+        self._etags = {}
+        self._lock = threading.Lock()
+        self._executor = None
+        self._written = 0
+
+    def writable(self):
+        return True
+
+    def tell(self):
+        return self._written
+
+    def write(self, b):
+        if self.closed:
+            raise ValueError("write to closed file")
+        view = memoryview(b).cast("B")
+        size = len(view)
+        while len(view):
+            n = min(len(view), self._current_part_size() - len(self._buffer))
+            self._buffer += view[:n]
+            view = view[n:]
+            if len(self._buffer) >= self._current_part_size():
+                self._flush_part()
+        self._written += size
+        return size
+
+    def close(self):
+        """上传剩余的数据并完成上传"""
+        if self.closed:
+            return
+        try:
+            if self.upload_id is None:
+                self._throttle(len(self._buffer))
+                self.s3_client.put_object(
+                    Bucket=self.bucket,
+                    Key=self.key,
+                    Body=bytes(self._buffer),
+                )
+            else:
+                if self._buffer:
+                    self._flush_part()
+                self._executor.shutdown()
+                self._executor.raise_error()
+                parts = [
+                    {"PartNumber": n, "ETag": self._etags[n]}
+                    for n in sorted(self._etags)
+                ]
+                self.s3_client.complete_multipart_upload(
+                    Bucket=self.bucket,
+                    Key=self.key,
+                    UploadId=self.upload_id,
+                    MultipartUpload={"Parts": parts},
+                )
+                debug("stream upload completed: %s, %d parts", self.key, len(parts))
+        except BaseException:
+            self.abort()
+            raise
+        finally:
+            self._buffer = bytearray()
+            super().close()
+
+    def abort(self, wait=True):
+        """取消上传，已上传的分片被删除
+
+        Args:
+            wait(bool): 是否等待上传中的分片结束
+
+        """
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait)
+        if self.upload_id is not None:
+            self.s3_client.abort_multipart_upload(
+                Bucket=self.bucket,
+                Key=self.key,
+                UploadId=self.upload_id,
+            )
+            self.upload_id = None
+        self._buffer = bytearray()
+        if not self.closed:
+            super().close()
+
+    def __del__(self):
+        # io's finalizer would close() and commit a truncated object; this may run
+        # on one of our own worker threads, which can not be joined from there
+        if not self.closed:
+            try:
+                self.abort(wait=False)
+            except Exception as e:
+                debug("cannot abort stream upload of %s: %s", self.key, e)
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+    def _current_part_size(self):
+        growth = self._part_number // PART_SIZE_GROWTH_INTERVAL
+        return self.part_size << growth
+
+    def _flush_part(self):
+        if self.upload_id is None:
+            rsp = self.s3_client.create_multipart_upload(
+                Bucket=self.bucket,
+                Key=self.key,
+            )
+            self.upload_id = rsp["UploadId"]
+            self._executor = BoundedExecutor(
+                max_workers=self.max_workers,
+                max_pending=self.max_workers,
+            )
+        self._part_number += 1
+        if self._part_number > MAX_PART_COUNT:
+            raise OSError(f"too many parts for {self.key}, increase part_size")
+        data, self._buffer = self._buffer, bytearray()
+        self._executor.submit(self._upload_part, self._part_number, data)
+
+    def _throttle(self, nbytes):
+        if self.rate_limiter is not None:
+            self.rate_limiter.request(rate_limit.BULK)
+            self.rate_limiter.consume(nbytes, rate_limit.BULK)
+
+    def _upload_part(self, part_number, data):
+        self._throttle(len(data))
+        body = MemoryViewReader(memoryview(data))
+        try:
+            rsp = self.s3_client.upload_part(
+                Bucket=self.bucket,
+                Key=self.key,
+                PartNumber=part_number,
+                UploadId=self.upload_id,
+                Body=body,
+            )
+        finally:
+            body.close()
+        with self._lock:
+            self._etags[part_number] = rsp["ETag"]
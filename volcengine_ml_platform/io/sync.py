@@ -0,0 +1,287 @@
+"""本地目录与 TOS 前缀之间的增量同步，只传输有变化的文件"""
+import hashlib
+import json
+import math
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from logging import debug
+from logging import info
+
+from volcengine_ml_platform.io import integrity
+from volcengine_ml_platform.io.dir_upload import DirectoryUploader
+from volcengine_ml_platform.io.integrity import etag_part_count
+from volcengine_ml_platform.io.integrity import normalize_etag
+from volcengine_ml_platform.io.listing import iter_objects
+from volcengine_ml_platform.util import cache_dir
+from volcengine_ml_platform.util.bounded_executor import BoundedExecutor
+
+COMPARE_ETAG = "etag"
+COMPARE_SIZE_MTIME = "size_mtime"
+
+HASH_CHUNK_SIZE = 8 * 1024 * 1024
+MiB = 1024 * 1024
+# part sizes used by boto3 (8 MiB) and upload_file_low_level (20 MiB) come first
+COMMON_PART_SIZES = [8 * MiB, 20 * MiB, 16 * MiB, 5 * MiB, 10 * MiB, 32 * MiB, 64 * MiB]
+
+
+def compute_etag(file_path, remote_etag=""):
+    """按 TOS/S3 的规则计算本地文件的 ETag
+
+    普通上传的 ETag 是内容的 md5；分片上传的 ETag 形如 ``<md5 of part md5s>-<N>``，
+    此时从常见的分片大小中选出与分片数 N 相符的一个，都不相符时按 MiB 对齐推算。
+
+    Args:
+        file_path(str): 本地文件路径
+        remote_etag(str): 远端对象的 ETag，用于判断是否为分片上传
+
+    Returns:
+        不带引号的 ETag
+
+    """
+    part_count = etag_part_count(remote_etag)
+    size = os.path.getsize(file_path)
+    part_size = None
+    if part_count > 0:
+        part_size = math.ceil(size / part_count / MiB) * MiB or MiB
+        for candidate in COMMON_PART_SIZES:
+            if math.ceil(size / candidate) == part_count:
+                part_size = candidate
+                break
+
+    checksum = integrity.Checksum(crc64=False, part_size=part_size)
+    with open(file_path, "rb") as f:
+        while True:
+            chunk = f.read(HASH_CHUNK_SIZE)
+            if not chunk:
+                break
+            checksum.update(chunk)
+    return checksum.etag(multipart=part_count > 0)
+
+
+class SyncResult:
+    """一次同步的结果
+
+    Attributes:
+        transferred(int): 传输的文件数
+        skipped(int): 没有变化而跳过的文件数
+        bytes_transferred(int): 传输的字节数
+
+    """
+
+    def __init__(self):
+        self.transferred = 0
+        self.skipped = 0
+        self.bytes_transferred = 0
+
+    def __repr__(self):
+        return (
+            f"SyncResult(transferred={self.transferred}, skipped={self.skipped}, "
+            f"bytes_transferred={self.bytes_transferred})"
+        )
+
+
+class HashCache:
+    """缓存本地文件的 ETag，避免每次同步都重新读取文件
+
+    以 ``(size, mtime_ns)`` 判断文件是否被修改过，保存在
+    ``~/.volcengine_ml_platform/sync/`` 下，每个本地根目录一个文件。
+    """
+
+    def __init__(self, local_root):
+        digest = hashlib.sha1(os.path.abspath(local_root).encode("utf-8")).hexdigest()
+        self.path = os.path.join(
+            cache_dir.HOME_DIR,
+            cache_dir.SYNC_ROOT,
+            f"{digest}.json",
+        )
+        self._lock = threading.Lock()
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                self._entries = json.load(f)
+        except (OSError, ValueError):
+            self._entries = {}
+
+    def get(self, file_path, stat):
+        entry = self._entries.get(os.path.abspath(file_path))
+        if entry and entry[0] == stat.st_size and entry[1] == stat.st_mtime_ns:
+            return entry[2]
+        return None
+
+    def put(self, file_path, stat, etag):
+        with self._lock:
+            self._entries[os.path.abspath(file_path)] = [
+                stat.st_size,
+                stat.st_mtime_ns,
+                normalize_etag(etag),
+            ]
+
+    def put_result(self, result):
+        """记录一次带校验的传输（``integrity.TransferResult``）的 ETag，校验未通过的结果不记录"""
+        if result.verified and result.etag:
+            self.put(result.path, os.stat(result.path), result.etag)
+
+    def etag(self, file_path, remote_etag):
+        """返回本地文件的 ETag，优先使用缓存"""
+        stat = os.stat(file_path)
+        etag = self.get(file_path, stat)
+        # an etag computed for a different part count can not be compared
+        if etag is None or etag_part_count(etag) != etag_part_count(remote_etag):
+            etag = compute_etag(file_path, remote_etag)
+            self.put(file_path, stat, etag)
+        return etag
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with self._lock, open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self._entries, f)
+        os.replace(tmp_path, self.path)
+
+
+def is_unchanged(file_path, remote, compare, hash_cache, local_is_source):
+    """判断本地文件与远端对象是否一致
+
+    Args:
+        file_path(str): 本地文件路径
+        remote(dict): list_objects 返回的对象信息，包含 Size/ETag/LastModified
+        compare(str): ``"etag"`` 比较内容哈希；``"size_mtime"`` 只比较大小与修改时间
+        hash_cache(HashCache): 本地 ETag 缓存
+        local_is_source(bool): 本地是否为同步的源端
+
+    """
+    try:
+        stat = os.stat(file_path)
+    except OSError:
+        return False
+    if stat.st_size != remote["Size"]:
+        return False
+    if compare == COMPARE_SIZE_MTIME:
+        remote_mtime = remote["LastModified"].timestamp()
+        if local_is_source:
+            return stat.st_mtime <= remote_mtime
+        return stat.st_mtime >= remote_mtime
+    return hash_cache.etag(file_path, remote["ETag"]) == normalize_etag(
+        remote["ETag"],
+    )
+
+
+def sync_up(
+    s3_client,
+    local_path,
+    files,
+    bucket,
+    prefix,
+    compare=COMPARE_ETAG,
+    max_workers=8,
+    progress_callback=None,
+    max_connections=None,
+):
+    """把本地文件增量上传到 ``bucket/prefix``
+
+    Args:
+        s3_client: boto3 的 s3 client
+        local_path(str): 本地文件或目录，用于定位 ETag 缓存
+        files(iterable): ``(file_path, key)`` 的迭代器，key 均以 ``prefix`` 开头
+        bucket(str): 上传 bucket 名
+        prefix(str): 远端前缀，用于一次性列出已有对象
+        compare(str): 比较方式，``"etag"`` 或 ``"size_mtime"``
+        max_workers(int): 并发数
+        progress_callback(callable): 上传进度回调
+        max_connections(int): 上传时文件与分片共享的连接数，见 ``DirectoryUploader``
+
+    Returns:
+        SyncResult
+
+    """
+    result = SyncResult()
+    remote = {obj["Key"]: obj for obj in iter_objects(s3_client, bucket, prefix)}
+    hash_cache = HashCache(local_path)
+    files = list(files)
+
+    def _changed(item):
+        file_path, key = item
+        obj = remote.get(key)
+        if obj is not None and is_unchanged(
+            file_path, obj, compare, hash_cache, local_is_source=True
+        ):
+            return None
+        return item
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        changed = [item for item in executor.map(_changed, files) if item]
+    result.skipped = len(files) - len(changed)
+    debug("sync_up %s/%s: %d changed files", bucket, prefix, len(changed))
+
+    if changed:
+        uploader = DirectoryUploader(
+            s3_client,
+            max_workers=max_workers,
+            max_connections=max_connections,
+            progress_callback=progress_callback,
+        )
+        metrics = uploader.upload(changed, bucket)
+        result.transferred = metrics.files_done
+        result.bytes_transferred = metrics.bytes_done
+    hash_cache.save()
+    info("sync_up %s/%s finished: %s", bucket, prefix, result)
+    return result
+
+
+def sync_down(
+    s3_client,
+    bucket,
+    prefix,
+    local_dir,
+    compare=COMPARE_ETAG,
+    max_workers=8,
+):
+    """把 ``bucket/prefix`` 下的对象增量下载到 ``local_dir``
+
+    本地路径为 ``local_dir/relpath(key, prefix)``。下载完成的文件会把修改时间设置为
+    远端对象的 ``LastModified``，并记录 ETag 缓存，下次同步无需重新读取文件。
+
+    Returns:
+        SyncResult
+
+    """
+    result = SyncResult()
+    hash_cache = HashCache(local_dir)
+    lock = threading.Lock()
+    created_dirs = set()
+
+    def _sync(key, obj, file_path):
+        if is_unchanged(file_path, obj, compare, hash_cache, local_is_source=False):
+            with lock:
+                result.skipped += 1
+            return
+        mtime = obj["LastModified"].timestamp()
+        if compare == COMPARE_ETAG:
+            # hashed while streaming, the next sync does not need to read the file
+            transfer = integrity.download_verified(s3_client, bucket, key, file_path)
+            os.utime(file_path, (mtime, mtime))
+            hash_cache.put_result(transfer)
+        else:
+            s3_client.download_file(bucket, key, file_path)
+            os.utime(file_path, (mtime, mtime))
+        with lock:
+            result.transferred += 1
+            result.bytes_transferred += obj["Size"]
+
+    try:
+        with BoundedExecutor(max_workers=max_workers) as executor:
+            for obj in iter_objects(s3_client, bucket, prefix):
+                key = obj["Key"]
+                rel_path = os.path.relpath(key, prefix)
+                if key.endswith("/") or rel_path == ".":
+                    continue
+                file_path = os.path.join(local_dir, rel_path)
+                file_dir = os.path.dirname(file_path)
+                if file_dir not in created_dirs:
+                    os.makedirs(file_dir, exist_ok=True)
+                    created_dirs.add(file_dir)
+                executor.submit(_sync, key, obj, file_path)
+    finally:
+        hash_cache.save()
+    info("sync_down %s/%s finished: %s", bucket, prefix, result)
+    return result
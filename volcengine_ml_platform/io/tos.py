@@ -1,27 +1,180 @@
 """提供对 TOS 储存的上传、下载、删除、查询功能"""
-import math
+import copy
+import io
 import os
+import shutil
+import threading
 from logging import debug
 from logging import error
 from logging import warning
-from multiprocessing.dummy import Pool
+from typing import Iterable
+from typing import Iterator
 from typing import List
+from typing import Optional
 from urllib.parse import urlparse
 
-import boto3
 import botocore
-from boto3.s3.transfer import TransferConfig
 from botocore.exceptions import ClientError
 from tqdm import tqdm
 
 import volcengine_ml_platform
+from volcengine_ml_platform.io import adaptive_concurrency
+from volcengine_ml_platform.io import buffer_pool
+from volcengine_ml_platform.io import dir_upload
+from volcengine_ml_platform.io import integrity
+from volcengine_ml_platform.io import listing
+from volcengine_ml_platform.io import multipart_upload
+from volcengine_ml_platform.io import object_cache
+from volcengine_ml_platform.io import process_transfer
+from volcengine_ml_platform.io import progress
+from volcengine_ml_platform.io import range_download
+from volcengine_ml_platform.io import rate_limit
+from volcengine_ml_platform.io import stream_upload
+from volcengine_ml_platform.io import sync
+from volcengine_ml_platform.io import tos_file
+from volcengine_ml_platform.util import client_pool
+from volcengine_ml_platform.util.bounded_executor import BoundedExecutor
+from volcengine_ml_platform.util.bounded_executor import imap_bounded
+
+DEFAULT_MAX_POOL_CONNECTIONS = 10
+# DeleteObjects accepts at most 1000 keys per request
+DELETE_BATCH_SIZE = 1000
+
+
+def parse_tos_url(tos_url):
+    """把 ``tos://bucket.[xxxxx]/key`` 形式的链接解析为 bucket 和 key
+
+    Args:
+        tos_url(str): 对象的 tos 链接
+
+    Returns:
+        返回 ``(bucket, key)`` 元组
+
+    Raises:
+        ValueError: 链接的 scheme 不是 tos
+
+    """
+    parse_result = urlparse(tos_url)
+    if parse_result.scheme != "tos":
+        raise ValueError("invalid scheme. url: " + tos_url)
+    bucket = parse_result.netloc.split(".")[0]
+    key = parse_result.path[1:]
+    return bucket, key
+
+
+def upload_prefix(local_path, prefix):
+    """计算 ``upload`` 上传目录时实际使用的 key 前缀
+
+    上传目录时，目录名会追加到 ``prefix`` 之后；上传单个文件时 ``prefix`` 保持不变。
+    """
+    if os.path.isdir(local_path):
+        self_prefix = os.path.basename(local_path.rstrip("/"))
+        if self_prefix != ".":
+            prefix = f"{prefix}{self_prefix}/"
+    return prefix
+
+
+def iter_upload_files(local_path, prefix):
+    """遍历 ``upload`` 需要上传的本地文件
+
+    Args:
+        local_path(str): 本地文件或目录
+        prefix(str): 已经由 ``upload_prefix`` 处理过的 key 前缀
+
+    Returns:
+        生成 ``(file_path, key)`` 元组的迭代器
+
+    """
+    if os.path.isfile(local_path):
+        yield local_path, f"{prefix}{os.path.basename(local_path)}"
+        return
+    for root, _, files in os.walk(local_path):
+        rel_path = os.path.relpath(root, local_path)
+        for file in files:
+            if rel_path == ".":
+                key = f"{prefix}{file}"
+            else:
+                key = f"{prefix}{rel_path}/{file}"
+            yield os.path.join(root, file), key
+
+
+def _check_buffer_size(view, size, bucket, key):
+    if size > len(view):
+        raise ValueError(
+            f"buffer of {len(view)} bytes is too small for "
+            f"tos://{bucket}/{key} of {size} bytes",
+        )
+
+
+def _close_when_done(paths, tracker):
+    # reports the final metrics once the caller stops iterating
+    try:
+        yield from paths
+    finally:
+        tracker.close()
+
+
+class _CacheSource:
+    """``ObjectCache`` 未命中时读取对象的数据源，请求经过 TOSClient 的限速器与请求策略
+
+    设置了请求策略时，交互请求的每次尝试都完整读取对象，重试或对冲不会把半个对象写入缓存；
+    ``BULK`` 请求只对建立响应应用策略，响应流直接写入缓存，不在内存中缓冲整个对象。
+    """
+
+    def __init__(self, client, priority=rate_limit.INTERACTIVE):
+        self.client = client
+        self.priority = priority
+
+    def head_object(self, Bucket, Key):
+        def _head():
+            limiter = self.client._get_rate_limiter()
+            if limiter is not None:
+                limiter.request(self.priority)
+            return self.client._policy_s3_client().head_object(Bucket=Bucket, Key=Key)
+
+        return self.client._execute(_head)
+
+    def get_object(self, Bucket, Key):
+        if self.client.request_policy is None:
+            return self.client._get_object_response(Bucket, Key, self.priority)
+        if self.priority == rate_limit.BULK:
+            # a failed stream leaves no cache entry, put() only keeps complete files
+            return self.client.request_policy.execute(
+                lambda: self.client._get_object_response(Bucket, Key, self.priority),
+            )
+        return self.client.request_policy.execute(
+            lambda: self.client._read_object_response(Bucket, Key, self.priority),
+        )
 
 
 class TOSClient:
     """自动配置环境变量中的用户信息，与TOS 进行交互"""
 
-    def __init__(self, credentials=None, session_token=None):
-        """设置认证信息，初始化类变量"""
+    def __init__(
+        self,
+        credentials=None,
+        session_token=None,
+        max_pool_connections=DEFAULT_MAX_POOL_CONNECTIONS,
+        cache=None,
+        request_policy=None,
+        rate_limiter=None,
+    ):
+        """设置认证信息，初始化类变量
+
+        Args:
+            credentials: 认证信息，默认从环境变量中读取
+            session_token(str): STS 临时凭证的 session token
+            max_pool_connections(int): 底层 HTTP 连接池的最大连接数，应不小于并发请求数
+            cache(object_cache.ObjectCache): 本地对象缓存，``get_object`` 和 ``download_file``
+                会优先从缓存读取，未命中时的下载同样经过 ``request_policy`` 与 ``rate_limiter``；
+                大于 ``cache.max_object_bytes`` 的对象不经过缓存，``download_file`` 仍并发分片下载。
+                默认根据环境变量 ``VOLC_ML_PLATFORM_CACHE_SIZE`` 决定是否启用，传入 False 表示不使用缓存
+            request_policy(request_policy.RequestPolicy): ``get_object`` 的重试、截止时间
+                与对冲策略，默认只依赖 boto3 自身的重试
+            rate_limiter(rate_limit.RateLimiter): 带宽与请求速率限制，也可以传入在
+                ``rate_limit.register`` 中注册的名字；默认使用 registry 中的默认限速器
+
+        """
 
         # ref: https://boto3.amazonaws.com/v1/documentation/api/latest/guide/configuration.html
         if credentials is None:
@@ -37,8 +190,102 @@ class TOSClient:
             session_token = volcengine_ml_platform.get_session_token()
         if session_token is not None and len(session_token.strip()) > 0:
             config["aws_session_token"] = session_token
-        self.s3_client = boto3.client("s3", **config)
+        self.max_pool_connections = max_pool_connections
+        self._client_config = config
+        self._s3_client = None
+        self._s3_client_pid = None
         self.dir_record = set()
+        if cache is None:
+            cache = object_cache.default_cache()
+        self.cache = cache or None
+        self.request_policy = request_policy
+        self.rate_limiter = rate_limiter
+
+    @property
+    def s3_client(self):
+        """当前进程共享的 boto3 s3 client，fork 之后在子进程中自动重新创建"""
+        if self._s3_client is None or self._s3_client_pid != os.getpid():
+            self._s3_client = client_pool.s3_client(
+                self.max_pool_connections,
+                **self._client_config,
+            )
+            self._s3_client_pid = os.getpid()
+        return self._s3_client
+
+    @s3_client.setter
+    def s3_client(self, s3_client):
+        self._s3_client = s3_client
+        self._s3_client_pid = os.getpid()
+
+    def _policy_s3_client(self):
+        """``request_policy`` 管理的读请求使用的 s3 client
+
+        读超时为策略的截止时间，只作用于这些读请求；上传、列举等请求仍使用 ``s3_client``。
+        """
+        if self.request_policy is None:
+            return self.s3_client
+        # frees the executor thread of a request abandoned at the deadline
+        return client_pool.s3_client(
+            self.max_pool_connections,
+            read_timeout=self.request_policy.deadline,
+            **self._client_config,
+        )
+
+    def _with_pool_connections(self, max_pool_connections):
+        """返回连接池不小于 ``max_pool_connections`` 的 TOSClient，共享其它配置"""
+        if max_pool_connections <= self.max_pool_connections:
+            return self
+        client = copy.copy(self)
+        client.max_pool_connections = max_pool_connections
+        client._s3_client = None
+        return client
+
+    def _get_rate_limiter(self):
+        if self.rate_limiter is None:
+            return rate_limit.get_limiter()
+        if isinstance(self.rate_limiter, str):
+            return rate_limit.get_limiter(self.rate_limiter)
+        return self.rate_limiter
+
+    def _execute(self, fn):
+        """按 ``request_policy`` 执行 ``fn``，未设置时直接调用"""
+        if self.request_policy is None:
+            return fn()
+        return self.request_policy.execute(fn)
+
+    def _open_cached(self, bucket, key, priority=rate_limit.INTERACTIVE):
+        """从缓存打开对象，未命中时的下载经过限速器与请求策略"""
+        return self.cache.open(_CacheSource(self, priority), bucket, key)
+
+    def _use_cache(self, bucket, key):
+        """``download_file`` 是否经过缓存：已缓存或大小不超过缓存的单个对象上限"""
+        if self.cache is None:
+            return False
+        if not self.cache.validate and self.cache.lookup(bucket, key) is not None:
+            return True
+        rsp = _CacheSource(self, rate_limit.BULK).head_object(Bucket=bucket, Key=key)
+        return self.cache.accepts(rsp["ContentLength"])
+
+    def _limited_s3_client(self, priority=rate_limit.BULK):
+        """经过限速器的 s3 client，交给没有限速参数的模块使用；没有限速器时返回原始 client"""
+        limiter = self._get_rate_limiter()
+        if limiter is None:
+            return self.s3_client
+        return rate_limit.LimitedClient(self.s3_client, limiter, priority)
+
+    def _bulk_transfer_kwargs(self):
+        """限速时计一次请求，并返回 boto3 传输按字节限速的 ``Callback`` 参数"""
+        limiter = self._get_rate_limiter()
+        if limiter is None:
+            return {}
+        limiter.request(rate_limit.BULK)
+        return {"Callback": limiter.callback(rate_limit.BULK)}
+
+    def __getstate__(self):
+        # boto3 clients can not be pickled, the receiver creates its own
+        state = self.__dict__.copy()
+        state["_s3_client"] = None
+        return state
 
     def bucket_exists(self, bucket_name):
         """查询用户的 bucket 是否存在
@@ -147,34 +394,65 @@ class TOSClient:
         Args:
             bucket(str): 创建时的桶名
 
+        Returns:
+            删除的对象数量
+
         """
 
         """Delete all of object in the bucket"""
-        while True:
-            object_info = self.list_objects(
-                bucket=bucket,
-                encoding_type="url",
-                delimiter=",",
-                marker="",
-                max_keys=1000,
-                prefix="",
-            )
+        return self.delete_prefix(bucket, prefix="")
 
-            if (
-                object_info is None
-                or "Contents" not in object_info
-                or len(
-                    object_info["Contents"],
-                )
-                == 0
-            ):
-                break
-            for item in object_info["Contents"]:
-                key = item["Key"]
-                self.s3_client.delete_object(
-                    Bucket=bucket,
-                    Key=key,
-                )
+    def delete_prefix(self, bucket, prefix, max_workers=None):
+        """批量删除前缀下的所有对象
+
+        列举结果逐页转换为 ``DeleteObjects`` 请求，每个请求最多删除 1000 个对象，
+        多个请求并发执行；列举与删除同时进行，内存占用不随对象数量增长。
+
+        Args:
+            bucket(str): 创建时的桶名
+            prefix(str): 要删除对象的 key 前缀，为空时删除桶内所有对象
+            max_workers(int): 并发的删除请求数，默认为连接池大小 ``max_pool_connections``
+
+        Returns:
+            删除的对象数量
+
+        Raises:
+            Exception: 存在删除失败的对象
+
+        """
+        if max_workers is None:
+            max_workers = self.max_pool_connections
+        lock = threading.Lock()
+        counter = {"deleted": 0, "failed": 0}
+        s3_client = self._with_pool_connections(max_workers)._limited_s3_client()
+
+        def _delete_batch(keys):
+            rsp = s3_client.delete_objects(
+                Bucket=bucket,
+                Delete={"Objects": [{"Key": k} for k in keys], "Quiet": True},
+            )
+            errors = rsp.get("Errors", [])
+            for err in errors[:10]:
+                error("delete %s failed: %s", err.get("Key"), err.get("Message"))
+            with lock:
+                counter["deleted"] += len(keys) - len(errors)
+                counter["failed"] += len(errors)
+
+        with BoundedExecutor(max_workers=max_workers) as executor:
+            batch = []
+            for content in self.iter_objects(bucket, prefix):
+                batch.append(content["Key"])
+                if len(batch) >= DELETE_BATCH_SIZE:
+                    executor.submit(_delete_batch, batch)
+                    batch = []
+            if batch:
+                executor.submit(_delete_batch, batch)
+
+        if counter["failed"]:
+            raise Exception(
+                f"failed to delete {counter['failed']} objects in {bucket}/{prefix}",
+            )
+        return counter["deleted"]
 
     def delete_object(self, bucket, key):
         """删除桶的对象，或者说文件
@@ -186,7 +464,7 @@ class TOSClient:
         """
 
         """Delete S3 objects with"""
-        return self.s3_client.delete_object(
+        return self._limited_s3_client(rate_limit.INTERACTIVE).delete_object(
             Bucket=bucket,
             Key=key,
         )
@@ -249,7 +527,7 @@ class TOSClient:
 
             return a list of Object infos
         """
-        return self.s3_client.list_objects(
+        return self._limited_s3_client(rate_limit.INTERACTIVE).list_objects(
             Bucket=bucket,
             Delimiter=delimiter,
             EncodingType=encoding_type,
@@ -258,10 +536,58 @@ class TOSClient:
             Prefix=prefix,
         )
 
+    def iter_objects(
+        self,
+        bucket,
+        prefix="",
+        parallelism=1,
+        shard_by=listing.SHARD_BY_DELIMITER,
+        delimiter="/",
+    ):
+        """列举前缀下的所有对象，按需逐页请求
+
+        比如：::
+
+            for obj in client.iter_objects(bucket, "datasets/images/"):
+                print(obj["Key"], obj["Size"])
+
+        ``parallelism > 1`` 时把前缀切分为多个分片并发列举，结果不保证有序：
+
+        - ``shard_by="delimiter"``：按 ``delimiter`` 划分的下一级子前缀作为分片
+        - ``shard_by="chars"``：按前缀之后的第一个字符划分 key 区间作为分片
+
+        Args:
+            bucket(str): bucket 名
+            prefix(str): 对象的 key 前缀
+            parallelism(int): 并发列举的分片数，为 1 时按 key 顺序串行列举
+            shard_by(str): 分片方式，``"delimiter"`` 或 ``"chars"``
+            delimiter(str): ``shard_by="delimiter"`` 时使用的分隔符
+
+        Returns:
+            生成对象信息的迭代器，每个元素与 ``list_objects`` 返回的 ``Contents`` 元素相同
+
+        """
+        if parallelism <= 1:
+            return listing.iter_objects(
+                self._limited_s3_client(rate_limit.INTERACTIVE),
+                bucket,
+                prefix,
+            )
+        return listing.iter_objects_parallel(
+            self._with_pool_connections(parallelism)._limited_s3_client(
+                rate_limit.INTERACTIVE,
+            ),
+            bucket,
+            prefix,
+            parallelism=parallelism,
+            shard_by=shard_by,
+            delimiter=delimiter,
+        )
+
     def put_object(self, bucket, key, body):
         """上传对象到 bucket
 
-        大小不应该超过 5MB；更推荐用 ``upload_file``
+        大小不应该超过 5MB；更推荐用 ``upload_file``，内存中的大块数据使用 ``open_write``
 
         Args:
             bucket(str): 上传 bucket 的名
@@ -273,6 +599,11 @@ class TOSClient:
 
         """
         """Upload single object, object size should not exceed 5MB"""
+        limiter = self._get_rate_limiter()
+        if limiter is not None:
+            limiter.request(rate_limit.INTERACTIVE)
+            if isinstance(body, (bytes, bytearray)):
+                limiter.consume(len(body), rate_limit.INTERACTIVE)
         return self.s3_client.put_object(Bucket=bucket, Key=key, Body=body)
 
     def get_object(self, bucket, key):
@@ -283,89 +614,347 @@ class TOSClient:
             key(str):  对应 object 的 key
 
         Returns:
-            返回一个下载结果的 dict
+            返回对象内容的文件对象（流），读取完后需要 ``close``。
+            设置了 ``request_policy`` 时对象内容会被完整读入内存后返回
 
         """
         """Download single object"""
-        return self.s3_client.get_object(Bucket=bucket, Key=key)["Body"]
+        if self.cache is not None:
+            return self._open_cached(bucket, key)
+        if self.request_policy is not None:
+            return io.BytesIO(
+                self.request_policy.execute(lambda: self._read_object(bucket, key)),
+            )
+        return self._get_object_response(bucket, key)["Body"]
+
+    def _get_object_response(self, bucket, key, priority=rate_limit.INTERACTIVE):
+        s3_client = self._policy_s3_client()
+        limiter = self._get_rate_limiter()
+        if limiter is None:
+            return s3_client.get_object(Bucket=bucket, Key=key)
+        limiter.request(priority)
+        rsp = s3_client.get_object(Bucket=bucket, Key=key)
+        # charged up front, the body is read right after the headers arrive
+        limiter.consume(rsp.get("ContentLength", 0), priority)
+        return rsp
+
+    def _read_object_response(self, bucket, key, priority=rate_limit.INTERACTIVE):
+        """读取完整的对象，返回 ``Body`` 为内存中文件对象的响应"""
+        rsp = self._get_object_response(bucket, key, priority)
+        try:
+            data = rsp["Body"].read()
+        finally:
+            rsp["Body"].close()
+        return {
+            "Body": io.BytesIO(data),
+            "ContentLength": len(data),
+            "ETag": rsp.get("ETag"),
+            "ResponseMetadata": rsp.get("ResponseMetadata", {}),
+        }
+
+    def _read_object(self, bucket, key):
+        return self._read_object_response(bucket, key)["Body"].getvalue()
+
+    def get_object_into(self, bucket, key, buf):
+        """把对象内容直接读入调用方预先分配的缓冲区，不创建中间的 ``bytes`` 对象
+
+        比如：::
+
+            buf = bytearray(1 << 20)
+            n = client.get_object_into(bucket, key, buf)
+            image = decode(memoryview(buf)[:n])
+
+        Args:
+            bucket(str): bucket 名
+            key(str): 对象的 key
+            buf: 可写的连续缓冲区，比如 ``bytearray``、``memoryview`` 或 NumPy 数组
+
+        Returns:
+            读入的字节数
+
+        Raises:
+            ValueError: 缓冲区小于对象
+
+        """
+        view = memoryview(buf).cast("B")
+        if self.cache is not None or self.request_policy is None:
+            return self._read_object_into(bucket, key, view)
+        if not self.request_policy.hedge:
+            return self.request_policy.execute(
+                lambda: self._read_object_into(bucket, key, view),
+            )
+        # hedged attempts run concurrently and can not share one buffer
+        data = self.request_policy.execute(lambda: self._read_object(bucket, key))
+        _check_buffer_size(view, len(data), bucket, key)
+        view[: len(data)] = data
+        return len(data)
+
+    def get_object_pooled(self, bucket, key, pool=None):
+        """从缓冲池借出一个缓冲区并读入对象内容
+
+        比如：::
+
+            with client.get_object_pooled(bucket, key) as buf:
+                image = Image.open(io.BytesIO(buf.view)).convert("RGB")
+
+        Args:
+            bucket(str): bucket 名
+            key(str): 对象的 key
+            pool(buffer_pool.BufferPool): 缓冲池，默认使用进程内共享的缓冲池
+
+        Returns:
+            ``buffer_pool.PooledBuffer``，使用完毕后需要 ``release``
+
+        """
+        if pool is None:
+            pool = buffer_pool.default_pool()
+        if self.cache is None and self.request_policy is not None:
+            # every attempt borrows its own buffer, a lost hedge is not returned
+            return self.request_policy.execute(
+                lambda: self._read_object_pooled(bucket, key, pool),
+            )
+        return self._read_object_pooled(bucket, key, pool)
+
+    def _open_sized(self, bucket, key):
+        if self.cache is not None:
+            f = self._open_cached(bucket, key)
+            return f, os.fstat(f.fileno()).st_size
+        rsp = self._get_object_response(bucket, key)
+        return rsp["Body"], rsp["ContentLength"]
+
+    def _read_object_into(self, bucket, key, view):
+        body, size = self._open_sized(bucket, key)
+        try:
+            _check_buffer_size(view, size, bucket, key)
+            return buffer_pool.read_into(body, view[:size])
+        finally:
+            body.close()
+
+    def _read_object_pooled(self, bucket, key, pool):
+        body, size = self._open_sized(bucket, key)
+        try:
+            buf = pool.acquire(size)
+            try:
+                buffer_pool.read_into(body, buf.view)
+            except BaseException:
+                buf.release()
+                raise
+            return buf
+        finally:
+            body.close()
+
+    def open(
+        self,
+        bucket,
+        key,
+        block_size=tos_file.DEFAULT_BLOCK_SIZE,
+        read_ahead=tos_file.DEFAULT_READ_AHEAD,
+        max_blocks=tos_file.DEFAULT_MAX_BLOCKS,
+    ):
+        """以可 seek 的只读文件对象打开 TOS 对象，不需要先下载整个对象
+
+        比如：::
+
+            with client.open(bucket, "ckpt/model.pt") as f:
+                state = torch.load(f)
+
+        Args:
+            bucket(str): bucket 名
+            key(str): 对象的 key
+            block_size(int): 每次 Range 请求对齐的块大小
+            read_ahead(int): 顺序读取时的预读大小
+            max_blocks(int): 缓存的最大块数
+
+        Returns:
+            ``tos_file.TOSRawFile``，兼容 ``io.RawIOBase``
+
+        """
+        return tos_file.TOSRawFile(
+            self._limited_s3_client(rate_limit.INTERACTIVE),
+            bucket,
+            key,
+            block_size=block_size,
+            read_ahead=read_ahead,
+            max_blocks=max_blocks,
+        )
+
+    def open_write(
+        self,
+        bucket,
+        key,
+        part_size=multipart_upload.DEFAULT_PART_SIZE,
+        max_workers=multipart_upload.DEFAULT_MAX_WORKERS,
+    ):
+        """以只写文件对象的方式上传对象，数据在写入的同时分片并发上传，不需要本地文件
+
+        比如：::
+
+            with client.open_write(bucket, "ckpt/model.pt") as f:
+                torch.save(model.state_dict(), f)
+
+        Args:
+            bucket(str): bucket 名
+            key(str): 对象的 key
+            part_size(int): 分片大小，最多缓存 ``max_workers + 1`` 个分片
+            max_workers(int): 并发上传的分片数
+
+        Returns:
+            ``stream_upload.MultipartWriter``，``close`` 时完成上传
+
+        """
+        return stream_upload.MultipartWriter(
+            self._with_pool_connections(max_workers).s3_client,
+            bucket,
+            key,
+            part_size=part_size,
+            max_workers=max_workers,
+            rate_limiter=self._get_rate_limiter(),
+        )
+
+    def upload_iterable(
+        self,
+        chunks,
+        bucket,
+        key,
+        part_size=multipart_upload.DEFAULT_PART_SIZE,
+        max_workers=multipart_upload.DEFAULT_MAX_WORKERS,
+    ):
+        """把生成器等可迭代对象产生的数据依次上传为一个对象
+
+        Args:
+            chunks(iterable): 产生 ``bytes`` / ``bytearray`` / ``memoryview`` 的可迭代对象
+            bucket(str): bucket 名
+            key(str): 对象的 key
+            part_size(int): 分片大小
+            max_workers(int): 并发上传的分片数
+
+        Returns:
+            上传的字节数
+
+        """
+        with self.open_write(bucket, key, part_size, max_workers) as f:
+            for chunk in chunks:
+                f.write(chunk)
+            return f.tell()
 
     def upload_file_low_level(
         self,
         file_path,
         bucket,
         key=None,
-        part_size=20971520,
+        part_size=multipart_upload.DEFAULT_PART_SIZE,
+        max_workers=multipart_upload.DEFAULT_MAX_WORKERS,
+        resume=True,
+        checkpoint_path=None,
+        verify=False,
     ):
         """相比 upload_file，更精细化的上传文件方式
 
+        大文件会被切分为多个分片，由线程池并发上传。已上传分片的 ETag 会记录到本地
+        checkpoint 文件中，上传中断后再次调用时只会上传缺失的分片。
+
         Args:
             file_path(str): 上传文件的路径
             bucket(str): 上传 bucket 名
             key(str): 上传 object 的 key
-            part_size(str): 切片上传的 size
+            part_size(int): 切片上传的 size
+            max_workers(int): 并发上传的分片数
+            resume(bool): 是否从 checkpoint 断点续传
+            checkpoint_path(str): checkpoint 文件路径，默认保存在 ``~/.volcengine_ml_platform/checkpoints/``
+            verify(bool): 是否在上传的同时计算 MD5/CRC64 并与服务端比对
+
+        Returns:
+            ``verify=True`` 时返回 ``integrity.TransferResult``
+
+        Raises:
+            integrity.IntegrityError: 校验值与服务端不一致
 
         """
         """Implemented with low level S3 API, edit for desired info"""
         file_size = os.path.getsize(file_path)
-        threshold = 5242880
+        threshold = multipart_upload.MIN_PART_SIZE
         # if the key is not set, use file_path instead
         if key is None:
             key = file_path
         # if file size <= 25MB, upload single file
         if file_size <= part_size + threshold:
-            with open(file_path, mode="rb", encoding="utf-8") as file:
-                self.s3_client.upload_fileobj(file, bucket, key)
-        # otherwise
-        else:
-            # if the last part is smaller than 5MB
-            # combine it with previous part
-            part_number = 0
-            if file_size % part_size <= threshold:
-                part_number = math.floor(float(file_size) % float(part_size))
-            else:
-                part_number = math.ceil(float(file_size) % float(part_size))
-
-            # start multipart upload
-            rsp = self.s3_client.create_multipart_upload(
-                Bucket=bucket,
-                Key=key,
+            if verify:
+                return self._upload_verified(file_path, bucket, key, file_size + 1)
+            with open(file_path, mode="rb") as file:
+                self.s3_client.upload_fileobj(
+                    file,
+                    bucket,
+                    key,
+                    **self._bulk_transfer_kwargs(),
+                )
+            return
+
+        uploader = multipart_upload.MultipartUploader(
+            self._with_pool_connections(max_workers).s3_client,
+            part_size=part_size,
+            max_workers=max_workers,
+            resume=resume,
+            verify=verify,
+            rate_limiter=self._get_rate_limiter(),
+        )
+        uploader.upload(file_path, bucket, key, checkpoint_path=checkpoint_path)
+        if verify:
+            return integrity.TransferResult(
+                file_path,
+                bucket,
+                key,
+                file_size,
+                uploader.etag,
+                None,
+                uploader.crc64,
+                uploader.verified,
             )
-            debug("Multipart upload initiated: %s", rsp)
-
-            upload_id = rsp["UploadId"]
-            uploaded_parts = {"Parts": []}
-            with open(file_path, mode="rb", encoding="utf-8") as file:
-                # upload parts
-                for i in range(1, part_number + 1):
-                    read_size = min(part_size, file_size - (i - 1) * part_size)
-                    read_size = max(-1, read_size)
-                    body = file.read(read_size)  # 20MiB
-                    if body == b"":
-                        break
-                    rsp = self.s3_client.upload_part(
-                        Bucket=bucket,
-                        Key=key,
-                        PartNumber=i,
-                        UploadId=upload_id,
-                        Body=body,
-                    )
-
-                    uploaded_parts["Parts"].append(
-                        {
-                            "PartNumber": i,
-                            "ETag": rsp["ETag"],
-                        },
-                    )
-            # upload complete
-            rsp = self.s3_client.complete_multipart_upload(
-                Bucket=bucket,
-                Key=key,
-                UploadId=upload_id,
-                MultipartUpload=uploaded_parts,
+
+    def _upload_verified(self, file_path, bucket, key, part_size):
+        from boto3.s3.transfer import TransferConfig
+        from s3transfer.utils import ChunksizeAdjuster
+
+        # a non-seekable reader makes s3transfer read the file once, in order
+        chunk_size = ChunksizeAdjuster().adjust_chunksize(part_size)
+        checksum = integrity.Checksum(part_size=chunk_size)
+        transfer_config = TransferConfig(
+            multipart_threshold=part_size,
+            multipart_chunksize=chunk_size,
+        )
+        with open(file_path, mode="rb") as f:
+            self.s3_client.upload_fileobj(
+                integrity.HashingReader(f, checksum),
+                bucket,
+                key,
+                Config=transfer_config,
+                **self._bulk_transfer_kwargs(),
             )
-            debug("Multipart upload completed: %s", rsp)
+        head = self.s3_client.head_object(Bucket=bucket, Key=key)
+        verified = integrity.verify(
+            checksum,
+            head["ETag"],
+            integrity.remote_crc64(head),
+            f"tos://{bucket}/{key}",
+        )
+        return integrity.TransferResult(
+            file_path,
+            bucket,
+            key,
+            checksum.size,
+            integrity.normalize_etag(head["ETag"]),
+            checksum.md5,
+            checksum.crc64,
+            verified,
+        )
 
-    def upload_file(self, file_path, bucket, key=None, part_size=20971520):
+    def upload_file(
+        self,
+        file_path,
+        bucket,
+        key=None,
+        part_size=20971520,
+        verify=False,
+    ):
         """上传文件到 bucket
 
         Args:
@@ -373,10 +962,22 @@ class TOSClient:
             bucket(str): 上传 bucket 名
             key(str): 上传 object 的 key，比如 key="put/you/path/xxxx/yyy"
             part_size(str): 切片上传的 size
+            verify(bool): 是否在上传的同时计算 MD5/CRC64，并与服务端的 ETag/CRC64 比对
+
+        Returns:
+            ``verify=True`` 时返回 ``integrity.TransferResult``
+
+        Raises:
+            integrity.IntegrityError: 校验值与服务端不一致
 
         """
         if key is None:
             key = file_path
+        if verify:
+            return self._upload_verified(file_path, bucket, key, part_size)
+        # imported lazily, boto3 is slow to import
+        from boto3.s3.transfer import TransferConfig
+
         # Set the desired multipart threshold value (20MB)
         transfer_config = TransferConfig(multipart_threshold=part_size)
 
@@ -386,6 +987,7 @@ class TOSClient:
             bucket,
             key,
             Config=transfer_config,
+            **self._bulk_transfer_kwargs(),
         )
 
     def download_file(
@@ -396,7 +998,11 @@ class TOSClient:
         target_file_path: str = "",
         target_dir_path: str = "",
         max_concurrence: int = 10,
-    ) -> str:
+        resumable: bool = False,
+        range_size: int = range_download.DEFAULT_RANGE_SIZE,
+        limiter: Optional[adaptive_concurrency.AdaptiveConcurrency] = None,
+        verify: bool = False,
+    ):
         """下载TOS对象到本地
 
         要下载对象的目标地址，两种方式选择其一：
@@ -422,6 +1028,16 @@ class TOSClient:
             file_path(str): 本地保存的目标文件路径
             dir_path(str): 本地保存的目标目录路径
             max_concurrence(int): 最大并发数量，控制下载速度
+            resumable(bool): 是否按字节区间并发下载并支持断点续传，适合大文件。
+                已完成的区间记录在 ``<target_file_path>.tosdownload.journal`` 中，
+                下载中断后再次调用只会下载缺失的区间
+            range_size(int): ``resumable`` 模式下每个区间的大小
+            limiter(adaptive_concurrency.AdaptiveConcurrency): 自适应并发控制器。设置后按
+                ``resumable`` 模式下载，同时下载的区间数根据吞吐与限流响应自动调整，
+                忽略 ``max_concurrence``
+            verify(bool): 是否在下载的同时计算 MD5/CRC64 并与服务端比对，校验通过后才生成目标文件。
+                分片上传的对象只能通过 CRC64 校验（需要安装 crcmod）；需要校验结果时使用
+                ``download_file_verified``
         Returns:
             返回下载文件路径
 
@@ -429,6 +1045,73 @@ class TOSClient:
             ValueError: 参数填写错误
 
         """
+        result = self._download_file(
+            bucket,
+            key,
+            tos_url,
+            target_file_path,
+            target_dir_path,
+            max_concurrence,
+            resumable,
+            range_size,
+            limiter,
+            verify,
+        )
+        return result.path if verify else result
+
+    def download_file_verified(
+        self,
+        bucket: str = "",
+        key: str = "",
+        tos_url: str = "",
+        target_file_path: str = "",
+        target_dir_path: str = "",
+        max_concurrence: int = 10,
+        resumable: bool = False,
+        range_size: int = range_download.DEFAULT_RANGE_SIZE,
+        limiter: Optional[adaptive_concurrency.AdaptiveConcurrency] = None,
+    ) -> integrity.TransferResult:
+        """下载TOS对象到本地，同时校验数据完整性并返回校验结果
+
+        参数同 ``download_file(verify=True)``。没有可比对的校验值时（比如分片上传的对象
+        而没有安装 crcmod）给出警告，``result.verified`` 为 None。
+
+        Returns:
+            integrity.TransferResult
+
+        Raises:
+            ValueError: 参数填写错误
+            integrity.IntegrityError: 校验值不一致
+
+        """
+        return self._download_file(
+            bucket,
+            key,
+            tos_url,
+            target_file_path,
+            target_dir_path,
+            max_concurrence,
+            resumable,
+            range_size,
+            limiter,
+            True,
+        )
+
+    def _download_file(
+        self,
+        bucket,
+        key,
+        tos_url,
+        target_file_path,
+        target_dir_path,
+        max_concurrence,
+        resumable,
+        range_size,
+        limiter,
+        verify,
+    ):
+        # returns the path, or the TransferResult when verify is set
+        from boto3.s3.transfer import TransferConfig
 
         # To consume less downstream bandwidth, decrease the maximum concurrency
         transfer_config = TransferConfig(max_concurrency=max_concurrence)
@@ -440,11 +1123,7 @@ class TOSClient:
             raise ValueError("Please set a correct dir_path or file_path")
 
         if tos_url:
-            parse_result = urlparse(tos_url)
-            if parse_result.scheme != "tos":
-                raise ValueError("invalid scheme. url: " + tos_url)
-            bucket = parse_result.netloc.split(".")[0]
-            key = parse_result.path[1:]
+            bucket, key = parse_tos_url(tos_url)
 
         if not target_file_path:
             target_file_path = os.path.join(target_dir_path, key)
@@ -453,11 +1132,48 @@ class TOSClient:
         self._create_dir(os.path.dirname(target_file_path))
 
         debug("download file: bucket %s, key %s", bucket, key)
+        if limiter is not None or resumable:
+            if limiter is not None:
+                downloader = range_download.RangeDownloader(
+                    self._with_pool_connections(limiter.max_limit).s3_client,
+                    range_size=range_size,
+                    limiter=limiter,
+                    verify=verify,
+                    rate_limiter=self._get_rate_limiter(),
+                )
+            else:
+                downloader = range_download.RangeDownloader(
+                    self.s3_client,
+                    range_size=range_size,
+                    max_workers=max_concurrence,
+                    verify=verify,
+                    rate_limiter=self._get_rate_limiter(),
+                )
+            path = downloader.download(bucket, key, target_file_path)
+            return downloader.result if verify else path
+        if verify:
+            result = integrity.download_verified(
+                self._limited_s3_client(),
+                bucket,
+                key,
+                target_file_path,
+            )
+            if self.cache is not None:
+                self.cache.put_result(result)
+            return result
+        if self._use_cache(bucket, key):
+            with self._open_cached(bucket, key, rate_limit.BULK) as src, open(
+                target_file_path, "wb"
+            ) as dst:
+                shutil.copyfileobj(src, dst, object_cache.COPY_CHUNK_SIZE)
+            return target_file_path
+
         self.s3_client.download_file(
             bucket,
             key,
             target_file_path,
             Config=transfer_config,
+            **self._bulk_transfer_kwargs(),
         )
         return target_file_path
 
@@ -469,11 +1185,12 @@ class TOSClient:
             dir_path(str): 下载路径
         """
         if dir_path not in self.dir_record:
-            self.dir_record.add(dir_path)
             try:
                 os.makedirs(dir_path, exist_ok=True)
             except OSError:
                 warning("Cannot create download directory: %s", dir_path)
+            # recorded only once it exists, other threads may be about to write into it
+            self.dir_record.add(dir_path)
         return dir_path
 
     def download_files(
@@ -484,6 +1201,9 @@ class TOSClient:
         target_file_paths: list = [],
         target_dir_path: str = "",
         parallelism=1,
+        adaptive: bool = False,
+        processes: int = 0,
+        progress_callback=None,
     ) -> List[str]:
         """下载多个TOS对象到本地
 
@@ -511,6 +1231,13 @@ class TOSClient:
             target_file_paths(list): 本地保存的目标路径的列表，与 keys 或者 tos_urls 一一对应
             target_dir_path(str): 本地保存的目标目录
             parallelism(int): 并发数量，控制下载速度
+            adaptive(bool): 是否自动调整并发数。开启后 ``parallelism`` 作为并发数的上限，
+                小于 ``adaptive_concurrency.DEFAULT_MAX_LIMIT`` 时取该默认值；
+                吞吐提升时增加并发，遇到限流（503/SlowDown）或延迟上升时回退
+            processes(int): 大于 0 时把下载分散到多个进程，每个进程使用 ``parallelism`` 个线程，
+                适合大量小对象、瓶颈在 Python 请求处理而非网络的场景；限速器按进程数均分
+            progress_callback(callable): 进度回调，参数为 ``progress.TransferMetrics``，
+                包含已下载的字节数、文件数和平均吞吐
 
         Returns:
             返回下载文件集路径的 list
@@ -526,100 +1253,317 @@ class TOSClient:
         if not target_file_paths and not target_dir_path:
             raise ValueError("Please set a correct dir_path or file_path")
 
-        self.dir_record = set()
-        async_res = []
+        paths = self.iter_download_files(
+            bucket=bucket,
+            keys=keys,
+            tos_urls=tos_urls or None,
+            target_file_paths=target_file_paths,
+            target_dir_path=target_dir_path,
+            parallelism=parallelism,
+            adaptive=adaptive,
+            ordered=True,
+            processes=processes,
+            progress_callback=progress_callback,
+        )
+        return list(tqdm(paths, total=len(keys) if keys else len(tos_urls)))
 
-        pool = Pool(processes=parallelism)
+    def iter_download_files(
+        self,
+        bucket: str = "",
+        keys: Optional[Iterable[str]] = None,
+        tos_urls: Optional[Iterable[str]] = None,
+        target_file_paths: Optional[Iterable[str]] = None,
+        target_dir_path: str = "",
+        parallelism: int = 8,
+        adaptive: bool = False,
+        ordered: bool = False,
+        max_pending: Optional[int] = None,
+        processes: int = 0,
+        progress_callback=None,
+    ) -> Iterator[str]:
+        """流式下载多个TOS对象到本地，每下载完一个对象就产出其本地路径
+
+        参数含义与 ``download_files`` 相同，但 ``keys``、``tos_urls`` 与 ``target_file_paths``
+        可以是任意可迭代对象（比如逐行读取清单文件的生成器），按需消费；任意时刻最多有
+        ``max_pending`` 个下载任务在排队或执行，下载上千万个对象时内存占用保持平稳。
+
+        比如：::
+
+            with open("keys.txt") as f:
+                keys = (line.strip() for line in f)
+                for path in client.iter_download_files(bucket, keys, target_dir_path="/data"):
+                    process(path)
 
-        data_count = len(keys) if keys else len(tos_urls)
-        download_dicts: list = [{} for _ in range(data_count)]
+        Args:
+            bucket(str): bucket 名
+            keys(iterable): object 的 key
+            tos_urls(iterable): 对象的 tos 链接
+            target_file_paths(iterable): 本地保存的目标路径，与 keys 或者 tos_urls 一一对应
+            target_dir_path(str): 本地保存的目标目录
+            parallelism(int): 并发数量
+            adaptive(bool): 是否自动调整并发数，同 ``download_files``
+            ordered(bool): 为 True 时按输入顺序产出路径，否则按完成顺序产出
+            max_pending(int): 最多同时提交的下载任务数，默认为 ``2 * parallelism``
+            processes(int): 大于 0 时使用 ``process_transfer.ProcessDownloader`` 在多个进程中下载，
+                每个进程使用 ``parallelism`` 个线程，结果按输入顺序产出，不支持 ``adaptive``；
+                限速器按进程数均分
+            progress_callback(callable): 进度回调，同 ``download_files``
 
-        if tos_urls:
-            for idx, url in enumerate(tos_urls):
-                download_dicts[idx]["tos_url"] = url
+        Returns:
+            生成本地文件路径的迭代器
+
+        Raises:
+            ValueError: 参数填写错误
+
+        """
+        if keys is None and tos_urls is None:
+            raise ValueError("Please assign a set of value as non-None")
+        if target_file_paths is None and not target_dir_path:
+            raise ValueError("Please set a correct dir_path or file_path")
+
+        if processes > 0 and adaptive:
+            raise ValueError("adaptive is not supported with processes")
+
+        self.dir_record = set()
+        if not adaptive:
+            download_file = self.download_file
         else:
-            for idx, key in enumerate(keys):
-                download_dicts[idx]["bucket"] = bucket
-                download_dicts[idx]["key"] = key
+            limiter = adaptive_concurrency.AdaptiveConcurrency(
+                max_limit=max(parallelism, adaptive_concurrency.DEFAULT_MAX_LIMIT),
+            )
+            parallelism = limiter.max_limit
+            client = self._with_pool_connections(parallelism)
+
+            def _download(**kwargs):
+                # one connection per slot, and the bytes land in the window the
+                # slot is released in
+                path = client.download_file(max_concurrence=1, **kwargs)
+                limiter.add_bytes(os.path.getsize(path))
+                return path
+
+            def download_file(**kwargs):
+                return limiter.call(_download, **kwargs)
 
+        if tos_urls is not None:
+            sources = ({"tos_url": url} for url in tos_urls)
+        else:
+            sources = ({"bucket": bucket, "key": key} for key in keys)
         if target_dir_path:
-            for dict in download_dicts:
-                dict["target_dir_path"] = target_dir_path
+            tasks = (
+                dict(source, target_dir_path=target_dir_path) for source in sources
+            )
         else:
-            for idx, target_file_path in enumerate(target_file_paths):
-                download_dicts[idx]["target_file_path"] = target_file_path
-
-        for idx in range(data_count):
-            async_res.append(
-                pool.apply_async(
-                    self.download_file,
-                    kwds=download_dicts[idx],
-                ),
+            tasks = (
+                dict(source, target_file_path=path)
+                for source, path in zip(sources, target_file_paths)
             )
 
-        pool.close()
-        ret = [res.get() for res in tqdm(async_res)]
-        pool.join()
-        return ret
-
-    def download_dir(self, bucket, key, prefix, local_dir):
-        marker = ""
-        while True:
-            res = self.s3_client.list_objects(
-                Bucket=bucket,
-                Delimiter="/",
-                EncodingType="",
-                Marker=marker,
-                MaxKeys=1000,
-                Prefix=key,
+        if processes > 0:
+            downloader = process_transfer.ProcessDownloader(
+                self,
+                processes=processes,
+                threads_per_process=parallelism,
+                progress_callback=progress_callback,
+            )
+            return downloader.download(tasks)
+        if progress_callback is None:
+            return imap_bounded(
+                lambda kwargs: download_file(**kwargs),
+                tasks,
+                max_workers=parallelism,
+                max_pending=max_pending,
+                ordered=ordered,
             )
-            keys = [content["Key"] for content in res.get("Contents", list())]
-            dirs = [content["Prefix"] for content in res.get("CommonPrefixes", list())]
 
-            for d in dirs:
-                debug(f"processing dir: {d}")
-                dest_pathname = os.path.join(
-                    local_dir, os.path.relpath(d, prefix) + "/"
+        # the totals are unknown while the inputs are consumed lazily
+        tracker = progress.TransferProgress(
+            None,
+            None,
+            callback=progress_callback,
+            show_progress=False,
+        )
+
+        def _download_tracked(kwargs):
+            path = download_file(**kwargs)
+            tracker.file_done()
+            tracker.add_bytes(os.path.getsize(path))
+            return path
+
+        return _close_when_done(
+            imap_bounded(
+                _download_tracked,
+                tasks,
+                max_workers=parallelism,
+                max_pending=max_pending,
+                ordered=ordered,
+            ),
+            tracker,
+        )
+
+    def download_dir(self, bucket, key, prefix, local_dir, max_workers=None):
+        """下载 ``key`` 前缀下的所有对象到本地目录
+
+        不使用 delimiter 平铺列举前缀下的对象，在列举后续分页的同时，
+        已列出的对象交给有界线程池并发下载；每个本地目录只创建一次。
+        每个对象只占用下载它的那个线程与一个连接，连接池扩大到 ``max_workers``。
+
+        Args:
+            bucket(str): bucket 名
+            key(str): 要下载的对象前缀
+            prefix(str): 计算本地相对路径时去掉的前缀，本地路径为 ``local_dir/relpath(key, prefix)``
+            local_dir(str): 本地保存的目标目录
+            max_workers(int): 并发下载数，默认为连接池大小 ``max_pool_connections``
+
+        """
+        if max_workers is None:
+            max_workers = self.max_pool_connections
+        client = self._with_pool_connections(max_workers)
+        created_dirs = set()
+
+        # the bounded queue keeps listing from running too far ahead of downloads
+        with BoundedExecutor(max_workers=max_workers) as executor:
+            for content in self.iter_objects(bucket, key):
+                k = content["Key"]
+                rel_path = os.path.relpath(k, prefix)
+                dest_pathname = os.path.join(local_dir, rel_path)
+                dest_dir = (
+                    dest_pathname if k.endswith("/") else os.path.dirname(dest_pathname)
                 )
+                if dest_dir not in created_dirs:
+                    os.makedirs(dest_dir, exist_ok=True)
+                    created_dirs.add(dest_dir)
+                if k.endswith("/") or rel_path == ".":
+                    continue
                 debug(f"dest_pathname: {dest_pathname}")
-                if not os.path.exists(os.path.dirname(dest_pathname)):
-                    os.makedirs(os.path.dirname(dest_pathname))
-                    debug(f"make dir: {dest_pathname}")
-                self.download_dir(bucket, d, prefix, local_dir)
-
-            for k in keys:
-                debug(f"processing file: {k}")
-                dest_pathname = os.path.join(local_dir, os.path.relpath(k, prefix))
-                debug(f"dest_pathname: {dest_pathname}")
-                if not os.path.exists(os.path.dirname(dest_pathname)):
-                    os.makedirs(os.path.dirname(dest_pathname))
-                    debug(f"make dir: {dest_pathname}")
-
-                if not os.path.isdir(dest_pathname):
-                    self.s3_client.download_file(bucket, k, dest_pathname)
-
-            if res["IsTruncated"]:
-                marker = res["Contents"][-1]["Key"]
-                continue
-            break
-
-    def upload(self, local_path, bucket, prefix):
-        if os.path.isfile(local_path):
-            key = f"{prefix}{os.path.basename(local_path)}"
-            self.upload_file(local_path, bucket, key=key)
-
-        if os.path.isdir(local_path):
-            self_prefix = os.path.basename(local_path.rstrip("/"))
-            if self_prefix != ".":
-                prefix = f"{prefix}{self_prefix}/"
-
-            for root, _, files in os.walk(local_path):
-                for file in tqdm(files):
-                    file_path = os.path.join(root, file)
-                    rel_path = os.path.relpath(root, local_path)
-                    if rel_path == ".":
-                        key = f"{prefix}{file}"
-                    else:
-                        key = f"{prefix}{rel_path}/{file}"
-                    self.upload_file(file_path, bucket, key=key)
+                executor.submit(client._download_object, bucket, k, dest_pathname)
+
+    def _download_object(self, bucket, key, file_path):
+        from boto3.s3.transfer import TransferConfig
+
+        # files are already downloaded in parallel, do not fan out into parts as well
+        self.s3_client.download_file(
+            bucket,
+            key,
+            file_path,
+            Config=TransferConfig(use_threads=False),
+            **self._bulk_transfer_kwargs(),
+        )
+
+    def upload(
+        self,
+        local_path,
+        bucket,
+        prefix,
+        max_workers=None,
+        progress_callback=None,
+    ):
+        """上传本地文件或目录到 ``tos://bucket/prefix``
+
+        目录中的文件由线程池并发上传，大文件先开始，小文件排在后面；
+        所有文件共享一个按字节计数的进度条。
+
+        Args:
+            local_path(str): 本地文件或目录
+            bucket(str): 上传 bucket 名
+            prefix(str): 上传 object 的 key 前缀；上传目录时，目录名会追加到前缀之后
+            max_workers(int): 同时上传的文件数，默认为连接池大小 ``max_pool_connections``
+            progress_callback(callable): 进度回调，参数为 ``progress.TransferMetrics``，
+                包含已传输字节数、文件数和平均吞吐
+
+        Returns:
+            返回上传后的 tos 路径，比如 ``tos://bucket/prefix/dirname/``
+
+        """
+        if max_workers is None:
+            max_workers = self.max_pool_connections
+        prefix = upload_prefix(local_path, prefix)
+        client = self._with_pool_connections(max_workers)
+        # files and their parts share the connection pool
+        uploader = dir_upload.DirectoryUploader(
+            client.s3_client,
+            max_workers=max_workers,
+            max_connections=client.max_pool_connections,
+            progress_callback=progress_callback,
+            rate_limiter=self._get_rate_limiter(),
+        )
+        uploader.upload(iter_upload_files(local_path, prefix), bucket)
         return f"tos://{bucket}/{prefix}"
+
+    def sync_up(
+        self,
+        local_path,
+        bucket,
+        prefix,
+        compare=sync.COMPARE_ETAG,
+        max_workers=None,
+        progress_callback=None,
+    ):
+        """增量上传本地文件或目录，只上传与远端不一致的文件
+
+        key 的计算方式与 ``upload`` 相同。本地文件与远端对象的比较方式：
+
+        - ``compare="etag"``：比较内容哈希与远端 ETag，本地哈希会被缓存，
+          文件大小和修改时间不变时不会重新计算
+        - ``compare="size_mtime"``：大小相同且本地修改时间不晚于远端时认为未变化
+
+        Args:
+            local_path(str): 本地文件或目录
+            bucket(str): 上传 bucket 名
+            prefix(str): 上传 object 的 key 前缀
+            compare(str): 比较方式，``"etag"`` 或 ``"size_mtime"``
+            max_workers(int): 并发数，默认为连接池大小 ``max_pool_connections``
+            progress_callback(callable): 上传进度回调，参数为 ``progress.TransferMetrics``
+
+        Returns:
+            ``sync.SyncResult``，包含上传和跳过的文件数
+
+        """
+        if max_workers is None:
+            max_workers = self.max_pool_connections
+        prefix = upload_prefix(local_path, prefix)
+        client = self._with_pool_connections(max_workers)
+        return sync.sync_up(
+            client._limited_s3_client(),
+            local_path,
+            iter_upload_files(local_path, prefix),
+            bucket,
+            prefix,
+            compare=compare,
+            max_workers=max_workers,
+            progress_callback=progress_callback,
+            max_connections=client.max_pool_connections,
+        )
+
+    def sync_down(
+        self,
+        bucket,
+        prefix,
+        local_dir,
+        compare=sync.COMPARE_ETAG,
+        max_workers=None,
+    ):
+        """增量下载 ``prefix`` 下的对象到 ``local_dir``，只下载有变化的对象
+
+        本地路径为 ``local_dir/relpath(key, prefix)``，比较方式同 ``sync_up``。
+
+        Args:
+            bucket(str): bucket 名
+            prefix(str): 要下载的对象前缀
+            local_dir(str): 本地保存的目标目录
+            compare(str): 比较方式，``"etag"`` 或 ``"size_mtime"``
+            max_workers(int): 并发数，默认为连接池大小 ``max_pool_connections``
+
+        Returns:
+            ``sync.SyncResult``，包含下载和跳过的文件数
+
+        """
+        if max_workers is None:
+            max_workers = self.max_pool_connections
+        return sync.sync_down(
+            self._with_pool_connections(max_workers)._limited_s3_client(),
+            bucket,
+            prefix,
+            local_dir,
+            compare=compare,
+            max_workers=max_workers,
+        )
@@ -1,68 +1,202 @@
-import io
 from collections.abc import Callable
 from typing import Dict
+from typing import List
 from typing import Optional
+from typing import Union
 
+import numpy as np
 import torch
 from PIL import Image
 
+from volcengine_ml_platform.annotation import compiler
 from volcengine_ml_platform.io import tos
+from volcengine_ml_platform.io.buffer_pool import BufferPool
+from volcengine_ml_platform.io.manifest_columns import JsonColumn
+from volcengine_ml_platform.io.manifest_columns import ManifestColumns
+from volcengine_ml_platform.io.multipart_upload import MemoryViewReader
+from volcengine_ml_platform.io.object_cache import ObjectCache
+from volcengine_ml_platform.io.request_policy import RequestPolicy
+from volcengine_ml_platform.io.shard import ShardReader
+
+
+def _check_target_type(target_type):
+    if target_type not in compiler.TARGET_TYPES:
+        raise ValueError(
+            f"unknown target_type {target_type}, expect {compiler.TARGET_TYPES}",
+        )
 
 
 class TorchTOSDataset:
+    """按样本从 TOS 读取的 Dataset
+
+    清单以 ``ManifestColumns`` 的列式数组保存，DataLoader 的各个 worker 读取样本时
+    不会因为修改 Python 对象的引用计数而复制整个清单。未指定 ``target_transform`` 时
+    标签直接从编译好的标签数组中按下标读取。
+
+    Args:
+        manifest_info(dict, ManifestColumns): 数据集清单，
+            也可以是 ``{"buckets": [...], "keys": [...], "annotations": [...]}``
+        target_type(str): 未指定 ``target_transform`` 时返回的标签类型，
+            ``class_id``、``multi_hot`` 或 ``boxes``，见 ``CompiledLabels.target``
+        classes(list): 类别名，类别 id 为其下标，``manifest_info`` 为 dict 时使用
+
+    """
+
     def __init__(
         self,
-        manifest_info: Dict,
+        manifest_info: Union[Dict, ManifestColumns],
         decode: Optional[Callable] = None,
         transform: Optional[Callable] = None,
         target_transform: Optional[Callable] = None,
+        cache: Optional[ObjectCache] = None,
+        request_policy: Optional[RequestPolicy] = None,
+        buffer_pool: Optional[BufferPool] = None,
+        target_type: str = compiler.CLASS_ID,
+        classes: Optional[List[str]] = None,
     ):
+        _check_target_type(target_type)
         self.decode = decode
+        self.cache = cache
+        # samples are read into reusable buffers when decoded by _decode
+        self.buffer_pool = buffer_pool
+        self.request_policy = request_policy
+        self._tos_client = None
         self.transform = transform
         self.target_transform = target_transform
-        buckets = manifest_info["buckets"]
-        keys = manifest_info["keys"]
-        annotations = manifest_info["annotations"]
-        assert buckets is not None and keys is not None and annotations is not None
-        assert len(buckets) == len(keys) and len(buckets) == len(annotations)
-        self.set_dataset_indices(buckets, keys, annotations)
+        self.target_type = target_type
+        self.classes = classes
+        if not isinstance(manifest_info, ManifestColumns):
+            manifest_info = ManifestColumns.from_manifest_info(manifest_info, classes)
+        self.set_columns(manifest_info)
+
+    @property
+    def tos_client(self):
+        """第一次读取样本时才创建的 TOSClient，构造 Dataset 时不需要认证信息"""
+        if self._tos_client is None:
+            # the underlying s3 client is re-created in each DataLoader worker
+            self._tos_client = tos.TOSClient(
+                cache=self.cache,
+                request_policy=self.request_policy,
+            )
+        return self._tos_client
+
+    @tos_client.setter
+    def tos_client(self, tos_client):
+        self._tos_client = tos_client
+
+    def set_columns(self, columns: ManifestColumns):
+        self.buckets = columns.buckets
+        self.keys = columns.keys
+        self.annotations = columns.annotations
+        self.targets = columns.targets
+        self.labels = columns.labels
 
     def set_dataset_indices(self, buckets, keys, annotations):
-        self.buckets = buckets
-        self.keys = keys
-        self.annotations = annotations
+        assert len(buckets) == len(keys) and len(buckets) == len(annotations)
+        self.set_columns(
+            ManifestColumns.from_manifest_info(
+                {"buckets": buckets, "keys": keys, "annotations": annotations},
+                self.classes,
+            ),
+        )
 
     def __len__(self):
         return len(self.buckets)
 
     def _decode(self, raw_data):
-        return Image.open(io.BytesIO(raw_data)).convert("RGB")
+        # wraps bytes or a memoryview without copying, convert() loads the pixels
+        return Image.open(MemoryViewReader(memoryview(raw_data))).convert("RGB")
 
     def _target_transform(self, target):
         target = int(target["Result"][0]["Data"][0]["Label"])
         return target
 
-    def __getitem__(self, index):
-        torch.set_num_threads(1)
-        # get each process a TOS client
-        if not hasattr(self, "tos_client"):
-            self.tos_client = tos.TOSClient()
-        bucket, key, annotation = (
-            self.buckets[index],
-            self.keys[index],
-            self.annotations[index],
+    def _fetch(self, index):
+        rsp = self.tos_client.get_object(
+            bucket=self.buckets[index], key=self.keys[index]
         )
-        rsp = self.tos_client.get_object(bucket=bucket, key=key)
         data = rsp.read()
         rsp.close()
+        return data
+
+    def _fetch_decoded(self, index):
+        with self.tos_client.get_object_pooled(
+            self.buckets[index],
+            self.keys[index],
+            self.buffer_pool,
+        ) as buf:
+            return self._decode(buf.view)
+
+    def _target(self, index):
+        if self.target_transform is not None:
+            return self.target_transform(self.annotations[index])
+        if self.target_type != compiler.CLASS_ID:
+            return self.targets.target(index, self.target_type)
+        if (
+            self.labels is not None
+            and type(self)._target_transform is TorchTOSDataset._target_transform
+        ):
+            return int(self.labels[index])
+        return self._target_transform(self.annotations[index])
+
+    def __getitem__(self, index):
+        torch.set_num_threads(1)
         if self.decode is not None:
-            data = self.decode(data)
+            data = self.decode(self._fetch(index))
         else:
-            data = self._decode(data)
+            data = self._fetch_decoded(index)
         if self.transform is not None:
             data = self.transform(data)
-        if self.target_transform is not None:
-            annotation = self.target_transform(annotation)
-        else:
-            annotation = self._target_transform(annotation)
-        return data, annotation
+        return data, self._target(index)
+
+
+class TorchShardDataset(TorchTOSDataset):
+    """从分片数据集中按样本随机读取的 Dataset，每个样本只需一次 Range 请求
+
+    Args:
+        reader(ShardReader): 分片数据集的 reader
+        positions(list): 第 i 个样本在分片索引中的下标
+        annotations(list, JsonColumn): 第 i 个样本的标注
+        targets(CompiledLabels): 已编译的标注，默认由 ``annotations`` 编译
+
+    """
+
+    def __init__(
+        self,
+        reader: ShardReader,
+        positions: List[int],
+        annotations: Union[List, JsonColumn],
+        decode: Optional[Callable] = None,
+        transform: Optional[Callable] = None,
+        target_transform: Optional[Callable] = None,
+        target_type: str = compiler.CLASS_ID,
+        classes: Optional[List[str]] = None,
+        targets: Optional[compiler.CompiledLabels] = None,
+    ):
+        _check_target_type(target_type)
+        assert len(positions) == len(annotations)
+        self.reader = reader
+        self.positions = np.asarray(positions, dtype=np.int64)
+        if targets is None:
+            targets = compiler.compile_annotations(annotations, classes)
+        self.targets = targets
+        self.labels = None
+        if self.targets.all_labeled():
+            self.labels = self.targets.class_ids
+        if not isinstance(annotations, JsonColumn):
+            annotations = JsonColumn.from_values(annotations)
+        self.annotations = annotations
+        self.decode = decode
+        self.transform = transform
+        self.target_transform = target_transform
+        self.target_type = target_type
+        self.classes = classes
+
+    def __len__(self):
+        return len(self.positions)
+
+    def _fetch(self, index):
+        return self.reader.read(int(self.positions[index]))
+
+    def _fetch_decoded(self, index):
+        return self._decode(self._fetch(index))
@@ -0,0 +1,144 @@
+"""通过 Range 请求随机读取 TOS 对象的文件对象"""
+import io
+from collections import OrderedDict
+from logging import debug
+
+DEFAULT_BLOCK_SIZE = 1024 * 1024
+DEFAULT_READ_AHEAD = 8 * 1024 * 1024
+DEFAULT_MAX_BLOCKS = 32
+
+
+class TOSRawFile(io.RawIOBase):
+    """可 seek 的只读 TOS 对象
+
+    读取时按 ``block_size`` 对齐发起 Range 请求，最近用到的块保存在一个很小的 LRU 缓存中。
+    顺序读取时一次请求会预读 ``read_ahead`` 字节；随机读取（比如 zip、Parquet 先读文件尾部）
+    时只请求需要的块。所有请求都带有打开时的 ETag，对象在读取期间被修改会直接报错。
+
+    可以直接传给 ``torch.load``、``PIL.Image.open``、``zipfile.ZipFile`` 等接受文件对象的接口。
+
+    Args:
+        s3_client: boto3 的 s3 client
+        bucket(str): bucket 名
+        key(str): 对象的 key
+        block_size(int): 块大小
+        read_ahead(int): 顺序读取时的预读大小
+        max_blocks(int): 缓存的最大块数
+
+    """
+
+    def __init__(
+        self,
+        s3_client,
+        bucket,
+        key,
+        block_size=DEFAULT_BLOCK_SIZE,
+        read_ahead=DEFAULT_READ_AHEAD,
+        max_blocks=DEFAULT_MAX_BLOCKS,
+    ):
+        super().__init__()
+        self.s3_client = s3_client
+        self.bucket = bucket
+        self.key = key
+        self.name = f"tos://{bucket}/{key}"
+        self.block_size = block_size
+        self.read_ahead_blocks = max(1, read_ahead // block_size)
+        self.max_blocks = max(max_blocks, self.read_ahead_blocks)
+        head = s3_client.head_object(Bucket=bucket, Key=key)
+        self.size = head["ContentLength"]
+        self.etag = head["ETag"]
+        self._pos = 0
+        self._last_block = -1
+        self._blocks = OrderedDict()
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        self._check_closed()
+        if whence == io.SEEK_SET:
+            pos = offset
+        elif whence == io.SEEK_CUR:
+            pos = self._pos + offset
+        elif whence == io.SEEK_END:
+            pos = self.size + offset
+        else:
+            raise ValueError(f"invalid whence: {whence}")
+        if pos < 0:
+            raise ValueError(f"negative seek position: {pos}")
+        self._pos = pos
+        return self._pos
+
+    def tell(self):
+        self._check_closed()
+        return self._pos
+
+    def readinto(self, b):
+        self._check_closed()
+        view = memoryview(b).cast("B")
+        n = 0
+        while n < len(view) and self._pos < self.size:
+            index, offset = divmod(self._pos, self.block_size)
+            block = self._block(index)
+            length = min(len(view) - n, len(block) - offset)
+            view[n : n + length] = block[offset : offset + length]
+            n += length
+            self._pos += length
+        return n
+
+    def readall(self):
+        # read the remainder in one pass instead of RawIOBase's small chunks
+        return self.read(max(self.size - self._pos, 0))
+
+    def close(self):
+        self._blocks.clear()
+        super().close()
+
+    def _check_closed(self):
+        if self.closed:
+            raise ValueError("I/O operation on closed file.")
+
+    def _block(self, index):
+        block = self._blocks.get(index)
+        if block is not None:
+            self._blocks.move_to_end(index)
+            self._last_block = index
+            return block
+
+        sequential = index == self._last_block + 1
+        count = self.read_ahead_blocks if sequential else 1
+        self._fetch(index, count)
+        self._last_block = index
+        return self._blocks[index]
+
+    def _fetch(self, first, count):
+        last = min(first + count, -(-self.size // self.block_size)) - 1
+        while last > first and last in self._blocks:
+            last -= 1
+        start = first * self.block_size
+        end = min((last + 1) * self.block_size, self.size) - 1
+        debug("ranged read %s bytes=%d-%d", self.name, start, end)
+        rsp = self.s3_client.get_object(
+            Bucket=self.bucket,
+            Key=self.key,
+            Range=f"bytes={start}-{end}",
+            IfMatch=self.etag,
+        )
+        body = rsp["Body"]
+        try:
+            data = body.read()
+        finally:
+            body.close()
+        if len(data) != end + 1 - start:
+            raise OSError(
+                f"short read of {self.name}: got {len(data)} bytes, range {start}-{end}",
+            )
+        for index in range(first, last + 1):
+            offset = (index - first) * self.block_size
+            self._blocks[index] = data[offset : offset + self.block_size]
+            self._blocks.move_to_end(index)
+        while len(self._blocks) > self.max_blocks:
+            self._blocks.popitem(last=False)
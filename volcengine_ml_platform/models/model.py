@@ -3,8 +3,6 @@ from typing import Optional
 from typing import Tuple
 from urllib.parse import urlparse
 
-from prettytable import PrettyTable
-
 from volcengine_ml_platform.inferences.inference import InferenceService
 from volcengine_ml_platform.io import tos
 from volcengine_ml_platform.models import validation
@@ -386,6 +384,8 @@ class Model:
             sort_by=sort_by,
             sort_order=sort_order,
         )
+        from prettytable import PrettyTable
+
         table = PrettyTable(
             [
                 "ModelID",
@@ -2,7 +2,6 @@ import copy
 import json
 import os
 
-import jsonschema
 
 SUPPORTED_MODEL_CATEGORY = [
     "TextClassification",
@@ -124,24 +123,31 @@ def valid_json(serialized_data):
     json.loads(serialized_data)
 
 
+def _validate(instance, schema):
+    # imported lazily, jsonschema is slow to import
+    import jsonschema
+
+    jsonschema.validate(instance, schema=schema)
+
+
 def validate_model_tensor_config(tensor_config):
     if tensor_config is None:
         return
     try:
-        jsonschema.validate(tensor_config, schema=_model_tensor_config_schema)
+        _validate(tensor_config, _model_tensor_config_schema)
     except Exception as e:
         raise Exception("Invalid tensor config.") from e
 
 
 def validate_perf_job_tensor_config(tensor_config):
-    jsonschema.validate(tensor_config, schema=_perf_job_tensor_config_schema)
+    _validate(tensor_config, _perf_job_tensor_config_schema)
 
 
 def validate_metrics(model_metrics):
     if model_metrics is None:
         return
     try:
-        jsonschema.validate(model_metrics, _model_metrics_schema)
+        _validate(model_metrics, _model_metrics_schema)
         for metrics in model_metrics:
             valid_json(metrics["Params"])
             valid_json(metrics["MetricsData"])
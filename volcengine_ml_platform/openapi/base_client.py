@@ -11,6 +11,7 @@ from volcengine.ServiceInfo import ServiceInfo
 
 import volcengine_ml_platform
 from volcengine_ml_platform import constant
+from volcengine_ml_platform.util import client_pool
 from volcengine_ml_platform.util import metric
 
 API_INFOS = {}
@@ -103,7 +104,7 @@ class BaseClient(Service):
         SignerV4.sign(r, self.service_info.credentials)
 
         url = r.build()
-        resp = self.session.post(
+        resp = client_pool.http_session().post(
             url,
             headers=r.headers,
             data=r.body,
@@ -0,0 +1,113 @@
+import collections
+import threading
+from concurrent.futures import FIRST_COMPLETED
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import wait
+
+
+class BoundedExecutor:
+    """排队任务数有上限的线程池
+
+    ``submit`` 在排队中的任务达到 ``max_pending`` 时阻塞，生产者因此不会跑得比
+    worker 快太多，提交任意多的任务时内存占用保持平稳。不保存 future，任务的第一个
+    异常会在之后的 ``submit`` 或退出 ``with`` 块时抛出。
+
+    比如：::
+
+        with BoundedExecutor(max_workers=16) as executor:
+            for key in keys:
+                executor.submit(download, key)
+
+    Args:
+        max_workers(int): 线程数
+        max_pending(int): 最多排队（含执行中）的任务数，默认为 ``2 * max_workers``
+
+    """
+
+    def __init__(self, max_workers, max_pending=None):
+        if max_pending is None:
+            max_pending = max_workers * 2
+        self._executor = ThreadPoolExecutor(max_workers=max_workers)
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._error = None
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.shutdown()
+        if exc_type is None:
+            self.raise_error()
+
+    def submit(self, fn, *args, **kwargs):
+        self.raise_error()
+        self._slots.acquire()
+        try:
+            future = self._executor.submit(fn, *args, **kwargs)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(self._on_done)
+        return future
+
+    def raise_error(self):
+        if self._error is not None:
+            raise self._error
+
+    def shutdown(self, wait=True):
+        self._executor.shutdown(wait=wait)
+
+    def _on_done(self, future):
+        self._slots.release()
+        if future.cancelled():
+            return
+        exc = future.exception()
+        if exc is not None:
+            with self._lock:
+                if self._error is None:
+                    self._error = exc
+
+
+def imap_bounded(fn, iterable, max_workers, max_pending=None, ordered=True):
+    """在线程池中对 ``iterable`` 的每个元素执行 ``fn``，逐个产出结果
+
+    ``iterable`` 按需消费，任意时刻最多有 ``max_pending`` 个任务已提交但结果未被取走，
+    处理任意长的输入时内存占用保持平稳。停止迭代时未开始的任务会被取消。
+
+    Args:
+        fn(callable): 单参数函数
+        iterable: 任意可迭代对象，可以是生成器
+        max_workers(int): 线程数
+        max_pending(int): 最多同时提交的任务数，默认为 ``2 * max_workers``
+        ordered(bool): 为 True 时按输入顺序产出结果，否则按完成顺序产出
+
+    Returns:
+        生成 ``fn`` 返回值的迭代器，任务的异常在取到其结果时抛出
+
+    """
+    if max_pending is None:
+        max_pending = max_workers * 2
+    pending = collections.deque()
+
+    def _next_done():
+        if ordered:
+            return [pending.popleft()]
+        done, _ = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            pending.remove(future)
+        return done
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        try:
+            for item in iterable:
+                while len(pending) >= max_pending:
+                    for future in _next_done():
+                        yield future.result()
+                pending.append(executor.submit(fn, item))
+            while pending:
+                for future in _next_done():
+                    yield future.result()
+        finally:
+            for future in pending:
+                future.cancel()
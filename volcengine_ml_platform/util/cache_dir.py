@@ -1,8 +1,12 @@
 import os
+import shutil
 
 HOME_DIR = os.environ.get("HOME", default="/tmp")
 
 SAMPLES_ROOT = ".volcengine_ml_platform/samples/"
+CHECKPOINT_ROOT = ".volcengine_ml_platform/checkpoints/"
+SYNC_ROOT = ".volcengine_ml_platform/sync/"
+OBJECT_CACHE_ROOT = ".volcengine_ml_platform/cache/"
 
 
 def create(name):
@@ -26,4 +30,5 @@ class CacheDir:
         return res
 
     def clear(self):
-        pass
+        shutil.rmtree(self.root_path, ignore_errors=True)
+        os.makedirs(self.root_path, exist_ok=True)
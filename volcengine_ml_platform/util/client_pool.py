@@ -0,0 +1,107 @@
+"""按进程复用的客户端池
+
+boto3 client 与 ``requests.Session`` 内部持有连接池，``fork`` 出的子进程（比如
+DataLoader 的 worker）如果继续使用父进程创建的对象，会与父进程共用同一批 socket。
+这里的客户端按进程缓存，检测到 pid 变化后丢弃继承来的对象，在子进程中重新创建。
+
+缓存的键包含认证信息，STS 临时凭证轮换后会产生新的客户端；最多保留 ``MAX_CLIENTS`` 个，
+超出时丢弃最久未使用的客户端，已经拿到它的调用方仍可继续使用。
+"""
+import collections
+import os
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+
+DEFAULT_POOL_MAXSIZE = 10
+MAX_CLIENTS = 16
+
+_lock = threading.Lock()
+_pid = os.getpid()
+# least recently used first
+_clients = collections.OrderedDict()
+
+
+def _reset():
+    global _lock, _pid
+    # the lock may have been held by another thread at fork time
+    _lock = threading.Lock()
+    _pid = os.getpid()
+    # do not close inherited clients, their sockets are still used by the parent
+    _clients.clear()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset)
+
+
+def get(key, factory):
+    """返回当前进程中 ``key`` 对应的客户端，不存在时调用 ``factory()`` 创建
+
+    Args:
+        key: 可哈希的键，包含所有会影响客户端配置的参数
+        factory(callable): 创建客户端的函数
+
+    """
+    if _pid != os.getpid():
+        _reset()
+    with _lock:
+        client = _clients.get(key)
+        if client is not None:
+            _clients.move_to_end(key)
+            return client
+        client = factory()
+        _clients[key] = client
+        while len(_clients) > MAX_CLIENTS:
+            # not closed, whoever got it earlier may still be using it
+            _clients.popitem(last=False)
+    return client
+
+
+def s3_client(max_pool_connections, read_timeout=None, **config):
+    """返回当前进程共享的 boto3 s3 client
+
+    Args:
+        max_pool_connections(int): 连接池大小，应不小于并发请求数
+        read_timeout(float): 读 socket 的超时时间，None 表示使用 botocore 的默认值
+        config: 传给 ``boto3.client`` 的认证与 endpoint 参数
+
+    """
+
+    def _create():
+        # imported lazily, boto3 is slow to import
+        import boto3
+        from botocore.config import Config
+
+        options = {"max_pool_connections": max_pool_connections}
+        if read_timeout is not None:
+            options["read_timeout"] = read_timeout
+        return boto3.client("s3", config=Config(**options), **config)
+
+    key = ("s3", max_pool_connections, read_timeout, tuple(sorted(config.items())))
+    return get(key, _create)
+
+
+def http_session(pool_maxsize=DEFAULT_POOL_MAXSIZE):
+    """返回当前进程共享的 ``requests.Session``
+
+    Args:
+        pool_maxsize(int): 每个 host 的连接池大小
+
+    """
+
+    def _create():
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_maxsize=pool_maxsize)
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        return session
+
+    return get(("http", pool_maxsize), _create)
+
+
+def clear():
+    """丢弃当前进程中缓存的所有客户端"""
+    with _lock:
+        _clients.clear()
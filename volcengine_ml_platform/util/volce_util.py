@@ -1,26 +1,129 @@
-from socket import gethostbyname
+"""判断当前机器是否在火山引擎内网中，决定使用内网还是公网的 TOS endpoint
+
+探测需要一次 DNS 解析，解析器不可用时可能阻塞数秒，因此只在第一次需要 endpoint 时进行，
+结果按主机名与 DNS 配置缓存在 ``~/.volcengine_ml_platform/endpoint_probe.json`` 中。
+设置环境变量 ``VOLC_ML_PLATFORM_INTRANET=1`` 或 ``0`` 可以跳过探测。
+"""
+import hashlib
+import json
+import os
+import socket
+import threading
+import time
+
+from volcengine_ml_platform.util import cache_dir
 
 DOMAIN = "tos-s3-cn-beijing.ivolces.com"
+INTRANET_ENV_NAME = "VOLC_ML_PLATFORM_INTRANET"
+PROBE_CACHE_FILENAME = "endpoint_probe.json"
+PROBE_CACHE_TTL = 24 * 3600
+PROBE_TIMEOUT = 2.0
+RESOLV_CONF = "/etc/resolv.conf"
+
+_is_intranet = None
+_lock = threading.Lock()
+
+
+def _network_key():
+    """当前主机与网络的标识：主机名加上 DNS 配置的摘要"""
+    digest = hashlib.md5()
+    try:
+        with open(RESOLV_CONF, "rb") as f:
+            digest.update(f.read())
+    except OSError:
+        pass
+    return f"{socket.gethostname()}:{digest.hexdigest()}"
+
+
+def _probe_cache_path():
+    return os.path.join(
+        cache_dir.HOME_DIR,
+        ".volcengine_ml_platform",
+        PROBE_CACHE_FILENAME,
+    )
+
 
+def _load_cached(key):
+    try:
+        with open(_probe_cache_path(), encoding="utf-8") as f:
+            entry = json.load(f).get(key)
+    except (OSError, ValueError, AttributeError):
+        return None
+    if not entry or time.time() - entry.get("time", 0) > PROBE_CACHE_TTL:
+        return None
+    return entry.get("intranet")
 
-def _is_volce_intranet():
-    for i in range(3):
+
+def _save_cached(key, intranet):
+    path = _probe_cache_path()
+    try:
+        try:
+            with open(path, encoding="utf-8") as f:
+                entries = json.load(f)
+        except (OSError, ValueError):
+            entries = {}
+        entries[key] = {"intranet": intranet, "time": time.time()}
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(entries, f)
+        os.replace(temp_path, path)
+    except OSError:
+        # the cache is only an optimization, e.g. HOME may be read-only
+        pass
+
+
+def _probe(timeout=PROBE_TIMEOUT):
+    """在后台线程中解析内网域名
+
+    Returns:
+        解析成功返回 True，域名不存在返回 False；超过 ``timeout`` 秒未返回或 DNS 暂时不可用时
+        无法判断，返回 None
+
+    """
+    result = []
+
+    def _resolve():
         try:
-            ips = gethostbyname(DOMAIN)
-            if ips and len(ips) > 0:
-                return True
-            else:
-                return False
+            result.append(bool(socket.gethostbyname(DOMAIN)))
+        except socket.gaierror as e:
+            # only a definite answer says we are outside the intranet
+            result.append(False if e.errno == socket.EAI_NONAME else None)
         except Exception:
-            pass
-        return False
+            result.append(None)
+
+    thread = threading.Thread(target=_resolve, daemon=True)
+    thread.start()
+    thread.join(timeout)
+    return result[0] if result else None
 
 
-IS_VOLCE_INTRANET = _is_volce_intranet()
+def is_volce_intranet():
+    """当前机器是否在火山引擎内网中，第一次调用时探测，之后使用缓存的结果"""
+    global _is_intranet
+    if _is_intranet is not None:
+        return _is_intranet
+    with _lock:
+        if _is_intranet is None:
+            value = os.getenv(INTRANET_ENV_NAME)
+            if value:
+                _is_intranet = value.lower() in ("1", "true", "yes")
+                return _is_intranet
+            key = _network_key()
+            cached = _load_cached(key)
+            if cached is None:
+                cached = _probe()
+                if cached is None:
+                    # inconclusive, not cached so the next process probes again
+                    cached = False
+                else:
+                    _save_cached(key, cached)
+            _is_intranet = cached
+    return _is_intranet
 
 
 def get_tos_endpoint(region):
-    if IS_VOLCE_INTRANET:
+    if is_volce_intranet():
         return f"http://tos-s3-{region}.ivolces.com"
     else:
         return f"http://tos-s3-{region}.volces.com"